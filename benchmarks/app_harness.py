@@ -0,0 +1,16 @@
+"""Streamlit script used by the benchmarks: the real app, wired to fake_gspread.
+
+Run through streamlit.testing.v1.AppTest; the driver sets
+fake_gspread.CURRENT_CLIENT (and any main.* config) before running it.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import fake_gspread  # noqa: E402
+import main  # noqa: E402
+
+main.get_gsheet_client = lambda: fake_gspread.CURRENT_CLIENT
+main.main()
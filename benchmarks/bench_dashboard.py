@@ -0,0 +1,183 @@
+"""Benchmark: full app reruns (dashboard, search, filters, form submit) against a fake Google Sheet.
+
+Drives main() through Streamlit's AppTest with a latency-injecting fake gspread
+client (see fake_gspread.py) at several dataset sizes, and writes the timings
+as JSON so runs can be compared.
+
+Usage:
+    python benchmarks/bench_dashboard.py --sizes 1000 10000 100000 --latency 0.05 --out bench_results.json
+    python benchmarks/bench_dashboard.py --compare bench_results.json   # compare a new run against an old one
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd  # noqa: E402
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import fake_gspread  # noqa: E402
+import main  # noqa: E402
+from synthetic import make_lead_rows  # noqa: E402
+
+HARNESS = os.path.join(os.path.dirname(__file__), "app_harness.py")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def check(at):
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return at
+
+
+def new_app(rows, args, workdir):
+    """Fresh caches + fake spreadsheet seeded with `rows`, logged in as admin"""
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    main.OUTBOX_DB_FILE = os.path.join(workdir, f"outbox-{len(rows)}-{time.time_ns()}.db")
+    main.SNAPSHOT_FILE = os.path.join(workdir, f"snapshot-{len(rows)}-{time.time_ns()}.parquet")
+    client = fake_gspread.FakeClient(
+        latency=args.latency, latency_per_kb=args.latency_per_kb, error_rate=args.error_rate,
+        read_quota_per_minute=args.read_quota, write_quota_per_minute=args.write_quota,
+    )
+    client.spreadsheet(main.SPREADSHEET_ID).seed(main.WORKSHEET_NAME, [main.LEAD_HEADERS] + rows)
+    fake_gspread.CURRENT_CLIENT = client
+
+    at = AppTest.from_file(HARNESS, default_timeout=600)
+    at.session_state["is_admin"] = True
+    at.session_state["login_time"] = time.time()
+    return at, client
+
+
+def bench_size(n, args, workdir):
+    rows = make_lead_rows(n, seed=args.seed)
+    at, client = new_app(rows, args, workdir)
+    results = {}
+
+    check(at.run())  # Lead Form page, warms imports
+    results["dashboard_cold"] = [timed(lambda: check(at.sidebar.radio[0].set_value("Admin Dashboard").run()))]
+    results["dashboard_rerun"] = [timed(lambda: check(at.run())) for _ in range(args.repeat)]
+
+    search_terms = ["nile", "bank", "falcon sol", "maadi", "zzz-no-match"]
+    results["search"] = [timed(lambda t=t: check(at.text_input[0].set_value(t).run()))
+                         for t in search_terms[:args.repeat]]
+    check(at.text_input[0].set_value("").run())
+
+    locations = [["New Maadi"], ["New Maadi", "Old Maadi"], ["Zahraa El Maadi"], [], ["Maadi Degla"]]
+    results["filter"] = [timed(lambda f=f: check(at.multiselect[0].set_value(f).run()))
+                         for f in locations[:args.repeat]]
+    check(at.multiselect[0].set_value([]).run())
+
+    results["page_change"] = [timed(lambda p=p: check(at.number_input[0].set_value(p).run()))
+                              for p in range(2, 2 + args.repeat)]
+
+    check(at.sidebar.radio[0].set_value("Lead Form").run())
+    submit = []
+    for i in range(args.repeat):
+        at.text_input[0].set_value(f"Benchmark Co {i}")
+        at.text_input[4].set_value("Bench Contact")
+        submit.append(timed(lambda: check(at.button[0].click().run())))
+        # the per-client rate limit would kick in after 10 submissions
+        main.get_submission_limiter().reset()
+    results["form_submit"] = submit
+
+    out = []
+    for scenario, timings in results.items():
+        out.append({
+            "scenario": scenario,
+            "rows": n,
+            "runs": len(timings),
+            "min_ms": round(min(timings) * 1000, 2),
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "p95_ms": round(percentile(timings, 95) * 1000, 2),
+        })
+    api = {key: value for key, value in client.stats.items()}
+    return out, api
+
+
+def compare(old_report, new):
+    old = {(r["scenario"], r["rows"]): r for r in old_report["results"]}
+    print(f"\n{'scenario':<18}{'rows':>8}{'old ms':>11}{'new ms':>11}{'change':>9}")
+    for r in new["results"]:
+        before = old.get((r["scenario"], r["rows"]))
+        if not before:
+            continue
+        change = (r["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0
+        print(f"{r['scenario']:<18}{r['rows']:>8}{before['median_ms']:>11.1f}{r['median_ms']:>11.1f}{change:>+8.0f}%")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per interactive scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake Sheets API call")
+    parser.add_argument("--latency-per-kb", type=float, default=0.0005, help="extra seconds per KB transferred")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a transient 429/503 per call")
+    parser.add_argument("--read-quota", type=int, default=None, help="read calls per minute before 429s")
+    parser.add_argument("--write-quota", type=int, default=None, help="write calls per minute before 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    old_report = None
+    if args.compare:  # read it first, --out may point at the same file
+        with open(args.compare) as f:
+            old_report = json.load(f)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "streamlit": st.__version__,
+            "args": vars(args),
+        },
+        "results": [],
+        "api_calls": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            results, api = bench_size(n, args, workdir)
+            report["results"].extend(results)
+            report["api_calls"][str(n)] = api
+            for r in results:
+                print(f"{r['scenario']:<18}{r['rows']:>8} rows  median {r['median_ms']:>9.1f} ms  p95 {r['p95_ms']:>9.1f} ms")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+    if old_report:
+        compare(old_report, report)
+
+
+if __name__ == "__main__":
+    main_()
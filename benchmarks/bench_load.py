@@ -0,0 +1,299 @@
+"""Load test: many simultaneous sessions submitting the lead form against a fake Google Sheet.
+
+Each concurrency level starts a real `streamlit run` server (load_server.py: the
+real app behind show_lead_form - validation, duplicate check, rate limits,
+outbox, background writer - wired to fake_gspread, which models per-call latency,
+per-minute read/write quotas and injected 429/503 errors). Every simulated
+session is its own websocket connection speaking Streamlit's protocol, like a
+browser tab. Sessions open the form together and submit --per-session leads
+each, as fast as they can (or --think seconds apart).
+
+Reported per concurrency level:
+- subs_per_sec         accepted submissions per second of wall time
+- submit p50/p95/p99   click until the rerun finished (what the visitor waits for)
+- write p50/p95/p99    click until the row is in the sheet
+- accepted / rejected (rate limit, overload) / duplicate warnings / errors
+- harness_errors       submissions the load generator itself failed to make
+                       (connection refused or dropped, timeout); not counted as app errors
+- lost / duplicated    accepted leads missing from the sheet, or in it more than once,
+                       once the writer has drained (up to --drain-timeout seconds)
+
+Usage:
+    python benchmarks/bench_load.py --levels 1 5 20 50 --per-session 3 --latency 0.1 --out load_results.json
+    python benchmarks/bench_load.py --out new.json --compare load_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+
+import streamlit as st
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_dashboard import compare, git_commit, percentile  # noqa: E402
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_server.py")
+COMPANY_LABEL = "Company Name *"
+CONTACT_LABEL = "HR/Contact Name *"
+SUBMIT_LABEL = "✅ Submit Lead"
+
+
+class Tab:
+    """One browser tab: a websocket session with the app server"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.page_script_hash = ""
+        self.widgets = {}  # label -> widget id, from the last run
+
+    @classmethod
+    async def open(cls, url, query=""):
+        tab = cls(await websockets.connect(url, subprotocols=["streamlit"], max_size=None))
+        await tab.rerun(query=query)
+        return tab
+
+    async def rerun(self, widgets=(), query=""):
+        """Run the script with these WidgetStates and return the elements of the finished run"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = query
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        msg.rerun_script.widget_states.widgets.extend(widgets)
+        await self.ws.send(msg.SerializeToString())
+        elements = []
+        while True:
+            forward = ForwardMsg.FromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+                elements = []
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                elements.append(forward.delta.new_element)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                self.widgets = {}
+                for element in elements:
+                    widget = element.WhichOneof("type")
+                    if widget in ("text_input", "button"):
+                        self.widgets[getattr(element, widget).label] = getattr(element, widget).id
+                return elements
+
+    async def submit(self, company, contact):
+        return await self.rerun([
+            WidgetState(id=self.widgets[COMPANY_LABEL], string_value=company),
+            WidgetState(id=self.widgets[CONTACT_LABEL], string_value=contact),
+            WidgetState(id=self.widgets[SUBMIT_LABEL], trigger_value=True),
+        ])
+
+    async def close(self):
+        await self.ws.close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workdir, level):
+    """`streamlit run load_server.py` with a fresh fake spreadsheet (seeded with --rows leads) and outbox"""
+    level_dir = os.path.join(workdir, f"level-{level}")
+    os.makedirs(level_dir)
+    config = {
+        "client": {"latency": args.latency, "latency_per_kb": args.latency_per_kb, "error_rate": args.error_rate,
+                   "read_quota_per_minute": args.read_quota, "write_quota_per_minute": args.write_quota,
+                   "seed": args.seed},
+        "rows": args.rows,
+        "workdir": level_dir,
+        "drain_timeout": args.drain_timeout,
+    }
+    port = free_port()
+    log = open(os.path.join(level_dir, "server.log"), "w")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", SERVER, "--server.address", "127.0.0.1",
+         "--server.port", str(port), "--server.headless", "true", "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=level_dir, stdout=log, stderr=subprocess.STDOUT,
+        env=dict(os.environ, BENCH_LOAD_CONFIG=json.dumps(config)),
+    )
+    deadline = time.time() + 60
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                break
+        except OSError:
+            if server.poll() is not None or time.time() > deadline:
+                server.kill()
+                raise RuntimeError(f"app server didn't start, see {log.name}")
+            time.sleep(0.2)
+    return server, f"ws://127.0.0.1:{port}/_stcore/stream", level_dir
+
+
+def outcome(elements):
+    """(kind, detail) of the message the submission ended with"""
+    alerts = [element.alert for element in elements if element.WhichOneof("type") == "alert"]
+    exceptions = [element.exception for element in elements if element.WhichOneof("type") == "exception"]
+    if exceptions:
+        return "error", f"{exceptions[0].type}: {exceptions[0].message}"
+    if any(a.format == Alert.SUCCESS and "successfully submitted" in a.body for a in alerts):
+        return "accepted", None
+    if any(a.format == Alert.ERROR and "Too many submissions" in a.body for a in alerts):
+        return "rate_limited", None
+    if any(a.format == Alert.WARNING and "a lot of submissions" in a.body for a in alerts):
+        return "overloaded", None
+    if any(a.format == Alert.WARNING and "may already be registered" in a.body for a in alerts):
+        return "duplicate_warning", None
+    messages = [a.body for a in alerts if a.format in (Alert.ERROR, Alert.WARNING)]
+    return "error", messages[0] if messages else "no confirmation shown"
+
+
+async def session(tab, level, number, args, results):
+    for i in range(args.per_session):
+        company = f"Load Test {level} {number} {i}"
+        clicked, started = time.time(), time.perf_counter()
+        if isinstance(tab, BaseException):  # never opened the form
+            result, detail = "harness_error", repr(tab)
+        else:
+            try:
+                elements = await asyncio.wait_for(tab.submit(company, "Load Contact"), args.timeout)
+                result, detail = outcome(elements)
+            except Exception as e:  # connection dropped, timeout
+                result, detail = "harness_error", repr(e)
+        results.append((company, result, detail, clicked, time.perf_counter() - started))
+        await asyncio.sleep(args.think)
+
+
+async def run_sessions(level, args, url):
+    """Open `level` tabs, then submit from all of them at once; (results, seconds)"""
+    tabs = await asyncio.gather(*(asyncio.wait_for(Tab.open(url), args.timeout) for _ in range(level)),
+                                return_exceptions=True)
+    results = []
+    started = time.perf_counter()
+    await asyncio.gather(*(session(tab, level, n, args, results) for n, tab in enumerate(tabs)))
+    elapsed = time.perf_counter() - started
+    for tab in tabs:
+        if not isinstance(tab, BaseException):
+            await tab.close()
+    return results, elapsed
+
+
+async def fetch_report(url, path, args):
+    """Let the server drain its writer and write what reached the sheet"""
+    tab = await asyncio.wait_for(Tab.open(url, query=f"report={path}"), args.drain_timeout + args.timeout)
+    await tab.close()
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_level(level, args, workdir):
+    server, url, level_dir = start_server(args, workdir, level)
+    try:
+        results, elapsed = asyncio.run(run_sessions(level, args, url))
+        sheet = asyncio.run(fetch_report(url, os.path.join(level_dir, "report.json"), args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    outcomes = Counter(result for _, result, _, _, _ in results)
+    accepted = [(company, clicked, latency) for company, result, _, clicked, latency in results if result == "accepted"]
+    in_sheet = Counter(sheet["companies"])
+    landed = sheet["landed"]
+    submit_latency = [latency for _, _, latency in accepted] or [0]
+    write_latency = [landed[company] - clicked for company, clicked, _ in accepted if company in landed] or [0]
+    return {
+        "level": level,
+        "submissions": len(results),
+        "seconds": round(elapsed, 2),
+        "subs_per_sec": round(len(accepted) / elapsed, 2) if elapsed else 0,
+        "submit_p50_ms": round(percentile(submit_latency, 50) * 1000, 1),
+        "submit_p95_ms": round(percentile(submit_latency, 95) * 1000, 1),
+        "submit_p99_ms": round(percentile(submit_latency, 99) * 1000, 1),
+        "write_p50_ms": round(percentile(write_latency, 50) * 1000, 1),
+        "write_p95_ms": round(percentile(write_latency, 95) * 1000, 1),
+        "write_p99_ms": round(percentile(write_latency, 99) * 1000, 1),
+        "accepted": len(accepted),
+        "rate_limited": outcomes["rate_limited"],
+        "overloaded": outcomes["overloaded"],
+        "duplicate_warnings": outcomes["duplicate_warning"],
+        "errors": outcomes["error"],
+        "error_details": dict(Counter(detail for _, result, detail, _, _ in results if result == "error")),
+        "harness_errors": outcomes["harness_error"],
+        "harness_error_details": dict(Counter(detail for _, result, detail, _, _ in results
+                                              if result == "harness_error")),
+        "drained": sheet["drained"],
+        "lost": sum(1 for company, _, _ in accepted if not in_sheet[company]),
+        "duplicated": sum(1 for company, _, _ in accepted if in_sheet[company] > 1),
+        "api_calls": sheet["api_calls"],
+    }
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 5, 20, 50], help="simultaneous sessions")
+    parser.add_argument("--per-session", type=int, default=3, help="submissions per session")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds between a session's submissions")
+    parser.add_argument("--rows", type=int, default=1000, help="leads already in the sheet")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per fake Sheets API call")
+    parser.add_argument("--latency-per-kb", type=float, default=0.0005, help="extra seconds per KB transferred")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="probability of a transient 429/503 per call")
+    parser.add_argument("--read-quota", type=int, default=300, help="read calls per minute before 429s")
+    parser.add_argument("--write-quota", type=int, default=60, help="write calls per minute before 429s")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for one rerun")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="seconds to wait for the writer afterwards")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="load_results.json")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    old_report = None
+    if args.compare:  # read it first, --out may point at the same file
+        with open(args.compare) as f:
+            old_report = json.load(f)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "args": vars(args),
+        },
+        "levels": [],
+        "results": [],  # bench_dashboard.compare() format
+    }
+    print(f"{'sessions':>8}{'subs/s':>9}{'submit p50/p95/p99 ms':>26}{'write p50/p95/p99 ms':>26}"
+          f"{'ok':>6}{'limited':>9}{'errors':>8}{'harness':>9}{'lost':>6}{'dup':>5}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for level in args.levels:
+            r = run_level(level, args, workdir)
+            report["levels"].append(r)
+            for metric in ("submit_p50_ms", "submit_p95_ms", "write_p50_ms", "write_p95_ms"):
+                report["results"].append({"scenario": metric.removesuffix("_ms"), "rows": level, "median_ms": r[metric]})
+            print(f"{level:>8}{r['subs_per_sec']:>9.1f}"
+                  f"{r['submit_p50_ms']:>10.0f}{r['submit_p95_ms']:>8.0f}{r['submit_p99_ms']:>8.0f}"
+                  f"{r['write_p50_ms']:>10.0f}{r['write_p95_ms']:>8.0f}{r['write_p99_ms']:>8.0f}"
+                  f"{r['accepted']:>6}{r['rate_limited'] + r['overloaded']:>9}{r['errors']:>8}"
+                  f"{r['harness_errors']:>9}{r['lost']:>6}{r['duplicated']:>5}")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+    if old_report:
+        compare(old_report, report)  # "rows" column = sessions
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,35 @@
+"""Benchmark: vectorized lead scoring on a large synthetic DataFrame.
+
+Usage:
+    python benchmarks/bench_scoring.py [rows]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import main  # noqa: E402
+from synthetic import make_leads_df  # noqa: E402
+
+
+def main_():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = make_leads_df(rows)
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    weights = dict(main.DEFAULT_SCORING_WEIGHTS, industry={"Banking": 1.5}, location={"New Maadi": 1})
+
+    main.score_leads(df.head(100), weights)  # warm-up
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        main.score_leads(df, weights)
+        timings.append(time.perf_counter() - start)
+
+    print(f"score_leads on {rows:,} rows: best {min(timings) * 1000:.1f} ms, "
+          f"median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,196 @@
+"""Benchmark: cold start - importing the app, the first Lead Form render and submission, the first dashboard.
+
+Every measurement runs in a fresh Python process, so module imports and
+process-wide caches are really cold. The app runs through Streamlit's AppTest
+against the latency-injecting fake gspread client (see fake_gspread.py): the
+form once without and once with the start-up warm-up (WARMUP_ON_START), the
+dashboard once without and once with the snapshot a previous process saved
+to disk (SNAPSHOT_FILE). fake_gspread imports gspread up front, so the
+timings never include importing it.
+
+Reported per run:
+- import_main_ms      `import main`, and which heavy modules that pulled in
+- import_heavy_ms     importing pandas, numpy, gspread and google-auth (what the form page avoids)
+- form_render_ms      first Lead Form run of the first session, including `import main`
+- first_submit_ms     the first submission's rerun (after --think seconds of "typing")
+- first_write_ms      submit click until the row is in the sheet (includes WRITE_FLUSH_INTERVAL)
+- first_dashboard_ms  opening the app and going straight to the Admin Dashboard, including `import main`
+
+Usage:
+    python benchmarks/bench_startup.py --rows 10000 --latency 0.1 --out startup_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ["pandas", "numpy", "gspread", "google.oauth2"]
+
+
+def child_import():
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    start = time.perf_counter()
+    import main  # noqa: F401
+    elapsed = time.perf_counter() - start
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    start = time.perf_counter()
+    import pandas  # noqa: F401
+    import numpy  # noqa: F401
+    import gspread  # noqa: F401
+    import google.oauth2.service_account  # noqa: F401
+    heavy = time.perf_counter() - start
+    return {"import_main_ms": round(elapsed * 1000, 1), "heavy_modules_loaded": loaded,
+            "import_heavy_ms": round(heavy * 1000, 1)}
+
+
+def child_form(args):
+    sys.path.insert(0, HERE)
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    from streamlit.testing.v1 import AppTest
+
+    import fake_gspread
+    from synthetic import make_lead_rows
+
+    rows = make_lead_rows(args.rows)  # not timed
+    client = fake_gspread.FakeClient(latency=args.latency, latency_per_kb=args.latency_per_kb)
+    fake_gspread.CURRENT_CLIENT = client
+    at = AppTest.from_file(os.path.join(HERE, "app_harness.py"), default_timeout=600)
+
+    # Streamlit executes main.py on the first run, so the first render includes importing it
+    start = time.perf_counter()
+    import main
+    main.WARMUP_ON_START = args.warmup
+    main.OUTBOX_DB_FILE = os.path.join(args.workdir, f"outbox-{time.time_ns()}.db")
+    main.SNAPSHOT_FILE = None
+    sheet = client.spreadsheet(main.SPREADSHEET_ID).seed(main.WORKSHEET_NAME, [main.LEAD_HEADERS] + rows)
+    at.run()
+    render = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    time.sleep(args.think)
+    at.text_input[0].set_value("Startup Benchmark Co")
+    at.text_input[4].set_value("Bench Contact")
+    start = time.perf_counter()
+    at.button[0].click().run()
+    submit = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    while sheet.rows[-1][1] != "Startup Benchmark Co" and time.perf_counter() - start < 120:
+        time.sleep(0.01)
+    write = time.perf_counter() - start
+    return {"form_render_ms": round(render * 1000, 1), "first_submit_ms": round(submit * 1000, 1),
+            "first_write_ms": round(write * 1000, 1), "api_calls": dict(client.stats)}
+
+
+def child_dashboard(args):
+    sys.path.insert(0, HERE)
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    from streamlit.testing.v1 import AppTest
+
+    import fake_gspread
+    from synthetic import make_lead_rows
+
+    rows = make_lead_rows(args.rows)  # not timed
+    client = fake_gspread.FakeClient(latency=args.latency, latency_per_kb=args.latency_per_kb)
+    fake_gspread.CURRENT_CLIENT = client
+    at = AppTest.from_file(os.path.join(HERE, "app_harness.py"), default_timeout=600)
+    at.session_state["is_admin"] = True
+    at.session_state["login_time"] = time.time()
+
+    start = time.perf_counter()
+    import main
+    main.OUTBOX_DB_FILE = os.path.join(args.workdir, f"outbox-{time.time_ns()}.db")
+    main.SNAPSHOT_FILE = args.snapshot_file
+    client.spreadsheet(main.SPREADSHEET_ID).seed(main.WORKSHEET_NAME, [main.LEAD_HEADERS] + rows)
+    at.run()
+    at.sidebar.radio[0].set_value("Admin Dashboard").run()
+    dashboard = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    # Let the background fetch finish and save the snapshot for the next process
+    disk = main.get_disk_snapshot()
+    while disk is not None and not disk.saved_at and time.perf_counter() - start < 300:
+        time.sleep(0.05)
+    return {"first_dashboard_ms": round(dashboard * 1000, 1),
+            "total_leads": next((m.value for m in at.metric if "Total Leads" in m.label), None),
+            "api_calls": dict(client.stats)}
+
+
+def run_child(argv):
+    output = subprocess.check_output([sys.executable, __file__, *argv], text=True, stderr=subprocess.DEVNULL)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="leads already in the sheet")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per fake Sheets API call")
+    parser.add_argument("--latency-per-kb", type=float, default=0.0005, help="extra seconds per KB transferred")
+    parser.add_argument("--think", type=float, default=2.0, help="seconds between opening the form and submitting")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement")
+    parser.add_argument("--out", default="startup_results.json")
+    parser.add_argument("--child", choices=["import", "form", "dashboard"], help=argparse.SUPPRESS)
+    parser.add_argument("--warmup", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot-file", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "import":
+        print(json.dumps(child_import()))
+        return
+    if args.child == "form":
+        print(json.dumps(child_form(args)))
+        return
+    if args.child == "dashboard":
+        print(json.dumps(child_dashboard(args)))
+        return
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "results": [],
+    }
+    report["results"] += [dict(run_child(["--child", "import"]), scenario="import") for _ in range(args.repeat)]
+    with tempfile.TemporaryDirectory() as workdir:
+        for warmup in (0, 1):
+            form_args = ["--child", "form", "--warmup", str(warmup), "--workdir", workdir,
+                         "--rows", str(args.rows), "--latency", str(args.latency),
+                         "--latency-per-kb", str(args.latency_per_kb), "--think", str(args.think)]
+            report["results"] += [dict(run_child(form_args), scenario="warmup" if warmup else "no-warmup")
+                                  for _ in range(args.repeat)]
+
+        dashboard_args = ["--child", "dashboard", "--workdir", workdir, "--rows", str(args.rows),
+                          "--latency", str(args.latency), "--latency-per-kb", str(args.latency_per_kb)]
+        report["results"] += [dict(run_child(dashboard_args + ["--snapshot-file", ""]), scenario="no-snapshot")
+                              for _ in range(args.repeat)]
+        snapshot_file = os.path.join(workdir, "leads_snapshot.parquet")
+        run_child(dashboard_args + ["--snapshot-file", snapshot_file])  # saves the first snapshot
+        report["results"] += [dict(run_child(dashboard_args + ["--snapshot-file", snapshot_file]), scenario="snapshot")
+                              for _ in range(args.repeat)]
+
+    for scenario in ("import", "no-warmup", "warmup", "no-snapshot", "snapshot"):
+        runs = [r for r in report["results"] if r["scenario"] == scenario]
+        metrics = [key for key in runs[0] if key.endswith("_ms")]
+        summary = "  ".join(f"{key} {sorted(r[key] for r in runs)[len(runs) // 2]:>8.1f}" for key in metrics)
+        print(f"{scenario:<10} {summary}")
+        if scenario == "import":
+            print(f"{'':<10} heavy modules loaded by `import main`: {runs[0]['heavy_modules_loaded'] or 'none'}")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out} (medians above)")
+
+
+if __name__ == "__main__":
+    main_()
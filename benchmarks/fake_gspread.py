@@ -0,0 +1,213 @@
+"""In-memory stand-in for gspread with configurable latency, quota and errors.
+
+FakeClient / FakeSpreadsheet / FakeWorksheet implement the subset of the
+gspread API the app uses. Every API call:
+- sleeps `latency` seconds (plus `latency_per_kb` per KB of payload),
+- counts against a per-minute read or write quota (429 once exhausted),
+- fails with a transient 429/503 with probability `error_rate`.
+Calls and bytes are recorded in `FakeClient.stats`.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import gspread
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+
+class _FakeResponse:
+    """Just enough of requests.Response for gspread.exceptions.APIError"""
+
+    def __init__(self, code, message):
+        self.status_code = code
+        self._error = {"code": code, "message": message, "status": "FAKE"}
+        self.text = json.dumps({"error": self._error})
+
+    def json(self):
+        return {"error": self._error}
+
+
+def api_error(code, message):
+    return gspread.exceptions.APIError(_FakeResponse(code, message))
+
+
+class FakeBackend:
+    """Latency, quota and error model shared by everything behind one FakeClient"""
+
+    def __init__(self, latency=0.0, latency_per_kb=0.0, error_rate=0.0,
+                 read_quota_per_minute=None, write_quota_per_minute=None, seed=0):
+        self.latency = latency
+        self.latency_per_kb = latency_per_kb
+        self.error_rate = error_rate
+        self.read_quota_per_minute = read_quota_per_minute
+        self.write_quota_per_minute = write_quota_per_minute
+        self.stats = Counter()
+        self._calls = {"read": deque(), "write": deque()}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, name, kind, payload=None):
+        size = len(json.dumps(payload)) if payload is not None else 0
+        time.sleep(self.latency + self.latency_per_kb * size / 1024)
+        with self._lock:
+            self.stats[f"calls.{name}"] += 1
+            self.stats[f"bytes.{kind}"] += size
+            quota = self.read_quota_per_minute if kind == "read" else self.write_quota_per_minute
+            window = self._calls[kind]
+            now = time.time()
+            while window and now - window[0] > 60:
+                window.popleft()
+            if quota is not None and len(window) >= quota:
+                self.stats["errors.429_quota"] += 1
+                raise api_error(429, f"Quota exceeded for {kind} requests per minute")
+            window.append(now)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                code = self._rng.choice([429, 503])
+                self.stats[f"errors.{code}_injected"] += 1
+                raise api_error(code, "Injected transient error")
+
+
+class FakeWorksheet:
+    def __init__(self, backend, title, rows=None, sheet_id=0):
+        self.backend = backend
+        self.title = title
+        self.id = sheet_id
+        self.rows = [[str(value) for value in row] for row in (rows or [])]
+        self._lock = threading.Lock()
+
+    @property
+    def row_count(self):
+        return max(len(self.rows), 1000)
+
+    def _range(self, range_name):
+        grid = a1_range_to_grid_range(range_name)
+        with self._lock:
+            r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(self.rows))
+            c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex", None)
+            return [list(row[c0:c1]) for row in self.rows[r0:r1]]
+
+    # ---- reads
+    def get_all_values(self, *args, **kwargs):
+        with self._lock:
+            values = [list(row) for row in self.rows]
+        self.backend.call("get_all_values", "read", values)
+        return values
+
+    def get_all_records(self, *args, **kwargs):
+        values = self.get_all_values()
+        if not values:
+            return []
+        return [dict(zip(values[0], row)) for row in values[1:]]
+
+    def get_values(self, range_name=None, *args, **kwargs):
+        values = self._range(range_name) if range_name else [list(row) for row in self.rows]
+        self.backend.call("get_values", "read", values)
+        return values
+
+    def get(self, range_name=None, *args, **kwargs):
+        return self.get_values(range_name)
+
+    def batch_get(self, ranges, *args, **kwargs):
+        values = [self._range(range_name) for range_name in ranges]
+        self.backend.call("batch_get", "read", values)
+        return values
+
+    def row_values(self, row, *args, **kwargs):
+        with self._lock:
+            values = list(self.rows[row - 1]) if row <= len(self.rows) else []
+        while values and values[-1] == "":
+            values.pop()
+        self.backend.call("row_values", "read", values)
+        return values
+
+    def col_values(self, col, *args, **kwargs):
+        with self._lock:
+            values = [row[col - 1] if len(row) >= col else "" for row in self.rows]
+        while values and values[-1] == "":
+            values.pop()
+        self.backend.call("col_values", "read", values)
+        return values
+
+    # ---- writes
+    def append_row(self, values, *args, **kwargs):
+        self.append_rows([values])
+
+    def append_rows(self, values, *args, **kwargs):
+        self.backend.call("append_rows", "write", values)
+        with self._lock:
+            self.rows.extend([str(value) for value in row] for row in values)
+        self.backend.stats["rows_appended"] += len(values)
+
+    def update(self, values=None, range_name=None, *args, **kwargs):
+        self.backend.call("update", "write", values)
+        grid = a1_range_to_grid_range(range_name or rowcol_to_a1(1, 1))
+        with self._lock:
+            for i, row_values in enumerate(values):
+                r = grid.get("startRowIndex", 0) + i
+                while len(self.rows) <= r:
+                    self.rows.append([])
+                row = self.rows[r]
+                for j, value in enumerate(row_values):
+                    c = grid.get("startColumnIndex", 0) + j
+                    row.extend([""] * (c + 1 - len(row)))
+                    row[c] = str(value)
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend, key):
+        self.backend = backend
+        self.id = key
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    def worksheet(self, title):
+        self.backend.call("worksheet", "read")
+        try:
+            return self._worksheets[title]
+        except KeyError:
+            raise gspread.WorksheetNotFound(title)
+
+    def worksheets(self):
+        self.backend.call("worksheets", "read")
+        return list(self._worksheets.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, *args, **kwargs):
+        self.backend.call("add_worksheet", "write")
+        with self._lock:
+            if title in self._worksheets:
+                raise api_error(400, f'A sheet with the name "{title}" already exists.')
+            ws = FakeWorksheet(self.backend, title, sheet_id=len(self._worksheets))
+            self._worksheets[title] = ws
+            return ws
+
+    def seed(self, title, rows):
+        """Create/replace a worksheet without going through the API model"""
+        ws = FakeWorksheet(self.backend, title, rows, sheet_id=len(self._worksheets))
+        self._worksheets[title] = ws
+        return ws
+
+
+class FakeClient:
+    def __init__(self, **backend_options):
+        self.backend = FakeBackend(**backend_options)
+        self._spreadsheets = {}
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    def open_by_key(self, key):
+        self.backend.call("open_by_key", "read")
+        return self.spreadsheet(key)
+
+    def spreadsheet(self, key):
+        """The spreadsheet behind `key`, created on first use (no API call)"""
+        if key not in self._spreadsheets:
+            self._spreadsheets[key] = FakeSpreadsheet(self.backend, key)
+        return self._spreadsheets[key]
+
+
+# The client used by benchmark apps (see app_harness.py); set by the benchmark driver
+CURRENT_CLIENT = None
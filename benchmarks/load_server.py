@@ -0,0 +1,58 @@
+"""Streamlit script served by bench_load.py: the real app, wired to fake_gspread.
+
+Run with `streamlit run`; the driver passes the fake backend's settings as JSON in
+the BENCH_LOAD_CONFIG environment variable (FakeClient arguments, leads to seed, work
+directory, drain timeout). Opened with ?report=<file>, it waits for the lead writer to
+drain and writes what reached the sheet (companies, when each landed, API calls) to
+<file> as JSON instead of showing the app.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import streamlit as st  # noqa: E402
+
+import fake_gspread  # noqa: E402
+import main  # noqa: E402
+from synthetic import make_lead_rows  # noqa: E402
+
+CONFIG = json.loads(os.environ["BENCH_LOAD_CONFIG"])
+
+
+@st.cache_resource
+def fake_backend():
+    """The fake spreadsheet shared by every session, and when each lead landed in it"""
+    client = fake_gspread.FakeClient(**CONFIG["client"])
+    sheet = client.spreadsheet(main.SPREADSHEET_ID).seed(
+        main.WORKSHEET_NAME, [main.LEAD_HEADERS] + make_lead_rows(CONFIG["rows"], seed=CONFIG["client"]["seed"]))
+    landed = {}
+    append_rows = sheet.append_rows
+
+    def timed_append_rows(values, *a, **kw):
+        append_rows(values, *a, **kw)
+        now = time.time()
+        for row in values:
+            landed.setdefault(row[1], now)
+
+    sheet.append_rows = timed_append_rows
+    return client, sheet, landed
+
+
+main.OUTBOX_DB_FILE = os.path.join(CONFIG["workdir"], "outbox.db")
+main.SNAPSHOT_FILE = os.path.join(CONFIG["workdir"], "snapshot.parquet")
+client, sheet, landed = fake_backend()
+main.get_gsheet_client = lambda: client
+
+report_file = st.query_params.get("report")
+if report_file:
+    drained = main.get_lead_writer().flush(timeout=CONFIG["drain_timeout"])
+    with open(report_file, "w") as f:
+        json.dump({"drained": drained, "companies": [row[1] for row in sheet.rows],
+                   "landed": landed, "api_calls": dict(client.stats)}, f)
+    st.write("Report written")
+else:
+    main.main()
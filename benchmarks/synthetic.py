@@ -0,0 +1,99 @@
+"""Synthetic lead generator with realistic field distributions.
+
+Rows come out in LEAD_HEADERS order (Lead ID last), as strings, exactly like
+the lead form writes them, so they can be loaded into any lead store or fake
+worksheet.
+"""
+import random
+from datetime import datetime, timedelta
+
+INDUSTRIES = [
+    ("Software", 22), ("Banking", 14), ("Education", 10), ("Healthcare", 9),
+    ("Telecom", 7), ("Real Estate", 7), ("Pharmaceuticals", 6), ("FMCG", 6),
+    ("Government", 4), ("Consulting", 5), ("Logistics", 4), ("", 6),
+]
+LOCATIONS = [
+    ("New Maadi", 30), ("Zahraa El Maadi", 18), ("Maadi Degla", 14), ("Old Maadi", 10),
+    ("Sarayat El Maadi", 6), ("Nasr City", 5), ("New Cairo", 7), ("Heliopolis", 4), ("", 6),
+]
+SIZES = [
+    ("{n} employees", 40), ("{n}-{m} employees", 25), ("{n}+", 8), ("~{n}", 5),
+    ("{k}k", 4), ("{n}", 8), ("", 10),
+]
+INTEREST = [("Low", 35), ("Medium", 40), ("High", 25)]
+ROLES = ["HR Manager", "HR Specialist", "CEO", "Office Manager", "Talent Acquisition", "COO", "Admin", ""]
+COMPANY_WORDS = [
+    "Nile", "Delta", "Cairo", "Pyramid", "Horizon", "Falcon", "Orbit", "Summit", "Lotus", "Sphinx",
+    "Alpha", "Green", "Blue", "Smart", "United", "Global", "Misr", "Al Amal", "El Nour", "Capital",
+]
+COMPANY_SUFFIXES = ["Corp", "Group", "Solutions", "Systems", "Holding", "Bank", "Academy", "Labs", "Co.", "Partners"]
+ARABIC_COMPANIES = ["شركة الأمل", "مؤسسة النور", "مجموعة النيل", "شركة مصر للتقنية", "أكاديمية المعادي"]
+FIRST_NAMES = ["Ahmed", "Mona", "Omar", "Sara", "Youssef", "Nour", "Karim", "Salma", "Hany", "Laila", "أحمد", "منى"]
+LAST_NAMES = ["Hassan", "Ali", "Farouk", "Mahmoud", "Saleh", "Naguib", "Fahmy", "Ibrahim", "حسن"]
+NOTE_SENTENCES = [
+    "Interested in a corporate package for the whole team.",
+    "Asked for a discount on annual memberships.",
+    "Follow up next month after budget approval.",
+    "They already have a gym partnership that ends in March.",
+    "Wants a site visit before deciding.",
+    "HR will share the proposal with management.",
+    "Employees are mostly in New Maadi, close to the branch.",
+    "مهتمين بباقة الشركات",
+]
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _size(rng):
+    template = _weighted(rng, SIZES)
+    n = int(rng.lognormvariate(4, 1.2)) + 1
+    return template.format(n=n, m=n * rng.choice([2, 3, 5]), k=max(1, n // 100))
+
+
+def _company(rng, i):
+    if rng.random() < 0.05:
+        return f"{rng.choice(ARABIC_COMPANIES)} {i}"
+    return f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)} {i}"
+
+
+def _notes(rng):
+    if rng.random() < 0.4:
+        return ""
+    notes = " ".join(rng.choice(NOTE_SENTENCES) for _ in range(rng.randint(1, 12)))
+    return notes[:1000]
+
+
+def make_lead_rows(n, seed=0, now=None, days=730):
+    """n synthetic leads spread over the last `days` days (denser towards today)"""
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    rows = []
+    for i in range(n):
+        age = timedelta(days=days * rng.random() ** 2, seconds=rng.randint(0, 86399))
+        contact = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        rows.append([
+            (now - age).strftime("%Y-%m-%d %H:%M:%S"),
+            _company(rng, i),
+            _weighted(rng, INDUSTRIES),
+            _size(rng),
+            _weighted(rng, LOCATIONS),
+            contact,
+            rng.choice(ROLES),
+            f"https://linkedin.com/in/{contact.lower().replace(' ', '-')}-{i}" if rng.random() < 0.6 else "",
+            _weighted(rng, INTEREST),
+            _notes(rng),
+            f"synthetic-{seed}-{i}",
+        ])
+    rows.sort(key=lambda row: row[0])  # the sheet is append-only, so rows arrive in time order
+    return rows
+
+
+def make_leads_df(n, seed=0):
+    """Synthetic leads as a DataFrame with LEAD_HEADERS columns"""
+    import pandas as pd
+    from main import LEAD_HEADERS
+
+    return pd.DataFrame(make_lead_rows(n, seed), columns=LEAD_HEADERS)
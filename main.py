@@ -1,11 +1,47 @@
 import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import time
 import hashlib
 import re
+import bisect
+import sys
+import io
+import math
+import importlib.util
+import threading
+import random
+import functools
+import abc
+import sqlite3
+import json
+import uuid
+import os
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    pandas, numpy and gspread take most of a cold start, and the public Lead
+    Form page needs none of them, so they are imported by the first code path
+    that actually uses pd / np / gspread.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)  # later lookups don't go through __getattr__
+        return value
+
+
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+gspread = LazyModule("gspread")
 
 # =========================
 # CONFIG
@@ -25,9 +61,350 @@ SESSION_TIMEOUT = 3600  # 1 hour
 
 # Rate limiting
 MAX_SUBMISSIONS_PER_HOUR = 10  # Maximum form submissions per hour from same user
+RATE_LIMIT_MAX_KEYS = 10_000  # clients tracked by the submission limiter (least recently seen dropped first)
+SHEETS_WRITE_QUOTA_PER_MINUTE = 60  # Sheets API write requests per minute (per service account)
+MAX_QUEUED_LEADS = 1000  # leads waiting to be written before new submissions are turned away
+# Proxies in front of the app that append the caller's address to X-Forwarded-For. The
+# client IP is the entry the outermost of them added; anything left of it is sent by the
+# client and can be forged. 0 = no proxy: ignore the header (any client could set it) and
+# use the connection's address, or the browser session for local connections.
+# Override in secrets: [rate_limit] trusted_proxy_hops = 1
+TRUSTED_PROXY_HOPS = 0
 
 SERVICE_ACCOUNT_FILE = "creds.json"  # ملف الـ Service Account
 
+# Lead scoring (see LEAD SCORING); override any weight in secrets under [scoring]
+INTEREST_SCORES = {"Low": 1, "Medium": 2, "High": 3}
+DEFAULT_SCORING_WEIGHTS = {
+    "interest": 1.0,    # Low=1, Medium=2, High=3
+    "headcount": 1.0,   # company size parsed from "Size", 0..1 on a log scale
+    "recency": 1.0,     # 1 for a lead added now, halving every RECENCY_HALF_LIFE_DAYS
+    "industry": {},     # bonus per industry, e.g. {"Banking": 1.5}
+    "location": {},     # bonus per location, e.g. {"New Maadi": 1}
+}
+HEADCOUNT_CAP = 1000          # companies this size or bigger get the full headcount score
+RECENCY_HALF_LIFE_DAYS = 14
+
+# "All Leads" list
+LEADS_PAGE_SIZES = [10, 25, 50, 100]
+LEADS_PAGE_SIZE = 25   # default page size, must be one of LEADS_PAGE_SIZES
+LEAD_SORT_OPTIONS = {"⭐ Score": "Lead Score", "🕒 Newest": "Timestamp"}
+
+# Dashboard search: "substring" matches anywhere in a lead's text, "tokens" matches word prefixes
+SEARCH_MODE = "substring"
+SEARCH_COLUMNS = ["Company Name", "HR/Contact Name", "Industry", "Location", "Role", "Notes"]
+
+# Duplicate detection: company names match when their trigram similarity (Dice) reaches
+# DUPLICATE_THRESHOLD (after dropping legal-form words), or when the LinkedIn profile is the same
+DUPLICATE_THRESHOLD = 0.8
+DUPLICATE_WINDOW = 10             # neighbours (in name order) compared for the dashboard's duplicate groups
+DUPLICATE_REFRESH_INTERVAL = 30   # seconds the index is reused before syncing it with the leads again
+DUPLICATE_GROUPS_SHOWN = 50
+COMPANY_NAME_STOPWORDS = {
+    "the", "co", "company", "corp", "corporation", "inc", "llc", "ltd", "limited",
+    "group", "holding", "holdings", "sae", "شركه", "مجموعه", "موسسه",  # as normalize_search_text spells them
+}
+
+# Lead trends: daily lead counts per value of these columns, kept up to date as rows arrive
+ROLLUP_DIMENSIONS = ["Interest Level", "Industry", "Location"]
+TREND_GRANULARITIES = {  # pandas bucket frequency, rolling window in buckets, bucket name
+    "Daily": ("D", 7, "day"),
+    "Weekly": ("W-MON", 4, "week"),
+    "Monthly": ("MS", 3, "month"),
+}
+TREND_TOP_VALUES = 6  # lines per trend chart
+TREND_DEFAULT_DAYS = 90
+
+# Dashboard period: how far back the metrics, charts and lead list look. With worksheet
+# sharding only the monthly worksheets overlapping the period are read.
+DASHBOARD_PERIODS = {"All time": None, "Last 30 days": 30, "Last 90 days": 90, "Last 12 months": 365}
+
+# Dashboard aggregate cache (KPIs, charts, filter results), shared by all admin sessions
+AGGREGATE_CACHE_MAX_ENTRIES = 256
+AGGREGATE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# The prepared leads frame of each period is as big as the dataset, so it is kept outside
+# the byte budget, in one of this many slots (one per dashboard period)
+AGGREGATE_CACHE_MAX_FRAMES = len(DASHBOARD_PERIODS)
+
+# Export: format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+EXPORT_CHUNK_ROWS = 50_000   # rows encoded at a time when building an export
+
+# Sheet columns, in the order rows are written by the lead form
+LEAD_HEADERS = [
+    "Timestamp",
+    "Company Name",
+    "Industry",
+    "Size",
+    "Location",
+    "HR/Contact Name",
+    "Role",
+    "LinkedIn Link",
+    "Interest Level",
+    "Notes",
+    "Lead ID",  # unique per submission, lets the writer retry without duplicating rows
+]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # as written by the lead form
+
+# Dashboard DataFrame dtypes, enforced once per data version by normalize_leads():
+# low-cardinality columns as categories (compact, fast value_counts/isin), free text as strings
+LEAD_SCHEMA = {
+    "Timestamp": "datetime",
+    "Company Name": "text",
+    "Industry": "category",
+    "Size": "text",
+    "Location": "category",
+    "HR/Contact Name": "text",
+    "Role": "category",
+    "LinkedIn Link": "text",
+    "Interest Level": "category",
+    "Notes": "text",
+    "Lead ID": "text",
+}
+
+# Columns the "sheets" backend leaves out of the dashboard load (long free text); the rest
+# are read as column ranges in one batch_get. A lazy column is read for a lead when it is
+# opened (and cached per row), and for every lead only when searching or exporting.
+# "LinkedIn Link" can be added too, but duplicate detection then can't match on it.
+# Override in secrets: [storage] lazy_columns = ["Notes", "LinkedIn Link"]
+LAZY_COLUMNS = ["Notes"]
+ROW_REF_COLUMN = "Sheet Row"   # "Worksheet!row" of each row loaded without its lazy columns
+LAZY_ROW_READ_LIMIT = 50       # up to this many rows are read cell by cell, more as whole columns
+LAZY_CACHE_MAX_ROWS = 2000     # lazy values of opened leads kept per store
+
+# Incremental sync only sees appended rows; force a full reload this often
+# so in-place edits made directly in the sheet still show up (in seconds)
+FULL_RELOAD_INTERVAL = 600
+
+# Background lead writer: submissions are batched into one append_rows call
+WRITE_BATCH_SIZE = 25        # flush as soon as this many rows are waiting
+WRITE_FLUSH_INTERVAL = 2.0   # ...or once the oldest waiting row is this old (seconds)
+WRITE_MAX_BATCH_SIZE = 500   # rows per append_rows call when a backlog (e.g. a bulk import) is waiting
+WRITE_BACKOFF_BASE = 1.0     # first retry delay after a failed write (seconds)
+WRITE_BACKOFF_MAX = 64.0     # cap for the exponential backoff
+WRITE_MAX_ATTEMPTS = 5       # give up on a batch after this many non-quota errors
+
+# Bulk import (admin page): CSV/XLSX files with the lead form's columns
+IMPORT_MAX_ROWS = 20_000
+IMPORT_COLUMN_ALIASES = {  # other common headers -> LEAD_HEADERS
+    "Company": "Company Name",
+    "Contact": "HR/Contact Name",
+    "Contact Name": "HR/Contact Name",
+    "HR Contact": "HR/Contact Name",
+    "LinkedIn": "LinkedIn Link",
+    "Interest": "Interest Level",
+}
+IMPORT_LEAD_ID_PREFIX = "import-"  # imported rows don't count towards MAX_QUEUED_LEADS
+# Dates in imported files: ISO (2026-10-05), day first (05/10/2026 is 5 October; also with - or .)
+# or with a month name; anything else is reported as an error instead of being guessed
+IMPORT_DATE_FORMATS = ["%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y"]
+
+# Lead storage backend: "sheets" (Google Sheets), "sqlite" (local database) or "memory".
+# Override in secrets: [storage] backend = "sqlite", path = "leads.db"
+STORAGE_BACKEND = "sheets"
+LEADS_DB_FILE = "leads.db"
+
+# Worksheet sharding for the "sheets" backend (opt-in): new leads go to one worksheet per
+# month ("Leads_2026_10"), listed in SHARD_MANIFEST_WORKSHEET; older months are read once.
+# Override in secrets: [storage] shard_by_month = true
+SHARD_BY_MONTH = False
+SHARD_MANIFEST_WORKSHEET = "Leads_Manifest"
+SHARD_READ_WORKERS = 4        # shards fetched in parallel
+SHARD_FREEZE_GRACE = 3600     # seconds into a new month before last month's shard counts as frozen
+
+# Diagnostics: per-rerun timing spans and Sheets call counts, shown to admins in the sidebar.
+# Override in secrets: [diagnostics] enabled = true, log_file = "traces.jsonl"
+TRACING_ENABLED = False
+TRACE_LOG_FILE = None   # JSON-lines file, one record per traced rerun
+TRACE_WINDOW = 200      # reruns kept per span for the rolling p50/p95
+
+# Start-up warm-up: authorize the Sheets client and open the worksheet on a background
+# thread when the app process starts, so the first visitor doesn't wait for them.
+# (The duplicate index is always built in the background.) Override in secrets: [startup] warmup = true
+WARMUP_ON_START = False
+
+# Leads snapshot shared by all sessions: served up to this many seconds old, then
+# revalidated in the background while the old copy is still served
+SNAPSHOT_TTL = 30
+
+# The all-time snapshot is also kept on disk (Parquet, needs pyarrow), so after a restart the
+# dashboard renders from it right away while Sheets is read in the background. Rewritten
+# atomically when the data changed, at most every SNAPSHOT_SAVE_INTERVAL seconds; not kept
+# over SNAPSHOT_MAX_BYTES. Override in secrets: [snapshot] file = "leads_snapshot.parquet"
+# (file = "" turns it off)
+SNAPSHOT_FILE = "leads_snapshot.parquet"
+SNAPSHOT_SAVE_INTERVAL = 300
+SNAPSHOT_MAX_BYTES = 256 * 1024 * 1024
+SNAPSHOT_FORMAT = 1  # bump when the saved frame's layout changes, older files are then ignored
+
+# Local outbox: every lead is committed here before it is written to the lead store
+OUTBOX_DB_FILE = "lead_outbox.db"
+OUTBOX_RETENTION_DAYS = 30   # replicated rows are kept this long, then pruned
+
+
+# =========================
+# DIAGNOSTICS
+# =========================
+
+# Spans are recorded into the trace of the current rerun (a thread-local set up
+# by main()). When tracing is off there is no trace and span() returns a shared
+# no-op object, so instrumented code pays one attribute lookup.
+_trace_state = threading.local()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_bytes(self, payload):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.spans.append((self.name, time.perf_counter() - self.start))
+        return False
+
+    def add_bytes(self, payload):
+        """Count the (JSON) size of an API response/request towards this rerun"""
+        self.trace.api_bytes += len(json.dumps(payload, default=str))
+
+
+class RerunTrace:
+    def __init__(self):
+        self.spans = []       # (name, seconds)
+        self.api_calls = 0
+        self.api_bytes = 0
+
+
+def span(name, api=False):
+    """Time a block: `with span("sheets.get_all_values", api=True) as s: ...`"""
+    trace = getattr(_trace_state, "trace", None)
+    if trace is None:
+        return _NULL_SPAN
+    if api:
+        trace.api_calls += 1
+    return _Span(trace, name)
+
+
+def traced(name):
+    """Decorator version of span()"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Tracer:
+    """Process-wide rolling timings (p50/p95 per span) and optional JSON-lines log"""
+
+    def __init__(self, enabled=TRACING_ENABLED, log_file=TRACE_LOG_FILE, window=TRACE_WINDOW):
+        self.enabled = enabled
+        self.log_file = log_file
+        self.window = window
+        self.last_rerun = None
+        self._durations = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace, page):
+        totals = {}
+        for name, seconds in trace.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        with self._lock:
+            for name, seconds in totals.items():
+                self._durations.setdefault(name, deque(maxlen=self.window)).append(seconds)
+            self.last_rerun = {
+                "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "page": page,
+                "spans_ms": {name: round(seconds * 1000, 2) for name, seconds in totals.items()},
+                "api_calls": trace.api_calls,
+                "api_bytes": trace.api_bytes,
+            }
+            if self.log_file:
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self.last_rerun, ensure_ascii=False) + "\n")
+
+    def summary(self):
+        """[{span, calls, p50_ms, p95_ms, last_ms}] over the rolling window"""
+        rows = []
+        with self._lock:
+            for name, durations in sorted(self._durations.items()):
+                ordered = sorted(durations)
+                rows.append({
+                    "span": name,
+                    "calls": len(ordered),
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                    "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                    "last_ms": round(durations[-1] * 1000, 1),
+                })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self.last_rerun = None
+
+
+@st.cache_resource
+def get_tracer():
+    config = {}
+    try:
+        config = dict(st.secrets["diagnostics"])
+    except Exception:
+        pass
+    return Tracer(enabled=bool(config.get("enabled", TRACING_ENABLED)),
+                  log_file=config.get("log_file", TRACE_LOG_FILE))
+
+
+def start_trace(tracer):
+    _trace_state.trace = RerunTrace() if tracer.enabled else None
+
+
+def finish_trace(tracer, page):
+    trace = getattr(_trace_state, "trace", None)
+    _trace_state.trace = None
+    if trace is not None:
+        tracer.record(trace, page)
+
+
+def traced_fragment(fn):
+    """st.fragment whose own reruns (which skip main()) are traced as well"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if getattr(_trace_state, "trace", None) is not None:  # part of a full rerun
+            return fn(*args, **kwargs)
+        tracer = get_tracer()
+        start_trace(tracer)
+        try:
+            with span("rerun.fragment"):
+                return fn(*args, **kwargs)
+        finally:
+            finish_trace(tracer, f"{fn.__name__} (fragment)")
+    return st.fragment(wrapper)
+
 
 # =========================
 # GOOGLE SHEETS HELPERS
@@ -35,6 +412,8 @@ SERVICE_ACCOUNT_FILE = "creds.json"  # ملف الـ Service Account
 
 @st.cache_resource
 def get_gsheet_client():
+    from google.oauth2.service_account import Credentials
+
     scope = ['https://www.googleapis.com/auth/spreadsheets']
 
     # Try to load from Streamlit secrets first (for cloud deployment)
@@ -49,58 +428,1528 @@ def get_gsheet_client():
     return client
 
 
-def get_worksheet():
+@st.cache_resource
+def get_spreadsheet():
     client = get_gsheet_client()
-    sh = client.open_by_key(SPREADSHEET_ID)
+    with span("sheets.open_by_key", api=True):
+        return client.open_by_key(SPREADSHEET_ID)
+
+
+@st.cache_resource
+def get_worksheet():
+    sh = get_spreadsheet()
     try:
-        ws = sh.worksheet(WORKSHEET_NAME)
+        with span("sheets.worksheet", api=True):
+            ws = sh.worksheet(WORKSHEET_NAME)
     except gspread.WorksheetNotFound:
         ws = sh.add_worksheet(title=WORKSHEET_NAME, rows=1000, cols=30)
         # أول مرّة نضيف الـ header
-        headers = [
-            "Timestamp",
-            "Company Name",
-            "Industry",
-            "Size",
-            "Location",
-            "HR/Contact Name",
-            "Role",
-            "LinkedIn Link",
-            "Interest Level",
-            "Notes",
-        ]
-        ws.append_row(headers, value_input_option="RAW")
+        ws.append_row(LEAD_HEADERS, value_input_option="RAW")
+        return ws
+
+    # Sheets created by older versions are missing the newer columns (e.g. Lead ID)
+    with span("sheets.row_values", api=True):
+        header = ws.row_values(1)
+    if header and len(header) < len(LEAD_HEADERS) and header == LEAD_HEADERS[:len(header)]:
+        missing = LEAD_HEADERS[len(header):]
+        start = gspread.utils.rowcol_to_a1(1, len(header) + 1)
+        ws.update(range_name=start, values=[missing], value_input_option="RAW")
     return ws
 
 
-def append_lead_row(row):
-    ws = get_worksheet()
-    ws.append_row(row, value_input_option="USER_ENTERED")
+class LeadSheetSync:
+    """Keeps a local copy of the Leads sheet and only downloads newly appended rows.
+
+    The sheet is append-only from the lead form, so on each sync we read column A
+    (cheap) and compare it with the rows we already have:
+    - same values  -> nothing changed, reuse the cached DataFrame
+    - more values  -> fetch just the new rows and append them
+    - anything else (rows edited/deleted/reordered) -> full reload
+    With lazy_columns, those columns are left out: the others are read as column
+    ranges in one batch_get, and every row gets its ROW_REF_COLUMN so the lazy
+    values can be read later (see LazyColumns). Column A is always read.
+    Works with any object exposing the gspread Worksheet read API, so it can be
+    driven by an in-memory fake worksheet.
+    """
+
+    def __init__(self, full_reload_interval=FULL_RELOAD_INTERVAL, lazy_columns=()):
+        self.full_reload_interval = full_reload_interval
+        self.lazy_columns = list(lazy_columns)
+        self.df = None
+        self.header = []
+        self.columns = []           # the header minus lazy_columns: what self.df holds
+        self.row_keys = []          # column A of every loaded data row
+        self.version = 0            # bumped whenever self.df changes
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.last_full_reload = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rows_seen(self):
+        return len(self.row_keys)
+
+    def sync(self, ws):
+        with self._lock:
+            if (self.df is None or not self.header
+                    or time.time() - self.last_full_reload > self.full_reload_interval):
+                self._full_reload(ws)
+                return self.df
+
+            with span("sheets.col_values", api=True) as s:
+                keys = ws.col_values(1)[1:]  # skip header
+                s.add_bytes(keys)
+            seen = self.rows_seen
+            if len(keys) < seen or keys[:seen] != self.row_keys:
+                self._full_reload(ws)
+            elif len(keys) > seen:
+                self._append_new_rows(ws, len(keys))
+            return self.df
+
+    def invalidate(self):
+        """Drop the cached copy so the next sync does a full reload"""
+        with self._lock:
+            self.df = None
+
+    def _full_reload(self, ws):
+        if self.lazy_columns:
+            header, rows = self._read_projected(ws, self.header or LEAD_HEADERS)
+        else:
+            with span("sheets.get_all_values", api=True) as s:
+                values = ws.get_all_values()
+                s.add_bytes(values)
+            header, rows = (values[0] if values else []), values[1:]
+        self.header = header
+        self.columns = [name for name in header if name not in self._lazy(header)]
+        self.df = self._to_df(rows, ws, 2)
+        self.row_keys = [row[0] if row else "" for row in rows]
+        self.last_full_reload = time.time()
+        self._bump_version()
+
+    def _append_new_rows(self, ws, total_rows):
+        # Sheet row 1 is the header, so data row N lives on sheet row N + 1
+        first = self.rows_seen + 2
+        if self.lazy_columns:
+            ranges, widths = self._ranges(self.header, first, total_rows + 1)
+            with span("sheets.batch_get", api=True) as s:
+                parts = ws.batch_get(["1:1"] + ranges)
+                s.add_bytes(parts)
+            if (list(parts[0][0]) if parts[0] else []) != list(self.header):
+                self._full_reload(ws)  # columns were added or moved: the ranges read the wrong ones
+                return
+            rows = _stitch_ranges(parts[1:], widths, total_rows + 2 - first)
+        else:
+            last = gspread.utils.rowcol_to_a1(total_rows + 1, max(len(self.header), 1))
+            with span("sheets.get_values", api=True) as s:
+                rows = ws.get_values(f"A{first}:{last}")
+                s.add_bytes(rows)
+        if not rows:
+            return
+        new_df = self._to_df(rows, ws, first)
+        self.df = new_df if self.df.empty else pd.concat([self.df, new_df], ignore_index=True)
+        self.row_keys.extend(row[0] if row else "" for row in rows)
+        self._bump_version()
+
+    def _read_projected(self, ws, header):
+        """(header, data rows without the lazy columns); header is the expected one, re-read if it changed"""
+        for _ in range(2):
+            ranges, widths = self._ranges(header, 2)
+            with span("sheets.batch_get", api=True) as s:
+                parts = ws.batch_get(["1:1"] + ranges)
+                s.add_bytes(parts)
+            actual = list(parts[0][0]) if parts[0] else []
+            if actual == list(header):
+                break
+            header = actual  # columns were added or moved: read again with the real layout
+        return header, _stitch_ranges(parts[1:], widths)
+
+    def _lazy(self, header):
+        return set(self.lazy_columns) - {header[0] if header else None}
+
+    def _ranges(self, header, first, last=None):
+        """A1 ranges (rows first..last, None = to the end) of the runs of non-lazy columns, and their widths"""
+        lazy = self._lazy(header)
+        runs = []
+        for col, name in enumerate(header, start=1):
+            if name in lazy:
+                continue
+            if runs and runs[-1][1] == col - 1:
+                runs[-1][1] = col
+            else:
+                runs.append([col, col])
+        end = "" if last is None else str(last)
+        return ([f"{gspread.utils.rowcol_to_a1(first, a)}:{gspread.utils.rowcol_to_a1(1, b)[:-1]}{end}"
+                 for a, b in runs], [b - a + 1 for a, b in runs])
+
+    def _bump_version(self):
+        self.version += 1
+        self.df.attrs["data_version"] = f"{self.instance_id}:{self.version}"
+
+    def _to_df(self, rows, ws, first):
+        """DataFrame of data rows starting at sheet row `first`"""
+        if not self.header:
+            return pd.DataFrame()
+        width = len(self.columns)
+        rows = [(list(row) + [""] * width)[:width] for row in rows]
+        df = pd.DataFrame(rows, columns=self.columns)
+        if self.lazy_columns:
+            df[ROW_REF_COLUMN] = [f"{ws.title}!{row}" for row in range(first, first + len(rows))]
+        return df
+
+
+def _stitch_ranges(parts, widths, count=None):
+    """Rows from side-by-side range reads; the API leaves out trailing empty rows and cells"""
+    if count is None:
+        count = max((len(part) for part in parts), default=0)
+    rows = []
+    for i in range(count):
+        row = []
+        for part, width in zip(parts, widths):
+            cells = list(part[i]) if i < len(part) else []
+            row.extend((cells + [""] * width)[:width])
+        rows.append(row)
+    return rows
+
+
+class LazyColumns:
+    """The lazy columns of a Sheets store (see LAZY_COLUMNS), read for given rows on demand.
+
+    Rows are addressed by their ROW_REF_COLUMN ("Worksheet!row"). A few rows (a
+    lead being opened) are read cell by cell and cached; more are read as whole
+    columns, one batch_get per worksheet. locate(worksheet name) returns the
+    worksheet, its header and when it was last fully reloaded (row numbers may
+    have moved since, so cached values from before don't count).
+    """
+
+    def __init__(self, columns, locate, max_cached=LAZY_CACHE_MAX_ROWS):
+        self.columns = list(columns)
+        self.locate = locate
+        self.max_cached = max_cached
+        self._cache = OrderedDict()  # (ref, reload time) -> values, least recently used first
+        self._lock = threading.Lock()
+
+    def load(self, refs):
+        """DataFrame of the lazy columns, indexed by ref"""
+        refs = list(dict.fromkeys(refs))
+        by_sheet = {}
+        for ref in refs:
+            name, _, row = ref.rpartition("!")
+            by_sheet.setdefault(name, []).append(int(row))
+
+        values = {}
+        for name, rows in by_sheet.items():
+            ws, header, loaded_at = self.locate(name)
+            missing = []
+            with self._lock:
+                for row in rows:
+                    key = (f"{name}!{row}", loaded_at)
+                    if key in self._cache:
+                        self._cache.move_to_end(key)
+                        values[key[0]] = self._cache[key]
+                    else:
+                        missing.append(row)
+            if not missing:
+                continue
+            read = self._read(ws, header, missing)
+            for row, cells in read.items():
+                values[f"{name}!{row}"] = cells
+            if len(missing) <= LAZY_ROW_READ_LIMIT:
+                with self._lock:
+                    for row, cells in read.items():
+                        self._cache[(f"{name}!{row}", loaded_at)] = cells
+                    while len(self._cache) > self.max_cached:
+                        self._cache.popitem(last=False)
+        return pd.DataFrame([values[ref] for ref in refs], index=pd.Index(refs), columns=self.columns)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _read(self, ws, header, rows):
+        """{row: [value per lazy column]}; columns missing from the sheet read as ''.
+
+        The header row is read along with the values; if the columns moved since
+        `header` was read, they are read again from the right place.
+        """
+        for _ in range(2):
+            positions = [header.index(col) + 1 if col in header else None for col in self.columns]
+            present = [col for col in positions if col]
+            if not present:
+                return {row: [""] * len(self.columns) for row in rows}
+            first, last = min(present), max(present)
+            width = last - first + 1
+            with span("sheets.batch_get", api=True) as s:
+                if len(rows) <= LAZY_ROW_READ_LIMIT:
+                    parts = ws.batch_get(["1:1"] + [f"{gspread.utils.rowcol_to_a1(row, first)}:"
+                                                    f"{gspread.utils.rowcol_to_a1(row, last)}" for row in rows])
+                    cells = {row: _stitch_ranges([part], [width], 1)[0] for row, part in zip(rows, parts[1:])}
+                else:
+                    parts = ws.batch_get(["1:1", f"{gspread.utils.rowcol_to_a1(2, first)}:"
+                                                 f"{gspread.utils.rowcol_to_a1(1, last)[:-1]}"])
+                    column_rows = _stitch_ranges(parts[1:], [width], max(rows) - 1)
+                    cells = {row: column_rows[row - 2] for row in rows}
+                s.add_bytes(parts)
+            actual = list(parts[0][0]) if parts[0] else []
+            if actual == list(header):
+                break
+            header = actual
+        return {row: [cells[row][col - first] if col else "" for col in positions] for row in rows}
+
+
+# =========================
+# LEAD STORES
+# =========================
+
+class LeadStore(abc.ABC):
+    """Where leads are kept. The app only talks to the store through this interface.
+
+    Every store can append rows and load everything as a DataFrame. Stores that
+    can answer queries themselves implement QueryableLeadStore as well.
+    """
+
+    name = "base"
+    lazy_columns = ()   # columns load_df leaves out; read with load_lazy_columns()
+
+    @abc.abstractmethod
+    def append_rows(self, rows):
+        """Append rows (LEAD_HEADERS order, Lead ID last)"""
+
+    @abc.abstractmethod
+    def load_df(self, since=None):
+        """All leads; df.attrs["data_version"] identifies the data.
+
+        `since` (a datetime) is a hint: stores that can cheaply skip older rows
+        may do so, callers still filter by Timestamp themselves.
+        """
+
+    @abc.abstractmethod
+    def existing_lead_ids(self, lead_ids):
+        """The subset of lead_ids already stored"""
+
+    def load_lazy_columns(self, refs):
+        """Values of lazy_columns for the rows with these ROW_REF_COLUMN refs, as a DataFrame indexed by ref"""
+        return pd.DataFrame(index=pd.Index(refs), columns=list(self.lazy_columns))
+
+    def reset(self):
+        """Forget cached connections/handles after an error"""
+
+    def warm_up(self):
+        """Open connections/handles ahead of the first request"""
+
+    def invalidate(self):
+        """Drop cached data so the next load_df reads everything again"""
+
+
+class QueryableLeadStore(LeadStore):
+    """A store that answers queries itself, so the dashboard can push filtering,
+    counting and top-N down instead of loading every row into pandas.
+
+    `filters` is always a dict of column -> list of accepted values.
+    """
+
+    @abc.abstractmethod
+    def data_version(self):
+        """Identifies the stored data; changes whenever rows are added"""
+
+    @abc.abstractmethod
+    def can_score(self, weights):
+        """True if fetch() can order by Lead Score for these weights"""
+
+    @abc.abstractmethod
+    def count(self, filters=None):
+        """Number of matching leads"""
+
+    @abc.abstractmethod
+    def value_counts(self, column, filters=None, limit=None, min_timestamp=None):
+        """Leads per value of column, most common first, as a Series"""
+
+    @abc.abstractmethod
+    def daily_counts(self, column):
+        """Leads per day and value of column, as a DataFrame of day, value, count"""
+
+    @abc.abstractmethod
+    def distinct(self, column):
+        """Sorted non-empty values of column"""
+
+    @abc.abstractmethod
+    def fetch(self, filters=None, order_by=None, limit=None, offset=0, min_timestamp=None, weights=None):
+        """Matching leads with their Lead Score, as a DataFrame"""
+
+    @abc.abstractmethod
+    def score_stats(self, filters=None, min_timestamp=None, weights=None):
+        """(row count, average Lead Score) of the matching leads"""
+
+
+class SheetsLeadStore(LeadStore):
+    """Leads in the Google Sheets worksheet (incrementally synced, see LeadSheetSync)"""
+
+    name = "sheets"
+
+    def __init__(self, ws_factory=None, lazy_columns=LAZY_COLUMNS):
+        self.ws_factory = ws_factory or get_worksheet
+        self.lazy_columns = tuple(lazy_columns)
+        self.sync = LeadSheetSync(lazy_columns=lazy_columns)
+        self.lazy = LazyColumns(lazy_columns, self._locate)
+        self._ws = None
+
+    def worksheet(self):
+        if self._ws is None:
+            self._ws = self.ws_factory()
+        return self._ws
+
+    def reset(self):
+        self._ws = None
+
+    def warm_up(self):
+        self.worksheet()
+
+    def invalidate(self):
+        self.sync.invalidate()
+        self.lazy.clear()
+
+    def append_rows(self, rows):
+        self.worksheet().append_rows(rows, value_input_option="USER_ENTERED")
+
+    def load_df(self, since=None):
+        return self.sync.sync(self.worksheet())
+
+    def load_lazy_columns(self, refs):
+        return self.lazy.load(refs)
+
+    def _locate(self, name):
+        """(worksheet, header, last full reload), for LazyColumns; the rows may be from a saved snapshot"""
+        ws = self.worksheet()
+        return ws, self.sync.header or ws.row_values(1), self.sync.last_full_reload
+
+    def existing_lead_ids(self, lead_ids):
+        ws = self.worksheet()
+        header = ws.row_values(1)
+        col = header.index("Lead ID") + 1 if "Lead ID" in header else len(LEAD_HEADERS)
+        return set(ws.col_values(col)[1:]) & set(lead_ids)
+
+
+class InMemoryLeadStore(LeadStore):
+    """Leads kept in a list; for tests, benchmarks and local experiments"""
+
+    name = "memory"
+
+    def __init__(self, rows=None):
+        self.rows = [list(row) for row in (rows or [])]
+        self._lock = threading.Lock()
+
+    def append_rows(self, rows):
+        with self._lock:
+            self.rows.extend(list(row) for row in rows)
+
+    def load_df(self, since=None):
+        with self._lock:
+            rows = [(row + [""] * len(LEAD_HEADERS))[:len(LEAD_HEADERS)] for row in self.rows]
+        df = pd.DataFrame(rows, columns=LEAD_HEADERS)
+        df.attrs["data_version"] = f"memory:{id(self)}:{len(rows)}"
+        return df
+
+    def existing_lead_ids(self, lead_ids):
+        with self._lock:
+            stored = {row[-1] for row in self.rows if len(row) >= len(LEAD_HEADERS)}
+        return stored & set(lead_ids)
+
+
+def _month_start(month):
+    """datetime of the first day of a "YYYY-MM" month"""
+    return datetime.strptime(month, "%Y-%m")
+
+
+def _next_month(start):
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class ShardedSheetsLeadStore(LeadStore):
+    """Leads spread over one worksheet per month ("Leads_2026_10"), listed in a manifest worksheet.
+
+    New rows always go to the current month's shard, so every older shard is
+    frozen: it is read once and kept for the life of the process, and only
+    the current shard is synced incrementally (see LeadSheetSync). Reads for
+    a date range only fetch the shards that can hold rows in it, in parallel.
+    The manifest records each shard's month and the oldest/newest Timestamp
+    written to it (imported leads can be dated outside the month). The
+    worksheet used before sharding was turned on stays as a frozen legacy shard.
+    """
+
+    name = "sheets"  # same API and write quota as SheetsLeadStore
+    MANIFEST_HEADERS = ["Worksheet", "Month", "Oldest Timestamp", "Newest Timestamp"]
+
+    def __init__(self, spreadsheet_factory=None, max_workers=SHARD_READ_WORKERS, lazy_columns=LAZY_COLUMNS,
+                 missing_shard_ttl=SNAPSHOT_TTL):
+        self.spreadsheet_factory = spreadsheet_factory or get_spreadsheet
+        self.max_workers = max_workers
+        self.missing_shard_ttl = missing_shard_ttl
+        self.lazy_columns = tuple(lazy_columns)
+        self.lazy = LazyColumns(lazy_columns, self._locate)
+        self._spreadsheet = None
+        self._manifest_ws = None
+        self._manifest = {}         # worksheet name -> {"worksheet", "month", "oldest", "newest", "row"}
+        self._worksheets = {}       # worksheet name -> handle
+        self._syncs = {}            # worksheet name -> LeadSheetSync of a shard still being written to
+        self._frozen = {}           # worksheet name -> DataFrame of a shard that no longer changes
+        self._headers = {}          # worksheet name -> (header, last full reload) of the loaded shard
+        self._combined = (None, None)
+        self._missing_shard = (None, 0.0)  # (name, checked at): this month has no shard yet
+        self._lock = threading.RLock()
+
+    # ---- manifest
+
+    def spreadsheet(self):
+        if self._spreadsheet is None:
+            self._spreadsheet = self.spreadsheet_factory()
+        return self._spreadsheet
+
+    def _load_manifest(self):
+        sh = self.spreadsheet()
+        try:
+            with span("sheets.worksheet", api=True):
+                ws = sh.worksheet(SHARD_MANIFEST_WORKSHEET)
+        except gspread.WorksheetNotFound:
+            ws = self._create_manifest(sh)
+        with span("sheets.get_all_values", api=True):
+            values = ws.get_all_values()
+        manifest = {}
+        for row_number, row in enumerate(values[1:], start=2):
+            row = (list(row) + [""] * len(self.MANIFEST_HEADERS))[:len(self.MANIFEST_HEADERS)]
+            if row[0] and row[0] not in manifest:  # two instances may both register a new shard
+                manifest[row[0]] = dict(zip(["worksheet", "month", "oldest", "newest"], row), row=row_number)
+        self._manifest_ws, self._manifest = ws, manifest
+
+    def _create_manifest(self, sh):
+        ws = sh.add_worksheet(title=SHARD_MANIFEST_WORKSHEET, rows=100, cols=len(self.MANIFEST_HEADERS))
+        rows = [self.MANIFEST_HEADERS]
+        try:
+            legacy = sh.worksheet(WORKSHEET_NAME)
+            if legacy.row_values(2):  # leads written before sharding was turned on
+                rows.append([WORKSHEET_NAME, "", "", ""])
+        except gspread.WorksheetNotFound:
+            pass
+        ws.append_rows(rows, value_input_option="RAW")
+        return ws
+
+    def _current_shard(self, create=True):
+        """Manifest entry of this month's shard, created (and registered) if needed; None if not and create=False"""
+        month = datetime.now().strftime("%Y-%m")
+        name = f"{WORKSHEET_NAME}_{month.replace('-', '_')}"
+        with self._lock:
+            if name not in self._manifest:
+                missing, checked_at = self._missing_shard
+                if not create and missing == name and time.time() - checked_at < self.missing_shard_ttl:
+                    return None  # checked recently, don't re-read the manifest on every load
+                self._load_manifest()  # another instance may have created it already
+            if name not in self._manifest:
+                if not create:
+                    self._missing_shard = (name, time.time())
+                    return None
+                sh = self.spreadsheet()
+                try:
+                    ws = sh.add_worksheet(title=name, rows=1000, cols=len(LEAD_HEADERS))
+                    ws.append_row(LEAD_HEADERS, value_input_option="RAW")
+                except gspread.exceptions.APIError:
+                    ws = sh.worksheet(name)  # created meanwhile by another instance
+                self._worksheets[name] = ws
+                self._manifest_ws.append_rows([[name, month, "", ""]], value_input_option="RAW")
+                self._load_manifest()
+            return self._manifest[name]
+
+    def _extend_bounds(self, shard, timestamps):
+        """Record timestamps outside the shard's month in the manifest, so range reads still find them"""
+        timestamps = [timestamp for timestamp in timestamps if timestamp]
+        if not timestamps or not shard["month"]:
+            return
+        start = _month_start(shard["month"]).strftime(TIMESTAMP_FORMAT)
+        end = _next_month(_month_start(shard["month"])).strftime(TIMESTAMP_FORMAT)
+        oldest = min([shard["oldest"] or start] + timestamps)
+        newest = max([shard["newest"] or start] + timestamps)
+        oldest = oldest if oldest < start else shard["oldest"]
+        newest = newest if newest >= end else shard["newest"]
+        if (oldest, newest) == (shard["oldest"], shard["newest"]):
+            return
+        self._manifest_ws.update(range_name=f"C{shard['row']}:D{shard['row']}", values=[[oldest, newest]],
+                                 value_input_option="RAW")
+        shard["oldest"], shard["newest"] = oldest, newest
+
+    def _bounds(self, shard):
+        """[first, end) datetimes a shard can hold rows for; None means unbounded"""
+        if not shard["month"]:  # legacy worksheet: everything before the first monthly shard
+            months = [entry["month"] for entry in self._manifest.values() if entry["month"]]
+            return None, _month_start(min(months)) if months else None
+        first = _month_start(shard["month"])
+        end = _next_month(first)
+        if shard["oldest"]:
+            first = min(first, datetime.strptime(shard["oldest"], TIMESTAMP_FORMAT))
+        if shard["newest"]:
+            end = max(end, datetime.strptime(shard["newest"], TIMESTAMP_FORMAT) + timedelta(seconds=1))
+        return first, end
+
+    def _is_frozen(self, shard):
+        if not shard["month"]:
+            return True
+        month_end = _next_month(_month_start(shard["month"]))
+        return datetime.now() - month_end > timedelta(seconds=SHARD_FREEZE_GRACE)
+
+    def shards(self, start=None, end=None):
+        """Manifest entries (oldest first) of the shards that can hold rows between start and end"""
+        with self._lock:
+            if not self._manifest:
+                self._load_manifest()
+            selected = []
+            for shard in self._manifest.values():
+                first, stop = self._bounds(shard)
+                if (end is None or first is None or first < end) and (start is None or stop is None or stop > start):
+                    selected.append(shard)
+        return sorted(selected, key=lambda shard: shard["month"])  # legacy ("") first
+
+    # ---- reads
+
+    def _shard_worksheet(self, name):
+        with self._lock:
+            if name not in self._worksheets:
+                with span("sheets.worksheet", api=True):
+                    self._worksheets[name] = self.spreadsheet().worksheet(name)
+            return self._worksheets[name]
+
+    def _load_shard(self, shard):
+        name = shard["worksheet"]
+        if name in self._frozen:
+            return self._frozen[name]
+        ws = self._shard_worksheet(name)
+        if self._is_frozen(shard):
+            sync = self._syncs.pop(name, None) or LeadSheetSync(lazy_columns=self.lazy_columns)
+            sync.invalidate()  # one last full read, then it never changes
+            df = sync.sync(ws)
+            self._headers[name] = (sync.header, sync.last_full_reload)
+            self._frozen[name] = df
+            return df
+        with self._lock:
+            sync = self._syncs.setdefault(name, LeadSheetSync(lazy_columns=self.lazy_columns))
+        df = sync.sync(ws)
+        self._headers[name] = (sync.header, sync.last_full_reload)
+        return df
+
+    def _locate(self, name):
+        """(worksheet, header, last full reload) of a shard, for LazyColumns"""
+        ws = self._shard_worksheet(name)
+        if name not in self._headers:
+            self._headers[name] = (ws.row_values(1), 0.0)
+        return (ws,) + self._headers[name]
+
+    def load_df(self, since=None):
+        self._current_shard(create=False)  # picks up a new month's shard created by another instance
+        shards = self.shards(start=since)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            frames = list(pool.map(self._load_shard, shards))
+        key = tuple((shard["worksheet"], frame.attrs.get("data_version")) for shard, frame in zip(shards, frames))
+        with self._lock:
+            if self._combined[0] == key:
+                return self._combined[1]
+            frames = [frame for frame in frames if not frame.empty]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LEAD_HEADERS)
+            df.attrs["data_version"] = "|".join(f"{name}:{version}" for name, version in key)
+            self._combined = (key, df)
+            return df
+
+    def load_lazy_columns(self, refs):
+        return self.lazy.load(refs)
+
+    # ---- writes
+
+    def append_rows(self, rows):
+        shard = self._current_shard()
+        # Widen the manifest bounds first: a shard may then look bigger than it is, never smaller
+        self._extend_bounds(shard, [row[0] for row in rows])
+        self._shard_worksheet(shard["worksheet"]).append_rows(rows, value_input_option="USER_ENTERED")
+
+    def existing_lead_ids(self, lead_ids):
+        found = set()
+        for shard in self.shards():
+            if self._is_frozen(shard):
+                continue  # nothing is written to a frozen shard
+            ws = self._shard_worksheet(shard["worksheet"])
+            header = ws.row_values(1)
+            col = header.index("Lead ID") + 1 if "Lead ID" in header else len(LEAD_HEADERS)
+            found.update(ws.col_values(col)[1:])
+        return found & set(lead_ids)
+
+    def warm_up(self):
+        shard = self._current_shard(create=False)
+        if shard is not None:
+            self._shard_worksheet(shard["worksheet"])
+
+    def reset(self):
+        with self._lock:
+            self._spreadsheet = None
+            self._worksheets = {}
+            self._manifest = {}
+            self._missing_shard = (None, 0.0)
+
+    def invalidate(self):
+        with self._lock:
+            self._frozen = {}
+            self._combined = (None, None)
+            self._missing_shard = (None, 0.0)
+            for sync in self._syncs.values():
+                sync.invalidate()
+        self.lazy.clear()
+
+
+def _q(column):
+    """Quote a column name for SQL ("HR/Contact Name" has a slash in it)"""
+    return '"' + column.replace('"', '""') + '"'
+
+
+class SqliteLeadStore(QueryableLeadStore):
+    """Leads in a local SQLite database; filters, counts and top-N run in SQL.
+
+    Lead ID is UNIQUE, so appending a row twice is a no-op. The headcount parsed
+    from "Size" is stored alongside each row so Lead Score can be computed in SQL.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=LEADS_DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        columns = ", ".join(f"{_q(col)} TEXT NOT NULL DEFAULT ''" for col in LEAD_HEADERS if col != "Lead ID")
+        self._conn().executescript(f"""
+            CREATE TABLE IF NOT EXISTS leads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {columns},
+                "Lead ID" TEXT NOT NULL UNIQUE,
+                headcount REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS leads_timestamp ON leads ("Timestamp");
+            CREATE INDEX IF NOT EXISTS leads_interest ON leads ("Interest Level");
+            CREATE INDEX IF NOT EXISTS leads_location ON leads ("Location");
+            CREATE INDEX IF NOT EXISTS leads_industry ON leads ("Industry");
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.create_function("log1p", 1, lambda x: math.log1p(max(x or 0, 0)), deterministic=True)
+            conn.create_function("half_life_decay", 2, _half_life_decay, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def append_rows(self, rows):
+        width = len(LEAD_HEADERS)
+        rows = [(list(row) + [""] * width)[:width] for row in rows]
+        sizes = pd.Series([row[LEAD_HEADERS.index("Size")] for row in rows], dtype=object)
+        headcounts = parse_headcount(sizes.fillna("").astype(str)).tolist() if rows else []
+        placeholders = ", ".join("?" * (width + 1))
+        self._conn().executemany(
+            f"INSERT OR IGNORE INTO leads ({', '.join(map(_q, LEAD_HEADERS))}, headcount) VALUES ({placeholders})",
+            [[str(value) for value in row] + [headcount] for row, headcount in zip(rows, headcounts)],
+        )
+
+    def load_df(self, since=None):
+        df = pd.read_sql_query(f"SELECT {', '.join(map(_q, LEAD_HEADERS))} FROM leads ORDER BY id", self._conn())
+        df.attrs["data_version"] = self.data_version()
+        return df
+
+    def existing_lead_ids(self, lead_ids):
+        lead_ids = list(lead_ids)
+        found = set()
+        for start in range(0, len(lead_ids), 500):  # stay under SQLite's parameter limit
+            chunk = lead_ids[start:start + 500]
+            query = f'SELECT "Lead ID" FROM leads WHERE "Lead ID" IN ({", ".join("?" * len(chunk))})'
+            found.update(lead_id for (lead_id,) in self._conn().execute(query, chunk))
+        return found
+
+    def data_version(self):
+        # Rows are only ever appended, so the highest id identifies the data
+        count, max_id = self._conn().execute("SELECT COUNT(*), MAX(id) FROM leads").fetchone()
+        return f"sqlite:{self.path}:{count}:{max_id}"
+
+    def can_score(self, weights):
+        return score_sql(weights) is not None
+
+    def _where(self, filters=None, min_timestamp=None):
+        clauses = ["\"Company Name\" <> ''"]  # same as the dashboard's empty-row cleanup
+        params = []
+        for column, values in (filters or {}).items():
+            if values:
+                clauses.append(f"{_q(column)} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if min_timestamp is not None:
+            clauses.append('"Timestamp" >= ?')
+            params.append(min_timestamp.strftime(TIMESTAMP_FORMAT))
+        return " AND ".join(clauses), params
+
+    def count(self, filters=None):
+        where, params = self._where(filters)
+        return self._conn().execute(f"SELECT COUNT(*) FROM leads WHERE {where}", params).fetchone()[0]
+
+    def value_counts(self, column, filters=None, limit=None, min_timestamp=None):
+        where, params = self._where(filters, min_timestamp)
+        query = f"SELECT {_q(column)}, COUNT(*) AS n FROM leads WHERE {where} GROUP BY 1 ORDER BY n DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        rows = self._conn().execute(query, params).fetchall()
+        return pd.Series([n for _, n in rows], index=pd.Index([value for value, _ in rows], name=column), name="count")
+
+    def daily_counts(self, column):
+        where, params = self._where()
+        query = (f'SELECT date("Timestamp") AS day, TRIM({_q(column)}) AS value, COUNT(*) AS count '
+                 f'FROM leads WHERE {where} AND date("Timestamp") IS NOT NULL GROUP BY 1, 2')
+        return pd.read_sql_query(query, self._conn(), params=params)
+
+    def distinct(self, column):
+        where, params = self._where()
+        query = f"SELECT DISTINCT {_q(column)} FROM leads WHERE {where} AND {_q(column)} <> '' ORDER BY 1"
+        return [value for (value,) in self._conn().execute(query, params)]
+
+    def fetch(self, filters=None, order_by=None, limit=None, offset=0, min_timestamp=None, weights=None):
+        where, params = self._where(filters, min_timestamp)
+        score_expr, score_params = score_sql(weights or get_scoring_weights()) or ("NULL", [])
+        query = (f'SELECT {", ".join(map(_q, LEAD_HEADERS))}, ROUND({score_expr}, 1) AS "Lead Score" '
+                 f"FROM leads WHERE {where}")
+        if order_by:
+            query += f" ORDER BY {_q(order_by)} DESC, id"
+        if limit is not None:
+            query += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+        df = pd.read_sql_query(query, self._conn(), params=score_params + params)
+        df["Timestamp"] = parse_timestamps(df["Timestamp"])
+        return df
+
+    def score_stats(self, filters=None, min_timestamp=None, weights=None):
+        where, params = self._where(filters, min_timestamp)
+        score_expr, score_params = score_sql(weights or get_scoring_weights()) or ("NULL", [])
+        count, avg = self._conn().execute(
+            f"SELECT COUNT(*), AVG(ROUND({score_expr}, 1)) FROM leads WHERE {where}", score_params + params
+        ).fetchone()
+        return count, round(avg, 1) if avg is not None else 0
+
+
+def _half_life_decay(age_days, half_life):
+    if age_days is None:
+        return 0.0
+    return 0.5 ** (max(age_days, 0) / half_life)
+
+
+def get_storage_config():
+    """[storage] table from secrets (e.g. backend = "sqlite", path = "leads.db")"""
+    config = {"backend": STORAGE_BACKEND, "path": LEADS_DB_FILE, "shard_by_month": SHARD_BY_MONTH,
+              "lazy_columns": LAZY_COLUMNS}
+    try:
+        config.update(dict(st.secrets["storage"]))
+    except Exception:
+        pass
+    return config
+
+
+@st.cache_resource
+def get_lead_store():
+    config = get_storage_config()
+    if config["backend"] == "sqlite":
+        return SqliteLeadStore(config["path"])
+    if config["backend"] == "memory":
+        return InMemoryLeadStore()
+    if config["shard_by_month"]:
+        return ShardedSheetsLeadStore(lazy_columns=config["lazy_columns"])
+    return SheetsLeadStore(lazy_columns=config["lazy_columns"])
+
+
+# =========================
+# DATASET SNAPSHOT
+# =========================
+
+class DiskSnapshot:
+    """A leads snapshot saved as a Parquet file, so a restarted app has data before Sheets answers.
+
+    The file's metadata holds a version marker: file format, a fingerprint of
+    where the leads came from, their data version and when their fetch started.
+    A file with another format or source, or one that can't be read, is
+    ignored and removed. Saves go to a temporary file that is synced and then
+    renamed over the old one, so a crash leaves the old file or the new one,
+    never a mix. A snapshot over max_bytes isn't kept.
+    """
+
+    MARKER_KEY = b"towngym.snapshot"
+
+    def __init__(self, path, source, max_bytes=SNAPSHOT_MAX_BYTES, save_interval=SNAPSHOT_SAVE_INTERVAL):
+        self.path = path
+        self.source = source
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.saved_version = None
+        self.saved_at = 0.0
+        self.last_error = None
+        self._saving = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(df, when its fetch started) from the file, or None"""
+        import pyarrow.parquet as pq
+
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with span("snapshot.disk_load"):
+                table = pq.read_table(self.path, memory_map=True)
+                marker = json.loads(table.schema.metadata[self.MARKER_KEY])
+                if marker.get("format") != SNAPSHOT_FORMAT or marker.get("source") != self.source:
+                    raise ValueError("saved for another lead store or file format")
+                df = table.to_pandas()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.remove()
+            return None
+        df.attrs["data_version"] = marker["data_version"]
+        self.saved_version = marker["data_version"]
+        return df, marker["fetch_started_at"]
+
+    def save_in_background(self, df, fetch_started_at):
+        """Save df on a background thread, unless it is already saved or the last save is recent"""
+        version = df.attrs.get("data_version")
+        with self._lock:
+            if self._saving or version == self.saved_version or time.time() - self.saved_at < self.save_interval:
+                return
+            self._saving = True
+        threading.Thread(target=self._save, args=(df, version, fetch_started_at),
+                         name="snapshot-save", daemon=True).start()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _save(self, df, version, fetch_started_at):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tmp = f"{self.path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        try:
+            marker = {"format": SNAPSHOT_FORMAT, "source": self.source, "data_version": version,
+                      "fetch_started_at": fetch_started_at, "rows": len(df)}
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[self.MARKER_KEY] = json.dumps(marker).encode()
+            table = table.replace_schema_metadata(metadata)
+            with open(tmp, "wb") as f:
+                pq.write_table(table, f)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.getsize(tmp) > self.max_bytes:
+                os.remove(tmp)
+                self.remove()  # an outdated copy would only be replaced by Sheets on every start
+                self.last_error = f"Snapshot over {self.max_bytes // (1024 * 1024)} MB, not kept"
+            else:
+                os.replace(tmp, self.path)
+                self.last_error = None
+            self.saved_version = version
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        finally:
+            with self._lock:
+                self.saved_at = time.time()
+                self._saving = False
+
+
+class DatasetSnapshot:
+    """One process-wide copy of all leads, shared read-only by every session.
+
+    Stale-while-revalidate: once the snapshot is older than `ttl`, the next
+    reader still gets it immediately and a background thread fetches a new
+    one. Fetches are coalesced - however many sessions ask at once, only one
+    fetch runs and the others wait for (or keep serving) its result. Only
+    the very first load, or one after a failed first load, blocks a reader -
+    unless there is a saved copy on `disk` (see DiskSnapshot): that is served
+    first, revalidated straight away, and every new fetch is saved back.
+    """
+
+    def __init__(self, load, ttl=SNAPSHOT_TTL, disk=None):
+        self._load = load
+        self.ttl = ttl
+        self.disk = disk
+        self.from_disk = False       # self.df is the saved copy, not yet revalidated
+        self.df = None
+        self.fetch_started_at = 0.0  # when the fetch behind self.df started
+        self.loaded_at = 0.0
+        self.fetches = 0
+        self.last_error = None
+        self._error = None
+        self._next_fetch_at = 0.0
+        self._inflight = None        # Event set when the running fetch finishes
+        self._lock = threading.Lock()
+
+    @property
+    def refreshing(self):
+        return self._inflight is not None
+
+    def get(self):
+        """The current snapshot (possibly stale, revalidating in the background)"""
+        with self._lock:
+            if self.df is None and self.disk is not None and self.fetches == 0 and not self.from_disk:
+                saved = self.disk.load()  # under the lock: other first readers wait for the file, not Sheets
+                if saved is not None:
+                    self.df, self.fetch_started_at = saved
+                    self.loaded_at = self.fetch_started_at
+                    self.from_disk = True
+                    self._next_fetch_at = 0.0
+            if self.df is not None:
+                if time.time() >= self._next_fetch_at and self._inflight is None:
+                    self._inflight = threading.Event()
+                    threading.Thread(target=self._fetch, name="snapshot-refresh", daemon=True).start()
+                return self.df
+            leader = self._inflight is None
+            if leader:
+                self._inflight = threading.Event()
+            inflight = self._inflight
+        if leader:
+            self._fetch()  # in this thread, so the fetch shows up in this rerun's trace
+        else:
+            inflight.wait()
+        with self._lock:
+            if self.df is None:
+                raise self._error or RuntimeError("Leads could not be loaded")
+            return self.df
+
+    def refresh(self):
+        """Fetch a new snapshot now (or join the fetch already running) and return it"""
+        with self._lock:
+            leader = self._inflight is None
+            if leader:
+                self._inflight = threading.Event()
+            inflight = self._inflight
+        if leader:
+            self._fetch()
+        else:
+            inflight.wait()
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            return self.df
+
+    def invalidate(self):
+        """Revalidate on the next read (which still gets the current copy)"""
+        with self._lock:
+            self._next_fetch_at = 0.0
+
+    def _fetch(self):
+        started = time.time()
+        df, error = None, None
+        try:
+            df = self._load()
+        except Exception as e:
+            error = e
+        with self._lock:
+            if df is not None:
+                self.df, self.fetch_started_at, self.loaded_at = df, started, time.time()
+                self.from_disk = False
+            self._error = error
+            self.last_error = f"{type(error).__name__}: {error}" if error else None
+            self._next_fetch_at = time.time() + self.ttl  # after a failure, retry after one ttl too
+            self.fetches += 1
+            inflight, self._inflight = self._inflight, None
+        inflight.set()
+        if df is not None and self.disk is not None:
+            self.disk.save_in_background(df, started)
+
+
+def period_start(days):
+    """Midnight `days` days ago (None for all time); fixed for the whole day so data versions stay stable"""
+    if days is None:
+        return None
+    return datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+
+
+def fetch_leads_snapshot(since_days=None):
+    """Leads in the lead store (from the last since_days days, or all), tagged with their data version"""
+    since = period_start(since_days)
+    df = get_lead_store().load_df(since=since)
+    version = df.attrs.get("data_version", "")
+    if since is not None:
+        if not df.empty:
+            df = df[(parse_timestamps(df["Timestamp"]) >= since).to_numpy()]
+        version += f"@{since:%Y-%m-%d}"
+    df = df.copy(deep=False)  # the store may keep appending to its own frame
+    df.attrs["data_version"] = hashlib.sha1(version.encode()).hexdigest()[:16]
+    return df
+
+
+@st.cache_resource
+def _dataset_snapshots():
+    return {}
+
+
+def get_dataset_snapshot(since_days=None):
+    """The shared snapshot of all leads, or of the last since_days days (one per period)"""
+    snapshots = _dataset_snapshots()
+    if since_days not in snapshots:
+        disk = get_disk_snapshot() if since_days is None else None
+        snapshots.setdefault(since_days, DatasetSnapshot(functools.partial(fetch_leads_snapshot, since_days),
+                                                         disk=disk))
+    return snapshots[since_days]
+
+
+@st.cache_resource
+def get_disk_snapshot():
+    """On-disk copy of the all-time snapshot; None if turned off, without pyarrow, or for local stores"""
+    path = SNAPSHOT_FILE
+    try:
+        path = st.secrets["snapshot"].get("file", path)
+    except Exception:
+        pass
+    config = get_storage_config()
+    if not path or config["backend"] != "sheets" or not importlib.util.find_spec("pyarrow"):
+        return None
+    source = json.dumps({"spreadsheet": SPREADSHEET_ID, "worksheet": WORKSHEET_NAME, "storage": config},
+                        sort_keys=True, default=str)
+    return DiskSnapshot(path, hashlib.sha1(source.encode()).hexdigest()[:16])
+
+
+def refresh_leads_data(since_days=None):
+    """Reload the leads of the period being viewed from the store (picking up edits the
+    incremental sync can't see); the other periods revalidate on their next read.
+
+    Only data is dropped: the Sheets client, worksheet handle, writer and
+    caches keyed by data version stay, and the indexes built from the rows are
+    rebuilt from the new snapshot.
+    """
+    get_lead_store().invalidate()
+    current = get_dataset_snapshot(since_days)
+    current.refresh()
+    for snapshot in _dataset_snapshots().values():
+        if snapshot is not current:
+            snapshot.invalidate()
+    get_duplicate_index().reset()
+    get_lead_rollups().reset()
+
+
+@traced("data.load")
+def load_data_as_df(since_days=None):
+    """All leads (or those of the last since_days days) as a DataFrame; df.attrs["data_version"]
+    changes whenever the data does.
+
+    The frame is shared by every session (see DatasetSnapshot): treat it as read-only.
+    """
+    snapshot = get_dataset_snapshot(since_days)
+    df = snapshot.get()
+
+    # Leads still waiting in the local outbox aren't in the store yet, and leads written
+    # since the snapshot was fetched may not be in it yet - show them too
+    outbox = get_lead_outbox()
+    unsynced = [row for _, _, row in outbox.pending() + outbox.replicated_since(snapshot.fetch_started_at)]
+    if unsynced:
+        extra = pd.DataFrame(unsynced, columns=LEAD_HEADERS)
+        if "Lead ID" in df.columns:
+            extra = extra[~extra["Lead ID"].isin(df["Lead ID"])]
+        if since_days is not None:
+            extra = extra[(parse_timestamps(extra["Timestamp"]) >= period_start(since_days)).to_numpy()]
+        if not extra.empty:
+            version = f"{df.attrs['data_version']}+{len(extra)}:{extra['Lead ID'].iloc[-1]}"
+            df = extra if df.empty else pd.concat([df, extra], ignore_index=True)
+            df.attrs["data_version"] = hashlib.sha1(version.encode()).hexdigest()[:16]
+    return df
 
 
-def load_data_as_df():
-    ws = get_worksheet()
-    records = ws.get_all_records()
-    if not records:
-        return pd.DataFrame()
-    df = pd.DataFrame(records)
+def with_lazy_columns(df, columns=None):
+    """df with the lead store's lazy columns (or those of them in `columns`) read in for every row.
+
+    Rows without a ROW_REF_COLUMN (e.g. still in the outbox) keep their own values.
+    """
+    store = get_lead_store()
+    lazy = [col for col in store.lazy_columns if columns is None or col in columns]
+    if not lazy or ROW_REF_COLUMN not in df.columns or df.empty:
+        return df
+    refs = _column(df, ROW_REF_COLUMN)
+    has_ref = (refs != "").to_numpy()
+    with span("data.lazy_columns"):
+        loaded = store.load_lazy_columns(refs[has_ref].tolist())
+    df = df.copy(deep=False)
+    for col in lazy:
+        df[col] = np.where(has_ref, loaded[col].reindex(refs).to_numpy(), _column(df, col).to_numpy())
     return df
 
 
+def lead_with_lazy_columns(row):
+    """A lead (Series) with its lazy column values read in (cached per row), for a lead being opened"""
+    store = get_lead_store()
+    ref = row.get(ROW_REF_COLUMN)
+    if not store.lazy_columns or not isinstance(ref, str) or not ref:
+        return row
+    loaded = store.load_lazy_columns([ref]).iloc[0]
+    row = row.copy()
+    for col in store.lazy_columns:
+        row[col] = loaded[col]
+    return row
+
+
+# =========================
+# LOCAL OUTBOX & BACKGROUND WRITER
+# =========================
+
+class LeadOutbox:
+    """Durable local queue (SQLite, WAL mode) of leads waiting to reach Google Sheets.
+
+    A submission is committed here first, which takes a few milliseconds and
+    does not depend on the Sheets API being reachable. LeadWriter then drains
+    pending rows to the worksheet in insertion order.
+    """
+
+    def __init__(self, path=OUTBOX_DB_FILE):
+        self.path = path
+        self._local = threading.local()  # sqlite connections can't be shared across threads
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                lead_id TEXT NOT NULL UNIQUE,
+                created_at REAL NOT NULL,
+                row_json TEXT NOT NULL,
+                replicated_at REAL,
+                failed_at REAL,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (id)
+                WHERE replicated_at IS NULL AND failed_at IS NULL;
+            CREATE INDEX IF NOT EXISTS outbox_replicated ON outbox (replicated_at);
+            CREATE TABLE IF NOT EXISTS lease (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable across app crashes in WAL mode
+            self._local.conn = conn
+        return conn
+
+    def add(self, row, lead_id=None):
+        """Store a row (LEAD_HEADERS order, without Lead ID) and return its Lead ID"""
+        lead_id = lead_id or uuid.uuid4().hex
+        row = list(row)[:len(LEAD_HEADERS) - 1] + [lead_id]
+        self._conn().execute(
+            "INSERT INTO outbox (lead_id, created_at, row_json) VALUES (?, ?, ?)",
+            (lead_id, time.time(), json.dumps(row)),
+        )
+        return lead_id
+
+    def add_many(self, rows):
+        """Store (row, lead_id) pairs in one transaction; Lead IDs already queued are skipped. Returns rows added."""
+        now = time.time()
+        width = len(LEAD_HEADERS) - 1
+        conn = self._conn()
+        before = conn.total_changes
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO outbox (lead_id, created_at, row_json) VALUES (?, ?, ?)",
+                [(lead_id, now, json.dumps(list(row)[:width] + [lead_id])) for row, lead_id in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.total_changes - before
+
+    def status(self, lead_ids):
+        """How many of these Lead IDs are written / pending / failed / unknown"""
+        counts = {"written": 0, "pending": 0, "failed": 0}
+        lead_ids = list(lead_ids)
+        for start in range(0, len(lead_ids), 500):  # stay under SQLite's parameter limit
+            chunk = lead_ids[start:start + 500]
+            query = (f"SELECT replicated_at IS NOT NULL, failed_at IS NOT NULL, COUNT(*) FROM outbox "
+                     f"WHERE lead_id IN ({', '.join('?' * len(chunk))}) GROUP BY 1, 2")
+            for written, failed, n in self._conn().execute(query, chunk):
+                counts["written" if written else "failed" if failed else "pending"] += n
+        counts["unknown"] = len(lead_ids) - sum(counts.values())
+        return counts
+
+    def retry_failed(self, lead_ids):
+        """Put failed rows back in the queue"""
+        self._conn().executemany(
+            "UPDATE outbox SET failed_at = NULL, error = NULL WHERE lead_id = ? AND replicated_at IS NULL",
+            [(lead_id,) for lead_id in lead_ids],
+        )
+
+    def pending(self, limit=None):
+        """Oldest-first list of (lead_id, created_at, row) not yet written to the sheet"""
+        query = "SELECT lead_id, created_at, row_json FROM outbox WHERE replicated_at IS NULL AND failed_at IS NULL ORDER BY id"
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (limit,)
+        return [(lead_id, created_at, json.loads(row_json))
+                for lead_id, created_at, row_json in self._conn().execute(query, params)]
+
+    def replicated_since(self, since):
+        """(lead_id, created_at, row) of rows written to the store at or after `since` (epoch seconds)"""
+        query = "SELECT lead_id, created_at, row_json FROM outbox WHERE replicated_at >= ? ORDER BY id"
+        return [(lead_id, created_at, json.loads(row_json))
+                for lead_id, created_at, row_json in self._conn().execute(query, (since,))]
+
+    def pending_count(self, include_imports=True):
+        query = "SELECT COUNT(*) FROM outbox WHERE replicated_at IS NULL AND failed_at IS NULL"
+        params = ()
+        if not include_imports:
+            query += " AND lead_id NOT LIKE ?"
+            params = (IMPORT_LEAD_ID_PREFIX + "%",)
+        return self._conn().execute(query, params).fetchone()[0]
+
+    def failed_count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM outbox WHERE failed_at IS NOT NULL").fetchone()[0]
+
+    def mark_replicated(self, lead_ids):
+        self._conn().executemany(
+            "UPDATE outbox SET replicated_at = ? WHERE lead_id = ?",
+            [(time.time(), lead_id) for lead_id in lead_ids],
+        )
+
+    def mark_failed(self, lead_ids, error):
+        self._conn().executemany(
+            "UPDATE outbox SET failed_at = ?, error = ? WHERE lead_id = ?",
+            [(time.time(), error, lead_id) for lead_id in lead_ids],
+        )
+
+    def acquire_lease(self, owner, ttl=30):
+        """Take or renew the single drain lease; True if `owner` holds it afterwards"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            """INSERT INTO lease (name, owner, expires_at) VALUES ('writer', ?, ?)
+               ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+               WHERE lease.owner = excluded.owner OR lease.expires_at < ?""",
+            (owner, now + ttl, now),
+        )
+        return conn.execute("SELECT owner FROM lease WHERE name = 'writer'").fetchone()[0] == owner
+
+    def prune(self, older_than_days=OUTBOX_RETENTION_DAYS):
+        """Forget rows that were replicated long ago"""
+        cutoff = time.time() - older_than_days * 86400
+        self._conn().execute("DELETE FROM outbox WHERE replicated_at < ?", (cutoff,))
+
+
+def is_retryable_error(exc):
+    """Quota (429), server-side (5xx) and network errors are worth retrying"""
+    if isinstance(exc, gspread.exceptions.APIError):
+        return exc.code == 429 or exc.code >= 500
+    return isinstance(exc, OSError)  # requests' connection/timeout errors are OSErrors
+
+
+def backoff_delay(attempt, base=WRITE_BACKOFF_BASE, cap=WRITE_BACKOFF_MAX):
+    """Exponential backoff with jitter: half fixed, half random"""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class LeadWriter:
+    """Replicates leads from the local outbox to the lead store in the background.
+
+    Submissions are committed to the LeadOutbox first; this thread drains the
+    outbox in order, one store.append_rows call per batch, once batch_size rows are
+    waiting or the oldest has waited flush_interval seconds; a backlog is written
+    max_batch_size rows per call. With a rate_limiter
+    the writer waits for a token before each append instead of running into the
+    quota; rows keep accumulating in the outbox meanwhile. Quota (429) and
+    server errors are retried with exponential backoff and jitter; other errors
+    are retried max_attempts times before the batch is marked failed in the outbox.
+
+    Every row carries a Lead ID. After a failed or interrupted write (and on
+    startup) the writer asks the store which Lead IDs it already has and skips
+    those rows, so a retry never creates a duplicate row. A lease in the
+    outbox makes sure only one writer drains it at a time; it is renewed before
+    every append, so a writer that lost it during a long backoff or quota wait
+    stops instead of writing rows another writer now owns.
+    """
+
+    def __init__(self, store, outbox, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval=WRITE_FLUSH_INTERVAL, max_attempts=WRITE_MAX_ATTEMPTS,
+                 max_batch_size=WRITE_MAX_BATCH_SIZE, rate_limiter=None, sleep=time.sleep):
+        self.store = store
+        self.outbox = outbox
+        self.max_batch_size = max(batch_size, max_batch_size)
+        self.rate_limiter = rate_limiter  # write quota: one token per store.append_rows call
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self.rows_written = 0
+        self.last_flush_latency = None  # seconds from submission to written, oldest row of last batch
+        self.last_error = None
+        self._owner = f"{os.getpid()}-{id(self)}"
+        self.lease_ttl = max(30, flush_interval * 5)
+        self._lease_expires_at = 0.0
+        self._wakeup = threading.Event()
+        self._verify = True  # check the store for already-written rows before the next append
+        self._thread = threading.Thread(target=self._run, name="lead-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, row):
+        """Durably store a lead row; returns its Lead ID once it is committed locally"""
+        lead_id = self.outbox.add(row)
+        self._wakeup.set()
+        return lead_id
+
+    def enqueue_many(self, rows):
+        """Durably store (row, lead_id) pairs in one go; returns how many were new"""
+        added = self.outbox.add_many(rows)
+        self._wakeup.set()
+        return added
+
+    def retry_failed(self, lead_ids):
+        self.outbox.retry_failed(lead_ids)
+        self._wakeup.set()
+
+    @property
+    def queue_depth(self):
+        return self.outbox.pending_count()
+
+    @property
+    def form_queue_depth(self):
+        """Pending rows submitted through the lead form (bulk imports left out)"""
+        return self.outbox.pending_count(include_imports=False)
+
+    @property
+    def throttled(self):
+        """True while the write quota is used up and new rows wait in the outbox"""
+        return self.rate_limiter is not None and self.rate_limiter.available() < 1
+
+    def flush(self, timeout=30):
+        """Block until everything enqueued so far is written (or timeout). Returns True if drained."""
+        deadline = time.time() + timeout
+        while self.queue_depth and time.time() < deadline:
+            self._wakeup.set()
+            time.sleep(0.05)
+        return self.queue_depth == 0
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                if not self._renew_lease():
+                    continue
+                self._drain()
+            except Exception as e:  # keep the thread alive whatever happens
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def _drain(self):
+        while True:
+            batch = self.outbox.pending(self.max_batch_size)
+            if not batch:
+                return
+            oldest = batch[0][1]
+            if len(batch) < self.batch_size and time.time() - oldest < self.flush_interval:
+                return  # not enough rows yet, wait for more to coalesce
+            if not self._write(batch):
+                return
+
+    def _renew_lease(self):
+        """Take or renew the drain lease; False if another writer holds it.
+
+        If it lapsed since the last renewal, another writer may have written
+        some of our rows meanwhile, so the store is checked again before the
+        next append.
+        """
+        now = time.time()
+        if not self.outbox.acquire_lease(self._owner, ttl=self.lease_ttl):
+            return False
+        if now >= self._lease_expires_at:
+            self._verify = True
+        self._lease_expires_at = now + self.lease_ttl
+        return True
+
+    def _write(self, batch):
+        """Append one batch, retrying as needed; False if the lease was lost (the batch is left pending)"""
+        attempt = 0
+        while True:
+            try:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(sleep=self.sleep)
+                if not self._renew_lease():  # after the backoff or quota wait, which can outlast the lease
+                    return False
+                if self._verify:
+                    batch = self._skip_already_written(batch)
+                    self._verify = False
+                if batch:
+                    self.store.append_rows([row for _, _, row in batch])
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._verify = True  # the append may have landed even though we got an error
+                if not is_retryable_error(e):
+                    self.store.reset()  # handles may be stale, resolve them again
+                    if attempt + 1 >= self.max_attempts:
+                        self.outbox.mark_failed([lead_id for lead_id, _, _ in batch], self.last_error)
+                        return True
+                self.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            if batch:
+                self.outbox.mark_replicated([lead_id for lead_id, _, _ in batch])
+                self.rows_written += len(batch)
+                self.last_flush_latency = time.time() - batch[0][1]
+            self.last_error = None
+            return True
+
+    def _skip_already_written(self, batch):
+        written = self.store.existing_lead_ids([lead_id for lead_id, _, _ in batch])
+        done = [lead_id for lead_id, _, _ in batch if lead_id in written]
+        if done:
+            self.outbox.mark_replicated(done)
+        return [item for item in batch if item[0] not in written]
+
+
+@st.cache_resource
+def get_lead_outbox():
+    outbox = LeadOutbox(OUTBOX_DB_FILE)
+    outbox.prune()
+    return outbox
+
+
+@st.cache_resource
+def get_lead_writer():
+    store = get_lead_store()
+    rate_limiter = get_write_quota_limiter() if store.name == "sheets" else None
+    return LeadWriter(store, get_lead_outbox(), rate_limiter=rate_limiter)
+
+
 # =========================
 # SECURITY HELPERS
 # =========================
 
+_HTML_TAG_PATTERN = r'<[^>]*>'
+_UNSAFE_CHARS_PATTERN = r'[<>\"\'%;()&+]'
+
 def sanitize_input(text):
     """Sanitize user input to prevent injection attacks"""
     if not text:
         return ""
     # Remove any potential HTML/script tags
-    text = re.sub(r'<[^>]*>', '', str(text))
+    text = re.sub(_HTML_TAG_PATTERN, '', str(text))
     # Remove special characters that could be used for injection
-    text = re.sub(r'[<>\"\'%;()&+]', '', str(text))
+    text = re.sub(_UNSAFE_CHARS_PATTERN, '', str(text))
     return text.strip()
 
+def sanitize_column(series):
+    """sanitize_input for a whole column at once"""
+    return (
+        series.fillna("").astype(str)
+        .str.replace(_HTML_TAG_PATTERN, "", regex=True)
+        .str.replace(_UNSAFE_CHARS_PATTERN, "", regex=True)
+        .str.strip()
+    )
+
 def validate_email(email):
     """Validate email format"""
     if not email:
@@ -122,29 +1971,1146 @@ def validate_url(url):
         return True
     return False
 
-def check_rate_limit():
-    """Check if user has exceeded submission rate limit"""
-    if 'submission_times' not in st.session_state:
-        st.session_state.submission_times = []
+def validate_url_column(series):
+    """validate_url for a whole column at once (boolean Series)"""
+    url = series.fillna("").astype(str).str.strip()
+    return (
+        (url == "")
+        | url.str.startswith("http://") | url.str.startswith("https://")
+        | (url.str.contains(".", regex=False) & ~url.str.contains(" ", regex=False))
+    )
+
+class RateLimiter:
+    """Token buckets per key: up to `capacity` tokens, refilled evenly over `per_seconds`.
+
+    Every check is O(1). A bucket left alone long enough to be full again is
+    the same as a new one, so idle keys are evicted (least recently used first),
+    and at most max_keys buckets are kept.
+    """
+
+    def __init__(self, capacity, per_seconds, max_keys=RATE_LIMIT_MAX_KEYS, clock=time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds  # tokens per second
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> (tokens, updated), least recently used first
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def try_acquire(self, key="global", cost=1):
+        """Spend `cost` tokens: (True, 0) or (False, seconds until they are available)"""
+        with self._lock:
+            now = self.clock()
+            tokens = self._tokens(key, now)
+            allowed = tokens >= cost
+            self._buckets[key] = (tokens - cost if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            self._evict(now)
+            return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    def acquire(self, key="global", cost=1, sleep=time.sleep):
+        """Wait until `cost` tokens are available and spend them"""
+        while True:
+            allowed, wait = self.try_acquire(key, cost)
+            if allowed:
+                return
+            sleep(wait)
+
+    def available(self, key="global"):
+        with self._lock:
+            return self._tokens(key, self.clock())
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _evict(self, now):
+        refill_time = self.capacity / self.rate
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - updated < refill_time:
+                break
+            del self._buckets[key]
+
+
+@st.cache_resource
+def get_submission_limiter():
+    """Lead form submissions per client, shared by all sessions of this process"""
+    return RateLimiter(MAX_SUBMISSIONS_PER_HOUR, 3600)
+
+
+@st.cache_resource
+def get_write_quota_limiter():
+    """Google Sheets write requests across the whole app"""
+    return RateLimiter(SHEETS_WRITE_QUOTA_PER_MINUTE, 60)
+
+
+def client_key():
+    """Rate limit key: hash of the client IP (reported by our proxy, or the connection's), else this browser session"""
+    hops = TRUSTED_PROXY_HOPS
+    try:
+        hops = int(st.secrets["rate_limit"].get("trusted_proxy_hops", hops))
+    except Exception:
+        pass
+    ip = ""
+    try:
+        if hops > 0:
+            forwarded = st.context.headers.get("X-Forwarded-For") or ""
+            entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+            ip = entries[-hops] if hops <= len(entries) else ""
+        else:
+            address = st.context.ip_address
+            ip = address if isinstance(address, str) else ""  # None for local connections
+    except Exception:
+        pass
+    if ip:
+        return "ip:" + hashlib.sha256(ip.encode()).hexdigest()[:16]
+    if "client_id" not in st.session_state:
+        st.session_state["client_id"] = uuid.uuid4().hex
+    return "session:" + st.session_state["client_id"]
+
+
+# =========================
+# LEAD SCORING
+# =========================
+
+# Each factor is computed for the whole DataFrame at once and returns one value per row.
+# A lead's score is the sum of all factors, each scaled by its weight.
+SCORING_FACTORS = {}
+
+
+def scoring_factor(name):
+    """Register a scoring factor: fn(df, weight) -> pd.Series aligned with df.index"""
+    def register(fn):
+        SCORING_FACTORS[name] = fn
+        return fn
+    return register
+
+
+def map_interest_to_score(level):
+    return INTEREST_SCORES.get(level, 0)
+
+
+def _column(df, name):
+    """Column as strings, or empty strings if the sheet doesn't have it"""
+    if name not in df.columns:
+        return pd.Series("", index=df.index)
+    column = df[name]
+    if isinstance(column.dtype, pd.CategoricalDtype) and "" not in column.cat.categories:
+        column = column.cat.add_categories("")
+    return column.fillna("").astype(str)
+
+
+@scoring_factor("interest")
+def interest_factor(df, weight):
+    return _column(df, "Interest Level").map(INTEREST_SCORES).fillna(0) * weight
+
+
+def parse_headcount(size):
+    """Employee count from free-text sizes: "50 employees" -> 50, "100-200" -> 200, "1,500+" -> 1500, "2k" -> 2000"""
+    size = size.str.replace(",", "", regex=False)
+    parts = size.str.extract(r"(\d+(?:\.\d+)?)\s*(k)?(?:\s*[-–]\s*(\d+(?:\.\d+)?)\s*(k)?)?", flags=re.IGNORECASE)
+    low = pd.to_numeric(parts[0], errors="coerce") * parts[1].notna().map({True: 1000, False: 1})
+    high = pd.to_numeric(parts[2], errors="coerce") * parts[3].notna().map({True: 1000, False: 1})
+    return high.fillna(low).fillna(0)
+
+
+@scoring_factor("headcount")
+def headcount_factor(df, weight):
+    # Sizes repeat a lot, so run the regex once per distinct value
+    codes, uniques = pd.factorize(_column(df, "Size"))
+    headcount = parse_headcount(pd.Series(uniques, dtype=object)).to_numpy()[codes]
+    # log scale so 50 vs 500 employees matters more than 5000 vs 5500
+    return pd.Series(np.log1p(headcount) / np.log1p(HEADCOUNT_CAP), index=df.index).clip(0, 1) * weight
+
+
+@scoring_factor("recency")
+def recency_factor(df, weight):
+    if "Timestamp" not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    timestamps = df["Timestamp"]
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = parse_timestamps(timestamps)
+    age_days = (pd.Timestamp.now() - timestamps).dt.total_seconds() / 86400
+    return (0.5 ** (age_days.clip(lower=0) / RECENCY_HALF_LIFE_DAYS)).fillna(0) * weight
+
+
+def _lookup_factor(column):
+    """Per-value bonus, e.g. {"Banking": 1.5}; the weight is the lookup table (case-insensitive)"""
+    def factor(df, weight):
+        table = {str(key).strip().lower(): value for key, value in weight.items()}
+        return _column(df, column).str.strip().str.lower().map(table).fillna(0).astype(float)
+    return factor
+
+
+scoring_factor("industry")(_lookup_factor("Industry"))
+scoring_factor("location")(_lookup_factor("Location"))
+
+
+# SQL versions of the factors, used by stores that compute Lead Score in the database
+# (see SqliteLeadStore). fn(weight) -> (SQL expression, params)
+SQL_SCORING_FACTORS = {}
+
+
+def sql_scoring_factor(name):
+    def register(fn):
+        SQL_SCORING_FACTORS[name] = fn
+        return fn
+    return register
+
+
+@sql_scoring_factor("interest")
+def interest_factor_sql(weight):
+    cases = " ".join("WHEN ? THEN ?" for _ in INTEREST_SCORES)
+    params = [value for item in INTEREST_SCORES.items() for value in item]
+    return f'(CASE "Interest Level" {cases} ELSE 0 END) * ?', params + [weight]
+
+
+@sql_scoring_factor("headcount")
+def headcount_factor_sql(weight):
+    return "MIN(1.0, MAX(0.0, log1p(headcount) / ?)) * ?", [math.log1p(HEADCOUNT_CAP), weight]
+
+
+@sql_scoring_factor("recency")
+def recency_factor_sql(weight):
+    age_days = "julianday('now', 'localtime') - julianday(\"Timestamp\")"
+    return f"half_life_decay({age_days}, ?) * ?", [RECENCY_HALF_LIFE_DAYS, weight]
+
+
+def _lookup_factor_sql(column):
+    def factor(weight):
+        cases = " ".join("WHEN ? THEN ?" for _ in weight)
+        params = [value for key, bonus in weight.items() for value in (str(key).strip().lower(), float(bonus))]
+        return f"(CASE lower(trim({_q(column)})) {cases} ELSE 0 END)", params
+    return factor
+
+
+sql_scoring_factor("industry")(_lookup_factor_sql("Industry"))
+sql_scoring_factor("location")(_lookup_factor_sql("Location"))
+
+
+def score_sql(weights):
+    """(expression, params) computing Lead Score in SQL, or None if a weighted factor has no SQL version"""
+    parts, params = [], []
+    for name in SCORING_FACTORS:
+        weight = weights.get(name)
+        if not weight:
+            continue
+        if name not in SQL_SCORING_FACTORS:
+            return None
+        expression, factor_params = SQL_SCORING_FACTORS[name](weight)
+        parts.append(f"({expression})")
+        params.extend(factor_params)
+    return " + ".join(parts) or "0", params
+
+
+def get_scoring_weights():
+    """DEFAULT_SCORING_WEIGHTS, overridden by the [scoring] table in Streamlit secrets"""
+    weights = dict(DEFAULT_SCORING_WEIGHTS)
+    try:
+        for name, value in st.secrets["scoring"].items():
+            weights[name] = dict(value) if hasattr(value, "items") else float(value)
+    except Exception:
+        pass
+    return weights
+
 
-    # Remove submissions older than 1 hour
-    current_time = time.time()
-    st.session_state.submission_times = [
-        t for t in st.session_state.submission_times
-        if current_time - t < 3600
-    ]
+def score_leads(df, weights=None):
+    """Lead Score for every row of df, computed column-wise"""
+    if weights is None:
+        weights = get_scoring_weights()
+    score = pd.Series(0.0, index=df.index)
+    for name, factor in SCORING_FACTORS.items():
+        weight = weights.get(name)
+        if weight:
+            score += factor(df, weight)
+    return score.round(1)
 
-    # Check if limit exceeded
-    if len(st.session_state.submission_times) >= MAX_SUBMISSIONS_PER_HOUR:
+
+# =========================
+# SEARCH
+# =========================
+
+# Arabic letter variants people type interchangeably, Arabic-Indic digits, and tatweel
+_SEARCH_TRANSLATION = str.maketrans({
+    "ى": "ي",
+    "ة": "ه",
+    "ـ": None,
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06F0 + d): str(d) for d in range(10)},
+})
+# Latin accents and Arabic harakat/hamza marks left over after NFKD decomposition
+_COMBINING_MARKS = "[\u0300-\u036f\u064b-\u065f\u0670]"
+
+
+def normalize_search_text(series):
+    """Lowercase, strip accents/diacritics and fold Arabic letter variants (أ/إ/آ -> ا, ى -> ي, ة -> ه)"""
+    return (
+        series.fillna("").astype(str)
+        .str.normalize("NFKD")
+        .str.replace(_COMBINING_MARKS, "", regex=True)
+        .str.translate(_SEARCH_TRANSLATION)
+        .str.lower()
+    )
+
+
+def normalize_text(text):
+    """normalize_search_text for a single string (no pandas needed)"""
+    text = unicodedata.normalize("NFKD", "" if text is None else str(text))
+    return re.sub(_COMBINING_MARKS, "", text).translate(_SEARCH_TRANSLATION).lower()
+
+
+class SearchIndex:
+    """Normalized text of the searchable columns, built once per data version.
+
+    mode="substring" matches the search term anywhere in a lead's text (vectorized
+    str.contains); mode="tokens" uses an inverted index where every word of the
+    search term must be a prefix of some word of the lead.
+    """
+
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        columns = [col for col in columns if col in df.columns]
+        self.index = df.index
+        if columns:
+            # Newline separator so a match can never span two fields
+            self.text = normalize_search_text(_column(df, columns[0]))
+            for col in columns[1:]:
+                self.text = self.text + "\n" + normalize_search_text(_column(df, col))
+        else:
+            self.text = pd.Series("", index=df.index)
+        self._tokens = None
+        self._postings = None
+
+    def search(self, term, mode=SEARCH_MODE):
+        """Boolean mask over the indexed DataFrame"""
+        term = normalize_search_text(pd.Series([term])).iloc[0].strip()
+        if not term:
+            return pd.Series(True, index=self.index)
+        if mode == "tokens":
+            return self._token_search(term)
+        return self.text.str.contains(term, regex=False)
+
+    def _build_token_index(self):
+        postings = {}
+        for position, text in enumerate(self.text):
+            for token in set(re.findall(r"\w+", text)):
+                postings.setdefault(token, []).append(position)
+        self._postings = postings
+        self._tokens = sorted(postings)
+
+    def _token_search(self, term):
+        if self._postings is None:
+            self._build_token_index()
+        matches = None
+        for word in re.findall(r"\w+", term):
+            positions = set()
+            # All tokens starting with `word` sit in one contiguous run of the sorted list
+            start = bisect.bisect_left(self._tokens, word)
+            for token in self._tokens[start:]:
+                if not token.startswith(word):
+                    break
+                positions.update(self._postings[token])
+            matches = positions if matches is None else matches & positions
+        mask = np.zeros(len(self.index), dtype=bool)
+        if matches:
+            mask[list(matches)] = True
+        return pd.Series(mask, index=self.index)
+
+
+@st.cache_resource(max_entries=4)
+def get_search_index(data_version, _df):
+    """Search index for the dashboard DataFrame, reused until the data changes"""
+    with span("transform.search_index"):
+        return SearchIndex(with_lazy_columns(_df, SEARCH_COLUMNS))
+
+
+# =========================
+# DUPLICATE DETECTION
+# =========================
+
+def lead_row_key(df, position):
+    """(company, Lead ID) of a row: tells whether a frame still starts with the rows an index has seen"""
+    row = df.iloc[position]
+    return str(row.get("Company Name", "")), str(row.get("Lead ID", ""))
+
+
+def _company_words(text):
+    return " ".join(word for word in re.findall(r"\w+", text) if word not in COMPANY_NAME_STOPWORDS)
+
+
+def normalize_company_names(names):
+    """Comparable company names (list): search-normalized, punctuation and legal-form words removed"""
+    return [_company_words(text) for text in normalize_search_text(names)]
+
+
+def normalize_company_name(name):
+    """normalize_company_names for a single name (no pandas needed)"""
+    return _company_words(normalize_text(name))
+
+
+def normalize_linkedin_url(url):
+    """linkedin.com/in/jane-doe for any spelling of the same profile URL, "" if blank"""
+    url = str(url or "").strip().lower()
+    url = re.sub(r"^[a-z]+://", "", url)
+    url = re.sub(r"^(www\.|[a-z]{2}\.)(?=linkedin\.)", "", url)
+    return re.split(r"[?#]", url)[0].rstrip("/")
+
+
+def _trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _digits(name):
+    return " ".join(re.findall(r"\d+", name))
+
+
+def _similar_names(grams_a, digits_a, grams_b, digits_b, threshold):
+    # "Branch 1" and "Branch 2" are different companies however similar the rest is
+    if digits_a != digits_b or not grams_a or not grams_b:
         return False
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)) >= threshold
+
+
+class DuplicateIndex:
+    """Normalized company names and LinkedIn URLs of all leads, for duplicate checks.
+
+    Company names are blocked by trigram: a lookup only scores the leads that
+    share trigrams with the submitted name (one numpy bincount over the posting
+    lists), then keeps those whose Dice similarity reaches the threshold. Rows
+    are added incrementally from the shared leads snapshot, in the background
+    (see refresh_duplicate_index_in_background); leads submitted from this
+    process are checked too until they show up in the data.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_started_at = 0.0
+        self.clear()
+
+    def clear(self):
+        self.rows = []                      # (company, contact, timestamp, linkedin, lead id) as submitted
+        self._names = []                    # normalized company names
+        self._digits = []
+        self._gram_counts = array("i")
+        self._postings = {}                 # trigram -> array of row positions
+        self._by_linkedin = {}              # normalized URL -> [row positions]
+        self._recent = {}                   # lead id -> row, submitted here but not indexed yet
+        self.refreshed_at = 0.0
+
+    @property
+    def size(self):
+        return len(self.rows)
+
+    def refresh(self, df):
+        """Index the rows of df not seen yet (rebuilds if df isn't an extension of the indexed rows)"""
+        with self._lock:
+            n = len(self.rows)
+            if n and (len(df) < n or lead_row_key(df, n - 1) != self._key(self.rows[n - 1])):
+                self.clear()
+                n = 0
+            if len(df) > n:
+                self._add(df.iloc[n:])
+            self.refreshed_at = time.time()
+
+    def refresh_in_background(self, load, max_age=DUPLICATE_REFRESH_INTERVAL):
+        """refresh(load()) on a background thread if the index is older than max_age (one refresh at a time)"""
+        with self._refresh_lock:
+            now = time.time()
+            if now - max(self.refreshed_at, self._refresh_started_at) < max_age:
+                return
+            self._refresh_started_at = now
+
+        def run():
+            try:
+                self.refresh(load())
+            except Exception:
+                pass  # tried again after max_age
+
+        threading.Thread(target=run, name="duplicate-index-refresh", daemon=True).start()
+
+    @staticmethod
+    def _key(row):
+        return row[0], row[4]
+
+    def _add(self, df):
+        columns = [_column(df, name).tolist() for name in
+                   ("Company Name", "HR/Contact Name", "Timestamp", "LinkedIn Link", "Lead ID")]
+        for row, name in zip(zip(*columns), normalize_company_names(_column(df, "Company Name"))):
+            position = len(self.rows)
+            self.rows.append(row)
+            grams = _trigrams(name) if name else set()
+            self._names.append(name)
+            self._digits.append(_digits(name))
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, array("i")).append(position)
+            url = normalize_linkedin_url(row[3])
+            if url:
+                self._by_linkedin.setdefault(url, []).append(position)
+            self._recent.pop(row[4], None)
+
+    def reset(self):
+        with self._lock:
+            self.clear()
+
+    def note_submission(self, row, lead_id):
+        """Remember a lead submitted from this process until it reaches the indexed data"""
+        with self._lock:
+            name = normalize_company_name(row[1])
+            self._recent[lead_id] = ((row[1], row[5], row[0], row[7], lead_id), name)
+
+    def matches(self, company, linkedin="", threshold=DUPLICATE_THRESHOLD, limit=5):
+        """Up to `limit` (similarity, row) pairs for existing leads like this one, best first"""
+        name = normalize_company_name(company)
+        grams = _trigrams(name) if name else set()
+        digits = _digits(name)
+        url = normalize_linkedin_url(linkedin)
+        found = {}
+        with self._lock:
+            for position in self._by_linkedin.get(url, []) if url else []:
+                found[position] = 1.0
+            postings = [np.frombuffer(self._postings[gram], dtype=np.int32) for gram in grams if gram in self._postings]
+            if postings:
+                shared = np.bincount(np.concatenate(postings), minlength=len(self.rows))
+                dice = 2 * shared / (len(grams) + np.frombuffer(self._gram_counts, dtype=np.int32))
+                for position in np.flatnonzero(dice >= threshold):
+                    if self._digits[position] == digits:
+                        found[int(position)] = max(found.get(int(position), 0), float(dice[position]))
+            result = [(score, self.rows[position]) for position, score in found.items()]
+            for row, recent_name in self._recent.values():
+                if (url and normalize_linkedin_url(row[3]) == url) or \
+                        _similar_names(grams, digits, _trigrams(recent_name), _digits(recent_name), threshold):
+                    result.append((1.0, row))
+        result.sort(key=lambda match: -match[0])
+        return result[:limit]
+
+    def groups(self, threshold=DUPLICATE_THRESHOLD, window=DUPLICATE_WINDOW):
+        """Groups (lists of rows) of leads that look like the same company, largest first.
+
+        Same LinkedIn profile, or similar names among the `window` neighbours in
+        name order (and in reversed-name order, so different prefixes are caught too).
+        """
+        with self._lock:
+            n = len(self.rows)
+            names, digits, rows = self._names[:n], self._digits[:n], self.rows[:n]
+            linkedin_groups = [positions for positions in self._by_linkedin.values() if len(positions) > 1]
+
+        parent = list(range(n))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for positions in linkedin_groups:
+            for position in positions[1:]:
+                parent[find(position)] = find(positions[0])
+
+        named = [position for position in range(n) if names[position]]
+        grams = {}
+        for sort_key in (names.__getitem__, lambda position: names[position][::-1]):
+            order = sorted(named, key=sort_key)
+            for i, position in enumerate(order):
+                if position not in grams:
+                    grams[position] = _trigrams(names[position])
+                for other in order[i + 1:i + 1 + window]:
+                    if other not in grams:
+                        grams[other] = _trigrams(names[other])
+                    if find(position) != find(other) and \
+                            _similar_names(grams[position], digits[position], grams[other], digits[other], threshold):
+                        parent[find(other)] = find(position)
+
+        members = {}
+        for position in range(n):
+            members.setdefault(find(position), []).append(position)
+        groups = [[rows[position] for position in group] for group in members.values() if len(group) > 1]
+        groups.sort(key=len, reverse=True)
+        return groups
+
+
+@st.cache_resource
+def get_duplicate_index():
+    return DuplicateIndex()
+
+
+def refresh_duplicate_index_in_background():
+    """Bring the duplicate index up to date with the all-time leads snapshot on a background thread.
+
+    Called on every rerun, so the index is filled as soon as the process serves
+    its first session and then synced at most every DUPLICATE_REFRESH_INTERVAL
+    seconds, whichever pages are visited. The rerun itself never waits for it.
+    """
+    get_duplicate_index().refresh_in_background(load_data_as_df)
+
+
+def find_duplicate_leads(company, linkedin=""):
+    """Existing leads that look like this submission, as far as the duplicate index knows them.
+
+    The public form never loads leads itself: it only looks them up in the
+    index refresh_duplicate_index_in_background keeps filled. [] if anything
+    goes wrong.
+    """
+    try:
+        return get_duplicate_index().matches(company, linkedin)
+    except Exception:
+        return []  # never block a submission on the duplicate check
+
+
+def refreshed_duplicate_index(max_age=DUPLICATE_REFRESH_INTERVAL):
+    """The duplicate index, brought up to date with the lead store at most every max_age seconds"""
+    index = get_duplicate_index()
+    if time.time() - index.refreshed_at >= max_age:
+        index.refresh(load_data_as_df())
+    return index
+
+
+# =========================
+# DASHBOARD CACHE
+# =========================
+
+def _estimate_size(value):
+    """Rough memory footprint in bytes, good enough for cache budgeting"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # deep: count the strings themselves, not just the 8-byte pointers of object columns
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_estimate_size(v) for v in value.values()) + 64
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_size(v) for v in value) + 64
+    return sys.getsizeof(value)
+
+
+class AggregateCache:
+    """Thread-safe LRU memo for dashboard aggregates, bounded by entry count and bytes.
+
+    Keys start with the data version, so entries for old data simply age out.
+    Whole-dataset frames (budgeted=False) don't count against max_bytes, where
+    a single one could take most of the budget or not fit at all; they are kept
+    in max_frames LRU slots of their own instead.
+    """
+
+    def __init__(self, max_entries=AGGREGATE_CACHE_MAX_ENTRIES, max_bytes=AGGREGATE_CACHE_MAX_BYTES,
+                 max_frames=AGGREGATE_CACHE_MAX_FRAMES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_frames = max_frames
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._frames = OrderedDict()   # key -> (value, size), outside the byte budget
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, budgeted=True):
+        with self._lock:
+            for entries in (self._entries, self._frames):
+                if key in entries:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return entries[key][0]
+            self.misses += 1
+
+        value = compute()  # outside the lock: other sessions keep reading meanwhile
+        if not budgeted:
+            with self._lock:
+                self._frames[key] = (value, None)
+                self._frames.move_to_end(key)
+                while len(self._frames) > self.max_frames:
+                    self._frames.popitem(last=False)
+            return value
+        size = _estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+        return value
+
+    def get(self, key):
+        """Cached value or None, without computing anything"""
+        with self._lock:
+            for entries in (self._entries, self._frames):
+                if key in entries:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return entries[key][0]
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._frames.clear()
+            self._bytes = 0
+
+
+@st.cache_resource
+def get_aggregate_cache():
+    return AggregateCache()
+
+
+def parse_timestamps(values):
+    """Datetimes from TIMESTAMP_FORMAT strings; other formats (e.g. re-formatted in Sheets) parsed leniently, else NaT"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors="coerce")
+    missing = values[parsed.isna().to_numpy()]
+    retry = missing[missing.fillna("").astype(str).str.strip() != ""]
+    if len(retry):
+        parsed[retry.index] = pd.to_datetime(retry, format="mixed", errors="coerce")
+    return parsed
+
+
+def normalize_leads(df):
+    """Leads in LEAD_SCHEMA: every column present, blanks as "", declared dtypes, rows without a company dropped"""
+    company = _column(df, "Company Name").str.strip()
+    keep = (company != "").to_numpy()
+    df = df[keep]
+    columns = {}
+    for column, kind in LEAD_SCHEMA.items():
+        if column not in df.columns:
+            values = pd.Series(pd.NaT if kind == "datetime" else "", index=df.index)
+        elif kind == "datetime":
+            values = parse_timestamps(df[column])
+        else:
+            values = _column(df, column)
+        if kind == "category":
+            values = values.str.strip().astype("category")
+        columns[column] = company[keep] if column == "Company Name" else values
+    for column in df.columns:
+        if column not in LEAD_SCHEMA:
+            columns[column] = df[column]
+    normalized = pd.DataFrame(columns, index=df.index)
+    normalized.attrs.update(df.attrs)
+    return normalized
+
+
+def prepare_leads(df):
+    """Normalize (once per data version, see normalize_leads) and score every lead"""
+    with span("transform.normalize"):
+        df = normalize_leads(df)
+    with span("transform.score"):
+        df["Lead Score"] = score_leads(df)
+    return df
+
+
+def recent_cutoff():
+    """Start of the "last 7 days" window, rounded to the hour so it can be part of a cache key"""
+    return pd.Timestamp.now().floor("h") - pd.Timedelta(days=7)
+
+
+def _filter_options(df, column):
+    if column not in df.columns:
+        return []
+    return sorted([value for value in df[column].dropna().unique() if value])
+
+
+def _value_counts(series, limit=None):
+    """value_counts without the zero rows a categorical keeps for categories absent from the (filtered) frame"""
+    counts = series.value_counts()
+    counts = counts[counts > 0]
+    if isinstance(counts.index, pd.CategoricalIndex):
+        counts.index = counts.index.astype(str)
+    return counts.head(limit) if limit else counts
+
+
+@traced("transform.aggregates")
+def compute_dashboard_aggregates(df):
+    """KPIs, chart data, recent/top tables and filter options for the (searched) leads"""
+    aggs = {"total": len(df), "columns": list(df.columns)}
+    aggs["interest_counts"] = _value_counts(df["Interest Level"]) if "Interest Level" in df.columns else None
+    for column, key in (("Location", "location_counts"), ("Industry", "industry_counts")):
+        if column in df.columns and not df[column].isna().all():
+            aggs[key] = _value_counts(df[column], limit=10)
+        else:
+            aggs[key] = None
+
+    aggs["recent"] = None
+    if "Timestamp" in df.columns:
+        recent_df = df[df["Timestamp"] >= recent_cutoff()].sort_values("Timestamp", ascending=False)
+        recent_display_cols = [col for col in ["Timestamp", "Company Name", "Location", "HR/Contact Name", "Interest Level"] if col in recent_df.columns]
+        aggs["recent"] = {
+            "count": len(recent_df),
+            "high": (recent_df["Interest Level"] == "High").sum() if "Interest Level" in recent_df.columns else 0,
+            "avg_score": round(recent_df["Lead Score"].mean(), 1) if len(recent_df) > 0 else 0,
+            "table": recent_df[recent_display_cols].head(10),
+        }
+
+    display_cols = [col for col in ["Timestamp", "Company Name", "Location", "Industry", "HR/Contact Name", "Interest Level", "Lead Score"] if col in df.columns]
+    aggs["top_leads"] = df.nlargest(20, "Lead Score")[display_cols] if display_cols else None
+
+    aggs["options"] = {column: _filter_options(df, column) for column in ("Location", "Interest Level", "Industry")}
+    return aggs
+
+
+@traced("store.aggregates")
+def compute_store_aggregates(store, weights):
+    """Same as compute_dashboard_aggregates, but computed by the store's own queries"""
+    cutoff = recent_cutoff()
+    aggs = {"total": store.count(), "columns": LEAD_HEADERS + ["Lead Score"]}
+    aggs["interest_counts"] = store.value_counts("Interest Level")
+    aggs["location_counts"] = store.value_counts("Location", limit=10)
+    aggs["industry_counts"] = store.value_counts("Industry", limit=10)
+
+    recent_count, recent_avg = store.score_stats(min_timestamp=cutoff, weights=weights)
+    recent_interest = store.value_counts("Interest Level", min_timestamp=cutoff)
+    recent_display_cols = ["Timestamp", "Company Name", "Location", "HR/Contact Name", "Interest Level"]
+    aggs["recent"] = {
+        "count": recent_count,
+        "high": recent_interest.get("High", 0),
+        "avg_score": recent_avg,
+        "table": store.fetch(order_by="Timestamp", limit=10, min_timestamp=cutoff, weights=weights)[recent_display_cols],
+    }
+
+    display_cols = ["Timestamp", "Company Name", "Location", "Industry", "HR/Contact Name", "Interest Level", "Lead Score"]
+    aggs["top_leads"] = store.fetch(order_by="Lead Score", limit=20, weights=weights)[display_cols]
+
+    aggs["options"] = {column: store.distinct(column) for column in ("Location", "Interest Level", "Industry")}
+    return aggs
+
+
+def filter_leads_mask(df, location_filter, interest_filter, industry_filter):
+    """Boolean mask (numpy) of the leads matching the dashboard filters"""
+    mask = np.ones(len(df), dtype=bool)
+    if location_filter:
+        mask &= df["Location"].isin(location_filter).to_numpy()
+    if interest_filter:
+        mask &= df["Interest Level"].isin(interest_filter).to_numpy()
+    if industry_filter:
+        mask &= df["Industry"].isin(industry_filter).to_numpy()
+    return mask
+
+
+# =========================
+# LEAD TRENDS
+# =========================
+
+class LeadRollups:
+    """Daily lead counts per value of ROLLUP_DIMENSIONS, maintained incrementally.
+
+    For every dimension there is a (days x values) count matrix and its prefix
+    sum along the days (with a leading zero row), so the number of leads in any
+    date range is one subtraction, however many years of leads there are.
+    Weekly/monthly buckets and rolling averages are built from those ranges.
+    New sheet rows are added to the counts; only a change to already-seen rows
+    triggers a rebuild.
+    """
+
+    def __init__(self, dimensions=ROLLUP_DIMENSIONS):
+        self.dimensions = list(dimensions)
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.start = None          # first day covered (pd.Timestamp)
+        self.rows_seen = 0         # rows of the source frame already counted
+        self.source_version = None
+        self.from_counts = False   # built by load_counts() rather than from rows
+        self._last_key = None
+        self._values = {dim: {} for dim in self.dimensions}   # value -> column
+        self._daily = {dim: np.zeros((0, 0), dtype=np.int64) for dim in self.dimensions}
+        self._cum = {dim: np.zeros((1, 0), dtype=np.int64) for dim in self.dimensions}
+
+    def reset(self):
+        with self._lock:
+            self.clear()
+
+    @property
+    def days(self):
+        return len(next(iter(self._cum.values()))) - 1 if self.dimensions else 0
+
+    @property
+    def end(self):
+        """Last day covered"""
+        return None if self.start is None else self.start + pd.Timedelta(days=self.days - 1)
+
+    def refresh(self, df, source_version=None):
+        """Count the rows of df not seen yet (rebuilds if df isn't an extension of the counted rows)"""
+        with self._lock:
+            n = self.rows_seen
+            if self.from_counts or (n and (len(df) < n or lead_row_key(df, n - 1) != self._last_key)):
+                self.clear()
+                n = 0
+            if len(df) > n:
+                self._add(normalize_leads(df.iloc[n:]))
+                self.rows_seen = len(df)
+                self._last_key = lead_row_key(df, len(df) - 1)
+            self.source_version = source_version
+
+    def load_counts(self, counts, source_version=None):
+        """Rebuild from counts computed elsewhere: {dimension: DataFrame of day, value, count}
+        (e.g. a store's daily_counts(), so query-capable stores never load their rows)"""
+        with self._lock:
+            self.clear()
+            frames = [counts[dim] for dim in self.dimensions if not counts[dim].empty]
+            if frames:
+                days = pd.to_datetime(pd.concat([frame["day"] for frame in frames]))
+                self._grow(days.min(), days.max())
+                for dim in self.dimensions:
+                    frame = counts[dim]
+                    if frame.empty:
+                        continue
+                    day_index = ((pd.to_datetime(frame["day"]) - self.start) // pd.Timedelta(days=1)).to_numpy()
+                    self._add_counts(dim, day_index, frame["value"].astype(str).to_numpy(),
+                                     frame["count"].to_numpy(dtype=np.int64))
+            self.from_counts = True
+            self.source_version = source_version
+
+    def _add(self, leads):
+        days = leads["Timestamp"].dropna().dt.normalize()
+        if days.empty:
+            return
+        self._grow(days.min(), days.max())
+        day_index = ((days - self.start) // pd.Timedelta(days=1)).to_numpy()
+        for dim in self.dimensions:
+            self._add_counts(dim, day_index, leads.loc[days.index, dim].astype(str).to_numpy(), 1)
+
+    def _add_counts(self, dim, day_index, values, counts):
+        columns = self._values[dim]
+        for value in pd.unique(values):
+            columns.setdefault(value, len(columns))
+        if len(columns) > self._daily[dim].shape[1]:
+            extra = len(columns) - self._daily[dim].shape[1]
+            self._daily[dim] = np.pad(self._daily[dim], ((0, 0), (0, extra)))
+            self._cum[dim] = np.pad(self._cum[dim], ((0, 0), (0, extra)))
+        column_index = pd.Index(list(columns)).get_indexer(values)
+        np.add.at(self._daily[dim], (day_index, column_index), counts)
+        # Only the prefix sums from the first changed day on need recomputing
+        first_changed = int(day_index.min())
+        cum = self._cum[dim]
+        cum[first_changed + 1:] = cum[first_changed] + np.cumsum(self._daily[dim][first_changed:], axis=0)
+
+    def _grow(self, first_day, last_day):
+        if self.start is None:
+            self.start = first_day
+        before = max(0, (self.start - first_day).days)
+        after = max(0, (last_day - self.start).days + 1 - self.days)
+        if not before and not after:
+            return
+        self.start -= pd.Timedelta(days=before)
+        for dim in self.dimensions:
+            daily = np.pad(self._daily[dim], ((before, after), (0, 0)))
+            self._daily[dim] = daily
+            cum = np.zeros((len(daily) + 1, daily.shape[1]), dtype=np.int64)
+            np.cumsum(daily, axis=0, out=cum[1:])
+            self._cum[dim] = cum
+
+    def _positions(self, days):
+        """Prefix-sum row for each day (clipped to the covered range)"""
+        offsets = (pd.DatetimeIndex(days) - self.start) // pd.Timedelta(days=1)
+        return np.clip(np.asarray(offsets), 0, self.days)
+
+    def range_counts(self, dim, first_day, last_day):
+        """{value: leads between first_day and last_day (inclusive)}, O(values)"""
+        with self._lock:
+            if self.start is None:
+                return pd.Series(dtype=np.int64)
+            a, b = self._positions([first_day, last_day + pd.Timedelta(days=1)])
+            counts = self._cum[dim][b] - self._cum[dim][a]
+            return pd.Series(counts, index=list(self._values[dim])).sort_values(ascending=False)
+
+    def series(self, dim, first_day, last_day, freq="D"):
+        """Leads per bucket (rows, labelled by bucket start) and value (columns) between two days"""
+        first_day, last_day = pd.Timestamp(first_day).normalize(), pd.Timestamp(last_day).normalize()
+        if freq == "W-MON":
+            bucket_start = first_day - pd.Timedelta(days=first_day.weekday())
+        elif freq == "MS":
+            bucket_start = first_day.replace(day=1)
+        else:
+            bucket_start = first_day
+        starts = pd.date_range(bucket_start, last_day, freq=freq)
+        if len(starts) == 0 or starts[0] > bucket_start:
+            starts = starts.insert(0, bucket_start)
+        bounds = starts[1:].append(pd.DatetimeIndex([last_day + pd.Timedelta(days=1)]))
+        clipped_starts = starts.where(starts >= first_day, first_day)
+        with self._lock:
+            columns = list(self._values[dim])
+            if self.start is None:
+                return pd.DataFrame(0, index=starts, columns=columns)
+            cum = self._cum[dim]
+            counts = cum[self._positions(bounds)] - cum[self._positions(clipped_starts)]
+        return pd.DataFrame(counts, index=starts, columns=columns)
+
+
+@st.cache_resource
+def get_lead_rollups():
+    return LeadRollups()
+
+
+def refreshed_lead_rollups(dataset):
+    """Rollups brought up to date with the dashboard's dataset"""
+    rollups = get_lead_rollups()
+    if dataset["raw_df"] is not None:
+        rollups.refresh(dataset["raw_df"], dataset["data_version"])
+    elif rollups.source_version != dataset["data_version"]:
+        if dataset["pushdown"]:
+            # Counted with a GROUP BY in the store instead of loading every row
+            store = get_lead_store()
+            rollups.load_counts({dim: store.daily_counts(dim) for dim in rollups.dimensions},
+                                dataset["data_version"])
+        else:
+            rollups.refresh(load_data_as_df(), dataset["data_version"])
+    return rollups
+
+
+# =========================
+# EXPORT
+# =========================
+
+def available_export_formats():
+    """Export formats whose writer library is installed"""
+    formats = ["CSV"]
+    if importlib.util.find_spec("openpyxl"):
+        formats.append("Excel")
+    if importlib.util.find_spec("pyarrow"):
+        formats.append("Parquet")
+    return formats
+
+
+def _export_csv(df, out):
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+        out.write(chunk.to_csv(index=False, header=(start == 0)).encode("utf-8"))
+    if df.empty:
+        out.write(df.to_csv(index=False).encode("utf-8"))
 
-    return True
 
-def record_submission():
-    """Record a new submission timestamp"""
-    if 'submission_times' not in st.session_state:
-        st.session_state.submission_times = []
-    st.session_state.submission_times.append(time.time())
+def _export_parquet(df, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(out, schema) as writer:
+        for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _export_excel(df, out):
+    with pd.ExcelWriter(out, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="Leads")
+
+
+@traced("transform.export")
+def export_leads(df, export_format):
+    """Encode leads as CSV / Excel / Parquet bytes, writing large frames in chunks"""
+    writers = {"CSV": _export_csv, "Excel": _export_excel, "Parquet": _export_parquet}
+    out = io.BytesIO()
+    writers[export_format](df, out)
+    return out.getvalue()
+
+
+# =========================
+# BULK IMPORT
+# =========================
+
+def _header_key(name):
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def read_lead_file(data, filename):
+    """Uploaded .csv/.xlsx as a DataFrame of strings, headers mapped to LEAD_HEADERS where they match"""
+    if filename.lower().endswith(".xlsx"):
+        df = pd.read_excel(io.BytesIO(data), dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    known = {_header_key(header): header for header in LEAD_HEADERS}
+    known.update({_header_key(alias): header for alias, header in IMPORT_COLUMN_ALIASES.items()})
+    return df.rename(columns=lambda column: known.get(_header_key(column), column))
+
+
+def _local_time(value):
+    """A parsed timestamp as naive local time, like the Timestamps the form writes"""
+    if value is pd.NaT or value.tzinfo is None:
+        return value
+    return pd.Timestamp(value.to_pydatetime().astimezone().replace(tzinfo=None))
+
+
+def parse_import_timestamps(values):
+    """Datetimes of an imported Timestamp column (see IMPORT_DATE_FORMATS); NaT if blank or not understood.
+
+    Times with a UTC offset ("...T10:00:00+02:00", "...Z") are converted to local time,
+    so a file can mix them with times that have none.
+    """
+    text = values.fillna("").astype(str).str.strip()
+    aware = text.str.contains(r"\d:\d\d(?::\d\d(?:\.\d+)?)?\s*(?:Z|[+-]\d\d(?::?\d\d)?)$", case=False, regex=True)
+    parsed = pd.to_datetime(text.where(~aware, ""), format="ISO8601", errors="coerce")
+    if aware.any():
+        parsed[aware] = [_local_time(value) for value in
+                         pd.to_datetime(text[aware], format="ISO8601", utc=True, errors="coerce")]
+    day_first = text.str.replace(r"[-.]", "/", regex=True)
+    for fmt in IMPORT_DATE_FORMATS:
+        missing = parsed.isna() & (text != "")
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(day_first[missing], format=fmt, errors="coerce")
+    named = parsed.isna() & text.str.contains(r"[^\W\d_]", regex=True)  # "5 Oct 2026" can't be misread
+    if named.any():
+        parsed[named] = [_local_time(pd.to_datetime(value, errors="coerce")) for value in text[named]]
+    return parsed
+
+
+def validate_import(df):
+    """(valid rows as a LEAD_HEADERS-ordered frame without Lead ID, error report), same rules as the lead form"""
+    def column(name):
+        return df[name].fillna("").astype(str) if name in df.columns else pd.Series("", index=df.index)
+
+    company = sanitize_column(column("Company Name"))
+    contact = sanitize_column(column("HR/Contact Name"))
+    linkedin = column("LinkedIn Link").str.strip()
+    notes = column("Notes")
+    interest = column("Interest Level").str.strip().str.capitalize().replace("", "Low")
+    timestamps = parse_import_timestamps(column("Timestamp"))
+
+    problems = pd.DataFrame({
+        "Company Name is required": company == "",
+        "HR/Contact Name is required": contact == "",
+        "Invalid LinkedIn URL format": ~validate_url_column(linkedin),
+        "Company Name is too long (max 200 characters)": column("Company Name").str.len() > 200,
+        "Notes are too long (max 1000 characters)": notes.str.len() > 1000,
+        "Interest Level must be Low, Medium or High": ~interest.isin(["Low", "Medium", "High"]),
+        "Timestamp must be a date like 2026-10-05 or 05/10/2026 (day first)":
+            timestamps.isna() & (column("Timestamp").str.strip() != ""),
+    }, index=df.index)
+    invalid = problems.any(axis=1).to_numpy()
+
+    report = pd.DataFrame({
+        "Row": np.flatnonzero(invalid) + 2,  # spreadsheet row number, after the header
+        "Company Name": column("Company Name")[invalid].to_numpy(),
+        "Errors": ["; ".join(problems.columns[flags]) for flags in problems[invalid].to_numpy()],
+    })
+
+    rows = pd.DataFrame({
+        "Timestamp": timestamps.dt.strftime(TIMESTAMP_FORMAT).fillna(datetime.now().strftime(TIMESTAMP_FORMAT)),
+        "Company Name": company,
+        "Industry": sanitize_column(column("Industry")),
+        "Size": sanitize_column(column("Size")),
+        "Location": sanitize_column(column("Location")),
+        "HR/Contact Name": contact,
+        "Role": sanitize_column(column("Role")),
+        "LinkedIn Link": linkedin,
+        "Interest Level": interest,
+        "Notes": sanitize_column(notes),
+    }, index=df.index)[~invalid]
+    return rows, report
+
+
+def import_lead_ids(data, rows):
+    """Lead IDs derived from the file contents and row numbers, so importing the same file twice is a no-op"""
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    return [f"{IMPORT_LEAD_ID_PREFIX}{digest}-{position + 2}" for position in rows.index]
 
 
 # =========================
@@ -179,11 +3145,6 @@ def show_lead_form():
         submitted = st.form_submit_button("✅ Submit Lead", use_container_width=True, type="primary")
 
         if submitted:
-            # Check rate limit
-            if not check_rate_limit():
-                st.error("⏰ Too many submissions. Please wait before submitting again (max 10 per hour).")
-                st.stop()
-
             # Validation
             errors = []
 
@@ -203,12 +3164,36 @@ def show_lead_form():
             if len(notes) > 1000:
                 errors.append("Notes are too long (max 1000 characters)")
 
+            # Rate limits: every submission that passes validation and isn't shed uses up a token,
+            # including one that is only answered with the duplicate warning
+            writer = get_lead_writer()
+            overloaded = not errors and writer.form_queue_depth >= MAX_QUEUED_LEADS
+            held_back = bool(errors) or overloaded
+            allowed, retry_after = (False, 0) if held_back else get_submission_limiter().try_acquire(client_key())
+
+            # Possible duplicate: warn once, submitting the same company again saves it anyway.
+            # The form is public, so the warning never shows what is stored about the match.
+            fingerprint = (company_name.strip().lower(), linkedin_link.strip().lower())
+            duplicates = []
+            if allowed and st.session_state.get("confirmed_duplicate") != fingerprint:
+                duplicates = find_duplicate_leads(company_name, linkedin_link)
+
             if errors:
                 for error in errors:
                     st.error(f"❌ {error}")
+            elif overloaded:
+                # Shed load instead of queueing more than the write quota can drain
+                st.warning("🚦 We're receiving a lot of submissions right now. Please try again in a few minutes.")
+            elif not allowed:
+                st.error(f"⏰ Too many submissions. Please wait {max(1, math.ceil(retry_after / 60))} min "
+                         f"before submitting again (max {MAX_SUBMISSIONS_PER_HOUR} per hour).")
+            elif duplicates:
+                st.session_state["confirmed_duplicate"] = fingerprint
+                st.warning("⚠️ This company may already be registered.\n\n"
+                           "Press **Submit Lead** again to save it anyway.")
             else:
                 # Sanitize all inputs
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
                 row = [
                     timestamp,                          # Timestamp
                     sanitize_input(company_name),       # Company Name
@@ -222,9 +3207,12 @@ def show_lead_form():
                     sanitize_input(notes)               # Notes
                 ]
                 try:
-                    append_lead_row(row)
-                    record_submission()  # Record this submission
-                    st.success("✅ Lead successfully submitted to Google Sheets!")
+                    lead_id = writer.enqueue(row)  # written to Google Sheets in the background
+                    get_duplicate_index().note_submission(row, lead_id)
+                    st.session_state.pop("confirmed_duplicate", None)
+                    st.success("✅ Lead successfully submitted!")
+                    if writer.throttled:
+                        st.caption("🕒 High traffic right now: your lead is saved and will appear in the sheet shortly.")
                     st.balloons()
 
                     # Show summary
@@ -240,244 +3228,632 @@ def show_lead_form():
                     st.error(f"❌ Error saving lead: {e}")
 
 
-def map_interest_to_score(level):
-    mapping = {"Low": 1, "Medium": 2, "High": 3}
-    return mapping.get(level, 0)
+def show_lead_details(row):
+    """Detail panel for a single lead"""
+    row = lead_with_lazy_columns(row)
+    detail_col1, detail_col2, detail_col3 = st.columns([2, 2, 1])
+
+    with detail_col1:
+        st.write(f"**📍 Location:** {row.get('Location', 'N/A')}")
+        st.write(f"**🏢 Industry:** {row.get('Industry', 'N/A')}")
+        st.write(f"**👥 Size:** {row.get('Size', 'N/A')}")
+
+    with detail_col2:
+        st.write(f"**👤 Contact:** {row.get('HR/Contact Name', 'N/A')}")
+        st.write(f"**💼 Role:** {row.get('Role', 'N/A')}")
+        st.write(f"**⭐ Score:** {row.get('Lead Score', 0)}")
+
+    with detail_col3:
+        # Quick action buttons
+        linkedin = row.get('LinkedIn Link', '')
+        if linkedin and linkedin.strip():
+            st.link_button("🔗 LinkedIn", linkedin, use_container_width=True)
+
+    # Notes section
+    if row.get('Notes', ''):
+        st.write(f"**📝 Notes:** {row.get('Notes', '')}")
+
+    # Timestamp
+    if 'Timestamp' in row and pd.notna(row['Timestamp']):
+        st.caption(f"Added: {row['Timestamp']}")
+
+
+def dataframe_page_fetcher(filtered_df, cache_key=None):
+    """fetch_page(sort_col, start, size) over an in-memory frame, sort order cached per cache_key"""
+    def fetch_page(sort_col, start, size):
+        df = filtered_df
+        if sort_col in df.columns:
+            def sort_order():
+                # Positions (not labels) so the cached order stays valid for any copy of the frame
+                values = df[sort_col].reset_index(drop=True)
+                return values.sort_values(ascending=False, na_position="last", kind="stable").index.to_numpy()
+            if cache_key is not None:
+                order = get_aggregate_cache().get_or_compute(cache_key + ("sort", sort_col), sort_order)
+            else:
+                order = sort_order()
+            df = df.iloc[order]
+        return df.iloc[start:start + size]
+    return fetch_page
+
+
+def _toggle_open_lead(lead_key):
+    st.session_state["open_lead"] = None if st.session_state.get("open_lead") == lead_key else lead_key
+
+
+def show_leads_list(total, fetch_page):
+    """One page of leads; details are only rendered for the lead that is opened.
+
+    fetch_page(sort_col, start, size) returns the rows of the requested page, so
+    only page_size rows are ever loaded/rendered whatever the total.
+    """
+    list_col1, list_col2, list_col3, list_col4 = st.columns(4)
+    with list_col1:
+        view_mode = st.radio("View", ["Cards", "Table"], horizontal=True)
+    with list_col2:
+        sort_by = st.selectbox("Sort by", list(LEAD_SORT_OPTIONS))
+    with list_col3:
+        page_size = st.selectbox("Leads per page", LEADS_PAGE_SIZES,
+                                 index=LEADS_PAGE_SIZES.index(LEADS_PAGE_SIZE))
+
+    total_pages = max(1, -(-total // page_size))
+    with list_col4:
+        # max_value is part of the widget identity, so a filter change that alters
+        # the page count resets the list back to page 1
+        page = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1)
+
+    start = (page - 1) * page_size
+    page_df = fetch_page(LEAD_SORT_OPTIONS[sort_by], start, page_size)
+    st.caption(f"Leads {start + 1 if len(page_df) else 0}–{start + len(page_df)} of {total}")
+
+    if view_mode == "Table":
+        table_cols = [col for col in ["Timestamp", "Company Name", "Location", "Industry", "HR/Contact Name", "Interest Level", "Lead Score"] if col in page_df.columns]
+        event = st.dataframe(
+            page_df[table_cols],
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+        )
+        if event.selection.rows:
+            row = page_df.iloc[event.selection.rows[0]]
+            st.markdown(f"##### 🏢 {row.get('Company Name', 'N/A')}")
+            show_lead_details(row)
+        return
+
+    open_lead = st.session_state.get("open_lead")
+    for position, (idx, row) in enumerate(page_df.iterrows(), start=start):
+        idx = row.get("Lead ID") or idx  # Lead ID stays the same across pages and stores
+        is_open = open_lead == idx
+        label = f"{'▾' if is_open else '▸'} 🏢 {row.get('Company Name', 'N/A')} - {row.get('Interest Level', 'N/A')} Interest"
+        # A callback rather than st.rerun(), so only the enclosing fragment reruns. The key is the
+        # row's position in the list: Lead IDs can repeat once a row is copied in the sheet
+        st.button(label, key=f"lead_{position}", use_container_width=True,
+                  on_click=_toggle_open_lead, args=(idx,))
+        if is_open:
+            with st.container(border=True):
+                show_lead_details(row)
 
 
-def compute_lead_score(row):
-    score = 0
-    score += map_interest_to_score(row.get("Interest Level", ""))
-    # ممكن تضيف حاجات تانية للـ scoring
-    return score
+def require_admin_session():
+    """Fragment reruns skip admin_login(); send a logged-out or expired session through a full rerun"""
+    login_time = st.session_state.get("login_time") or 0
+    if not st.session_state.get("is_admin", False) or time.time() - login_time > SESSION_TIMEOUT:
+        st.rerun()
 
 
 def show_admin_dashboard():
     st.header("📊 Admin Dashboard – Corporate Leads")
 
+    cache = get_aggregate_cache()
+    store = get_lead_store()
+    weights = get_scoring_weights()
+    # Stores that can query themselves (SQLite) compute counts, charts, top-N and
+    # pages in the database instead of loading every row
+    pushdown = isinstance(store, QueryableLeadStore) and store.can_score(weights)
+
     # Top controls
-    top_col1, top_col2, top_col3 = st.columns([2, 2, 2])
+    top_col1, top_col2, top_col3 = st.columns([1, 1, 2])
     with top_col1:
-        if st.button("🔄 Refresh Data", use_container_width=True):
-            st.cache_resource.clear()
-            st.rerun()
-
-    df = load_data_as_df()
+        refresh = st.button("🔄 Refresh Data", use_container_width=True)
 
-    if df.empty:
+    with top_col2:
+        since_days = None
+        if not pushdown:
+            period = st.selectbox("Period", list(DASHBOARD_PERIODS), key="dashboard_period",
+                                  label_visibility="collapsed")
+            since_days = DASHBOARD_PERIODS[period]
+
+    if refresh:
+        # Reload the data only; the Sheets client, writer and other sessions' state stay as they are
+        refresh_leads_data(since_days)
+        st.rerun()
+
+    with top_col3:
+        snapshot = get_dataset_snapshot(since_days)
+        if snapshot.loaded_at and not pushdown:
+            refreshing = " (refreshing...)" if snapshot.refreshing else ""
+            saved = " (saved copy)" if snapshot.from_disk else ""
+            as_of = datetime.fromtimestamp(snapshot.loaded_at)
+            as_of = as_of.strftime("%H:%M:%S" if as_of.date() == date.today() else "%Y-%m-%d %H:%M")
+            st.caption(f"🗂️ Data as of {as_of}{saved}{refreshing}")
+        writer = get_lead_writer()
+        latency = f"{writer.last_flush_latency:.1f}s" if writer.last_flush_latency is not None else "–"
+        st.caption(f"✍️ Write queue: {writer.queue_depth} pending • Last flush latency: {latency}")
+        if writer.last_error:
+            st.caption(f"⚠️ Last write error: {writer.last_error}")
+        failed = writer.outbox.failed_count()
+        if failed:
+            st.caption(f"❌ {failed} leads could not be written (kept in {OUTBOX_DB_FILE})")
+
+    # The dataset is loaded on full reruns only (and prepared once per data version);
+    # the fragments below rerun on their own widgets and reuse it
+    if pushdown:
+        dataset = {"pushdown": True, "data_version": store.data_version(), "df": None, "raw_df": None}
+        empty = store.count() == 0
+    else:
+        raw_df = load_data_as_df(since_days)
+        data_version = raw_df.attrs.get("data_version")
+        df = raw_df
+        if not raw_df.empty:
+            df = cache.get_or_compute((data_version, "prepared"), lambda: prepare_leads(raw_df), budgeted=False)
+        # The duplicate index and trend rollups always cover all leads, so they only
+        # take the raw rows from an all-time dataset
+        dataset = {"pushdown": False, "data_version": data_version, "df": df,
+                   "raw_df": raw_df if since_days is None else None}
+        empty = df.empty
+
+    if empty:
         st.info("📭 No leads found. Start adding leads from the Lead Form page!")
         return
 
-    # Clean data - remove empty rows
-    df = df[df["Company Name"].notna() & (df["Company Name"] != "")]
-
-    # Convert Timestamp to datetime if exists
-    if "Timestamp" in df.columns:
-        df["Timestamp"] = pd.to_datetime(df["Timestamp"], errors='coerce')
-
-    # Lead Score
-    df["Lead Score"] = df.apply(compute_lead_score, axis=1)
-
-    # Search functionality
-    with top_col2:
-        search_term = st.text_input("🔍 Search", placeholder="Company name, contact, industry...", label_visibility="collapsed")
-
-    if search_term:
-        search_mask = df.apply(lambda row: search_term.lower() in str(row).lower(), axis=1)
-        df = df[search_mask]
-        st.info(f"🔍 Found {len(df)} results for '{search_term}'")
-
-    # KPIs Section
-    st.markdown("### 📈 Key Metrics")
-    total_leads = len(df)
-    high_interest = (df["Interest Level"] == "High").sum() if "Interest Level" in df.columns else 0
-    medium_interest = (df["Interest Level"] == "Medium").sum() if "Interest Level" in df.columns else 0
-    low_interest = (df["Interest Level"] == "Low").sum() if "Interest Level" in df.columns else 0
-
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("🎯 Total Leads", total_leads)
-    col2.metric("🔥 High Interest", high_interest, delta=f"{round(high_interest/total_leads*100) if total_leads > 0 else 0}%")
-    col3.metric("⚡ Medium Interest", medium_interest, delta=f"{round(medium_interest/total_leads*100) if total_leads > 0 else 0}%")
-    col4.metric("📊 Low Interest", low_interest, delta=f"{round(low_interest/total_leads*100) if total_leads > 0 else 0}%")
-
-    st.markdown("---")
-
-    # Charts Section
-    chart_col1, chart_col2 = st.columns(2)
+    show_dashboard_overview(dataset)
+
+
+def _dataset_frame(dataset):
+    """Prepared leads DataFrame + its data version; query-capable stores only load it once someone searches"""
+    if dataset["df"] is not None:
+        return dataset["df"], dataset["data_version"]
+    raw_df = load_data_as_df()
+    data_version = raw_df.attrs.get("data_version")
+    return get_aggregate_cache().get_or_compute((data_version, "prepared"), lambda: prepare_leads(raw_df),
+                                                budgeted=False), data_version
+
+
+@traced_fragment
+def show_dashboard_overview(dataset):
+    """Search and everything computed from the searched leads; typing a search reruns only this"""
+    require_admin_session()
+    search_term = st.text_input("🔍 Search", placeholder="Company name, contact, industry...", label_visibility="collapsed")
+
+    # Everything below is memoized per data version, so reruns that only change
+    # the search term or filters don't redo the unchanged work
+    cache = get_aggregate_cache()
+    store = get_lead_store()
+    weights = get_scoring_weights()
+
+    # Free-text search needs the normalized search index, so it always goes through the DataFrame path
+    pushdown = dataset["pushdown"] and not search_term
+    if pushdown:
+        df = None
+        data_version = dataset["data_version"]
+        aggs = cache.get_or_compute(
+            (data_version, "store-aggregates", recent_cutoff()),
+            lambda: compute_store_aggregates(store, weights),
+        )
+    else:
+        df, data_version = _dataset_frame(dataset)
+        if search_term:
+            search_mask = cache.get_or_compute(
+                (data_version, "search", search_term),
+                lambda: get_search_index(data_version, df).search(search_term).to_numpy(),
+            )
+            df = df[search_mask]
+            st.info(f"🔍 Found {len(df)} results for '{search_term}'")
 
-    with chart_col1:
-        st.markdown("#### 📍 Leads by Location")
-        if "Location" in df.columns and not df["Location"].isna().all():
-            location_counts = df["Location"].value_counts().head(10)
-            st.bar_chart(location_counts)
-        else:
-            st.info("No location data available")
+        aggs = cache.get_or_compute(
+            (data_version, "aggregates", search_term, recent_cutoff()),
+            lambda: compute_dashboard_aggregates(df),
+        )
 
-    with chart_col2:
-        st.markdown("#### 🏢 Leads by Industry")
-        if "Industry" in df.columns and not df["Industry"].isna().all():
-            industry_counts = df["Industry"].value_counts().head(10)
-            st.bar_chart(industry_counts)
-        else:
-            st.info("No industry data available")
+    with span('render.metrics_charts'):
+        # KPIs Section
+        st.markdown("### 📈 Key Metrics")
+        total_leads = aggs["total"]
+        interest_counts = aggs["interest_counts"]
+        high_interest = interest_counts.get("High", 0) if interest_counts is not None else 0
+        medium_interest = interest_counts.get("Medium", 0) if interest_counts is not None else 0
+        low_interest = interest_counts.get("Low", 0) if interest_counts is not None else 0
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("🎯 Total Leads", total_leads)
+        col2.metric("🔥 High Interest", high_interest, delta=f"{round(high_interest/total_leads*100) if total_leads > 0 else 0}%")
+        col3.metric("⚡ Medium Interest", medium_interest, delta=f"{round(medium_interest/total_leads*100) if total_leads > 0 else 0}%")
+        col4.metric("📊 Low Interest", low_interest, delta=f"{round(low_interest/total_leads*100) if total_leads > 0 else 0}%")
+
+        st.markdown("---")
+
+        # Charts Section
+        chart_col1, chart_col2 = st.columns(2)
+
+        with chart_col1:
+            st.markdown("#### 📍 Leads by Location")
+            if aggs["location_counts"] is not None:
+                st.bar_chart(aggs["location_counts"])
+            else:
+                st.info("No location data available")
 
-    st.markdown("---")
+        with chart_col2:
+            st.markdown("#### 🏢 Leads by Industry")
+            if aggs["industry_counts"] is not None:
+                st.bar_chart(aggs["industry_counts"])
+            else:
+                st.info("No industry data available")
+
+        st.markdown("---")
+
+        # Interest Level Distribution
+        st.markdown("#### 🎯 Interest Level Distribution")
+        if interest_counts is not None:
+            interest_col1, interest_col2 = st.columns([2, 1])
+            with interest_col1:
+                st.bar_chart(interest_counts)
+            with interest_col2:
+                st.markdown("**Breakdown:**")
+                for level in ["High", "Medium", "Low"]:
+                    count = interest_counts.get(level, 0)
+                    percentage = round(count / total_leads * 100) if total_leads > 0 else 0
+                    st.metric(f"{level}", f"{count} ({percentage}%)")
+
+        st.markdown("---")
+
+    with span('render.recent_top'):
+        # Recent Leads Section
+        st.markdown("### 🆕 Recent Leads (Last 7 Days)")
+        recent = aggs["recent"]
+        if recent is not None:
+            if recent["count"] > 0:
+                recent_col1, recent_col2, recent_col3 = st.columns(3)
+                recent_col1.metric("📊 New Leads (7d)", recent["count"])
+                recent_col2.metric("🔥 High Interest", recent["high"])
+                recent_col3.metric("⭐ Avg Score", recent["avg_score"])
+
+                # Show recent leads table
+                if not recent["table"].empty:
+                    st.dataframe(recent["table"], use_container_width=True, hide_index=True)
+            else:
+                st.info("No leads added in the last 7 days")
 
-    # Interest Level Distribution
-    st.markdown("#### 🎯 Interest Level Distribution")
-    if "Interest Level" in df.columns:
-        interest_col1, interest_col2 = st.columns([2, 1])
-        with interest_col1:
-            interest_counts = df["Interest Level"].value_counts()
-            st.bar_chart(interest_counts)
-        with interest_col2:
-            st.markdown("**Breakdown:**")
-            for level in ["High", "Medium", "Low"]:
-                count = interest_counts.get(level, 0)
-                percentage = round(count / total_leads * 100) if total_leads > 0 else 0
-                st.metric(f"{level}", f"{count} ({percentage}%)")
+        st.markdown("---")
 
-    st.markdown("---")
+        # Top Leads Table
+        st.markdown("### 🏆 Top 20 Leads by Score")
+        if aggs["top_leads"] is not None:
+            st.dataframe(
+                aggs["top_leads"],
+                use_container_width=True,
+                hide_index=True
+            )
 
-    # Recent Leads Section
-    st.markdown("### 🆕 Recent Leads (Last 7 Days)")
-    if "Timestamp" in df.columns:
-        seven_days_ago = pd.Timestamp.now() - pd.Timedelta(days=7)
-        recent_df = df[df["Timestamp"] >= seven_days_ago].sort_values("Timestamp", ascending=False)
+        st.markdown("---")
 
-        if len(recent_df) > 0:
-            recent_col1, recent_col2, recent_col3 = st.columns(3)
-            recent_col1.metric("📊 New Leads (7d)", len(recent_df))
+    show_lead_trends(dataset)
 
-            high_recent = (recent_df["Interest Level"] == "High").sum() if "Interest Level" in recent_df.columns else 0
-            recent_col2.metric("🔥 High Interest", high_recent)
+    show_duplicate_groups(dataset)
 
-            # Calculate average score
-            avg_score = round(recent_df["Lead Score"].mean(), 1) if len(recent_df) > 0 else 0
-            recent_col3.metric("⭐ Avg Score", avg_score)
+    show_filtered_leads({
+        "pushdown": pushdown,
+        "df": df,
+        "data_version": data_version,
+        "search_term": search_term,
+        "aggs": aggs,
+    })
 
-            # Show recent leads table
-            recent_display_cols = [col for col in ["Timestamp", "Company Name", "Location", "HR/Contact Name", "Interest Level"] if col in recent_df.columns]
-            if recent_display_cols:
-                st.dataframe(recent_df[recent_display_cols].head(10), use_container_width=True, hide_index=True)
-        else:
-            st.info("No leads added in the last 7 days")
 
-    st.markdown("---")
+@traced_fragment
+def show_lead_trends(dataset):
+    """Leads over time from the incremental rollups; changing the range or breakdown reruns only this"""
+    require_admin_session()
+    with span('render.trends'):
+        st.markdown("### 📅 Lead Trends")
+        rollups = refreshed_lead_rollups(dataset)
+        if rollups.start is None:
+            st.info("No dated leads yet")
+            st.markdown("---")
+            return
 
-    # Top Leads Table
-    st.markdown("### 🏆 Top 20 Leads by Score")
-    display_cols = [col for col in ["Timestamp", "Company Name", "Location", "Industry", "HR/Contact Name", "Interest Level", "Lead Score"] if col in df.columns]
-    if display_cols:
-        top_leads = df.sort_values("Lead Score", ascending=False)[display_cols].head(20)
-        st.dataframe(
-            top_leads,
-            use_container_width=True,
-            hide_index=True
-        )
+        first_day, last_day = rollups.start.date(), rollups.end.date()
+        default_start = max(first_day, last_day - timedelta(days=TREND_DEFAULT_DAYS - 1))
+        trend_col1, trend_col2, trend_col3 = st.columns([2, 2, 1])
+        with trend_col1:
+            date_range = st.date_input("Date range", value=(default_start, last_day),
+                                       min_value=first_day, max_value=last_day, key="trend_range")
+        with trend_col2:
+            granularity = st.radio("Granularity", list(TREND_GRANULARITIES), horizontal=True, key="trend_granularity")
+        with trend_col3:
+            dimension = st.selectbox("Breakdown", ROLLUP_DIMENSIONS, key="trend_dimension")
+        if len(date_range) != 2:
+            st.caption("Pick an end date")
+            st.markdown("---")
+            return
 
-    st.markdown("---")
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+        freq, window, unit = TREND_GRANULARITIES[granularity]
+        counts = rollups.series(dimension, start, end, freq)
+        totals = counts.sum(axis=1)
+        interest = counts if dimension == "Interest Level" else rollups.series("Interest Level", start, end, freq)
+
+        # Same-length period just before the selected one
+        period = end - start + pd.Timedelta(days=1)
+        in_range = int(totals.sum())
+        previous = int(rollups.range_counts(dimension, start - period, start - pd.Timedelta(days=1)).sum())
+        high = int(interest["High"].sum()) if "High" in interest else 0
+
+        metric_col1, metric_col2, metric_col3 = st.columns(3)
+        metric_col1.metric("📊 Leads in Range", in_range, delta=in_range - previous, help="Compared with the previous period of the same length")
+        metric_col2.metric("🔥 High Interest Share", f"{round(high / in_range * 100) if in_range else 0}%")
+        metric_col3.metric(f"📈 Avg per {unit.title()}",
+                           round(in_range / len(totals), 1) if len(totals) else 0)
+
+        st.markdown(f"#### Leads by {dimension}")
+        top_values = [value for value in counts.sum().nlargest(TREND_TOP_VALUES).index if value]
+        st.line_chart(counts[top_values] if top_values else totals.rename("Leads"))
+
+        chart_col1, chart_col2 = st.columns(2)
+        with chart_col1:
+            st.markdown(f"#### Total ({window}-{unit} average)")
+            st.line_chart(pd.DataFrame({
+                "Leads": totals,
+                "Rolling average": totals.rolling(window, min_periods=1).mean().round(1),
+            }))
+        with chart_col2:
+            st.markdown("#### 🔥 High Interest Share (%)")
+            high_counts = interest["High"] if "High" in interest else totals * 0
+            share = (high_counts / totals.where(totals > 0) * 100).round(1)
+            st.line_chart(pd.DataFrame({
+                "High share": share,
+                "Rolling average": (high_counts.rolling(window, min_periods=1).sum()
+                                    / totals.rolling(window, min_periods=1).sum().where(lambda s: s > 0) * 100).round(1),
+            }))
+
+        st.markdown("---")
+
+
+@traced_fragment
+def show_duplicate_groups(dataset):
+    require_admin_session()
+    with span('render.duplicates'):
+        # Possible duplicates, from the same index the lead form checks against
+        st.markdown("### 🧬 Possible Duplicates")
+        if st.toggle("Group leads that look like the same company", help="Similar company names or the same LinkedIn profile"):
+            with st.spinner("Looking for duplicates..."):
+                if dataset["raw_df"] is not None:
+                    get_duplicate_index().refresh(dataset["raw_df"])
+                index = refreshed_duplicate_index()
+                groups = get_aggregate_cache().get_or_compute((dataset["data_version"], "duplicate-groups"), index.groups)
+            if groups:
+                st.caption(f"{len(groups)} groups • {sum(len(group) for group in groups)} leads"
+                           + (f" • showing the {DUPLICATE_GROUPS_SHOWN} largest" if len(groups) > DUPLICATE_GROUPS_SHOWN else ""))
+                st.dataframe(
+                    pd.DataFrame(
+                        [(number, *row) for number, group in enumerate(groups[:DUPLICATE_GROUPS_SHOWN], 1) for row in group],
+                        columns=["Group", "Company Name", "HR/Contact Name", "Timestamp", "LinkedIn Link", "Lead ID"],
+                    ),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.info("No likely duplicates found")
+
+        st.markdown("---")
+
+
+@traced_fragment
+def show_filtered_leads(view):
+    """Filters and the lead list for the searched leads; changing a filter or page reruns only this"""
+    require_admin_session()
+    cache = get_aggregate_cache()
+    store = get_lead_store()
+    weights = get_scoring_weights()
+    pushdown, df, data_version = view["pushdown"], view["df"], view["data_version"]
+    search_term, aggs = view["search_term"], view["aggs"]
+    total_leads = aggs["total"]
+
+    with span('render.filters_list'):
+        # Filters Section
+        st.markdown("### 🔍 Filter & Export Leads")
+
+        filter_col1, filter_col2, filter_col3 = st.columns(3)
+
+        with filter_col1:
+            if "Location" in aggs["columns"]:
+                location_filter = st.multiselect(
+                    "📍 Filter by Location",
+                    options=aggs["options"]["Location"],
+                    default=[]
+                )
+            else:
+                location_filter = []
+
+        with filter_col2:
+            if "Interest Level" in aggs["columns"]:
+                interest_filter = st.multiselect(
+                    "🎯 Filter by Interest",
+                    options=aggs["options"]["Interest Level"],
+                    default=[]
+                )
+            else:
+                interest_filter = []
+
+        with filter_col3:
+            if "Industry" in aggs["columns"]:
+                industry_filter = st.multiselect(
+                    "🏢 Filter by Industry",
+                    options=aggs["options"]["Industry"],
+                    default=[]
+                )
+            else:
+                industry_filter = []
 
-    # Filters Section
-    st.markdown("### 🔍 Filter & Export Leads")
+        # Apply filters
+        filter_key = (data_version, search_term, tuple(sorted(location_filter)),
+                      tuple(sorted(interest_filter)), tuple(sorted(industry_filter)))
+        if pushdown:
+            filters = {"Location": location_filter, "Interest Level": interest_filter, "Industry": industry_filter}
+            filtered_count = cache.get_or_compute(filter_key + ("count",), lambda: store.count(filters))
 
-    filter_col1, filter_col2, filter_col3 = st.columns(3)
+            def fetch_page(sort_col, start, size):
+                return store.fetch(filters, order_by=sort_col, limit=size, offset=start, weights=weights)
 
-    with filter_col1:
-        if "Location" in df.columns:
-            location_options = sorted([loc for loc in df["Location"].dropna().unique() if loc])
-            location_filter = st.multiselect(
-                "📍 Filter by Location",
-                options=location_options,
-                default=[]
-            )
+            def export_frame():
+                return store.fetch(filters, weights=weights)
         else:
-            location_filter = []
-
-    with filter_col2:
-        if "Interest Level" in df.columns:
-            interest_options = sorted([lvl for lvl in df["Interest Level"].dropna().unique() if lvl])
-            interest_filter = st.multiselect(
-                "🎯 Filter by Interest",
-                options=interest_options,
-                default=[]
+            filter_mask = cache.get_or_compute(
+                filter_key + ("filter",),
+                lambda: filter_leads_mask(df, location_filter, interest_filter, industry_filter),
             )
-        else:
-            interest_filter = []
-
-    with filter_col3:
-        if "Industry" in df.columns:
-            industry_options = sorted([ind for ind in df["Industry"].dropna().unique() if ind])
-            industry_filter = st.multiselect(
-                "🏢 Filter by Industry",
-                options=industry_options,
-                default=[]
-            )
-        else:
-            industry_filter = []
-
-    # Apply filters
-    filtered_df = df.copy()
-    if location_filter:
-        filtered_df = filtered_df[filtered_df["Location"].isin(location_filter)]
-    if interest_filter:
-        filtered_df = filtered_df[filtered_df["Interest Level"].isin(interest_filter)]
-    if industry_filter:
-        filtered_df = filtered_df[filtered_df["Industry"].isin(industry_filter)]
-
-    # Show filtered count
-    st.info(f"📊 Showing {len(filtered_df)} of {total_leads} leads")
-
-    # Display filtered table with action buttons
-    st.markdown("#### 📋 All Leads")
-
-    # Add action columns for each lead
-    for idx, row in filtered_df.iterrows():
-        with st.expander(f"🏢 {row.get('Company Name', 'N/A')} - {row.get('Interest Level', 'N/A')} Interest"):
-            detail_col1, detail_col2, detail_col3 = st.columns([2, 2, 1])
-
-            with detail_col1:
-                st.write(f"**📍 Location:** {row.get('Location', 'N/A')}")
-                st.write(f"**🏢 Industry:** {row.get('Industry', 'N/A')}")
-                st.write(f"**👥 Size:** {row.get('Size', 'N/A')}")
-
-            with detail_col2:
-                st.write(f"**👤 Contact:** {row.get('HR/Contact Name', 'N/A')}")
-                st.write(f"**💼 Role:** {row.get('Role', 'N/A')}")
-                st.write(f"**⭐ Score:** {row.get('Lead Score', 0)}")
-
-            with detail_col3:
-                # Quick action buttons
-                linkedin = row.get('LinkedIn Link', '')
-                if linkedin and linkedin.strip():
-                    st.link_button("🔗 LinkedIn", linkedin, use_container_width=True)
-
-            # Notes section
-            if row.get('Notes', ''):
-                st.write(f"**📝 Notes:** {row.get('Notes', '')}")
-
-            # Timestamp
-            if 'Timestamp' in row and pd.notna(row['Timestamp']):
-                st.caption(f"Added: {row['Timestamp']}")
-
-    # Download Section
-    st.markdown("---")
-    st.markdown("### 📥 Export Data")
-
-    export_col1, export_col2 = st.columns([1, 3])
-
-    with export_col1:
-        csv = filtered_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download as CSV",
-            data=csv,
-            file_name=f'towngym_leads_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-            mime='text/csv',
-            use_container_width=True
-        )
+            filtered_df = df[filter_mask]
+            filtered_count = len(filtered_df)
+            fetch_page = dataframe_page_fetcher(filtered_df, cache_key=filter_key)
+
+            def export_frame():
+                return with_lazy_columns(filtered_df).drop(columns=ROW_REF_COLUMN, errors="ignore")
+
+        # Show filtered count
+        st.info(f"📊 Showing {filtered_count} of {total_leads} leads")
+
+        # Display filtered table with action buttons
+        st.markdown("#### 📋 All Leads")
+
+        show_leads_list(filtered_count, fetch_page)
+
+    show_export(filter_key, filtered_count, export_frame)
+
+
+@traced_fragment
+def show_export(filter_key, filtered_count, export_frame):
+    require_admin_session()
+    cache = get_aggregate_cache()
+    with span('render.export'):
+        # Download Section
+        st.markdown("---")
+        st.markdown("### 📥 Export Data")
+
+        export_col1, export_col2, export_col3 = st.columns([1, 1, 2])
+
+        with export_col1:
+            export_format = st.selectbox("Format", available_export_formats(), label_visibility="collapsed")
+
+        # Export bytes are only built when asked for, then cached per data version + filters + format
+        export_key = filter_key + ("export", export_format)
+        export_data = cache.get(export_key)
+        with export_col2:
+            if export_data is None and st.button("📦 Prepare export", use_container_width=True):
+                with st.spinner("Preparing export..."):
+                    export_data = cache.get_or_compute(export_key, lambda: export_leads(export_frame(), export_format))
+            if export_data is not None:
+                extension, mime = EXPORT_FORMATS[export_format]
+                st.download_button(
+                    label=f"📥 Download {export_format}",
+                    data=export_data,
+                    file_name=f'towngym_leads_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}',
+                    mime=mime,
+                    use_container_width=True
+                )
+
+        with export_col3:
+            st.caption(f"💾 Download includes {filtered_count} filtered leads • Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+def show_bulk_import():
+    st.header("📤 Bulk Import Leads")
+    st.caption("Upload a CSV or Excel file with the lead form's columns (Company Name and HR/Contact Name are required). "
+               "Rows are checked with the same rules as the form, then written to Google Sheets in large batches in the background.")
+
+    uploaded = st.file_uploader("Lead file", type=["csv", "xlsx"])
+    if uploaded is not None:
+        data = uploaded.getvalue()
+        try:
+            df = read_lead_file(data, uploaded.name)
+        except Exception as e:
+            st.error(f"❌ Could not read the file: {e}")
+            return
+        if len(df) > IMPORT_MAX_ROWS:
+            st.error(f"❌ The file has {len(df)} rows; import at most {IMPORT_MAX_ROWS} at a time.")
+            return
 
-    with export_col2:
-        st.caption(f"💾 Download includes {len(filtered_df)} filtered leads • Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        try:
+            rows, report = validate_import(df)
+        except Exception as e:
+            st.error(f"❌ Could not check the file: {e}")
+            return
+        count_col1, count_col2 = st.columns(2)
+        count_col1.metric("✅ Valid rows", len(rows))
+        count_col2.metric("❌ Rows with errors", len(report))
+
+        if not report.empty:
+            st.dataframe(report, use_container_width=True, hide_index=True)
+            st.download_button("📥 Download error report", report.to_csv(index=False).encode("utf-8"),
+                               file_name="import_errors.csv", mime="text/csv")
+
+        if len(rows) and st.button(f"📤 Import {len(rows)} leads", type="primary"):
+            lead_ids = import_lead_ids(data, rows)
+            added = get_lead_writer().enqueue_many(zip(rows.values.tolist(), lead_ids))
+            st.session_state["last_import"] = {"name": uploaded.name, "lead_ids": lead_ids}
+            skipped = len(lead_ids) - added
+            st.success(f"✅ {added} leads queued for writing" +
+                       (f" ({skipped} were already imported from this file)" if skipped else ""))
+
+    # Progress of the last import; the outbox keeps it across reruns and restarts
+    last_import = st.session_state.get("last_import")
+    if last_import:
+        st.markdown(f"#### Import progress: {last_import['name']}")
+        writer = get_lead_writer()
+        status = writer.outbox.status(last_import["lead_ids"])
+        total = len(last_import["lead_ids"])
+        st.progress(status["written"] / total if total else 1.0,
+                    text=f"{status['written']} of {total} written • {status['pending']} waiting")
+        progress_col1, progress_col2 = st.columns(2)
+        with progress_col1:
+            if status["pending"] and st.button("🔄 Refresh progress", use_container_width=True):
+                st.rerun()
+        with progress_col2:
+            if status["failed"]:
+                st.caption(f"❌ {status['failed']} rows failed: {writer.last_error or 'see the write queue'}")
+                if st.button("🔁 Retry failed rows", use_container_width=True):
+                    writer.retry_failed(last_import["lead_ids"])
+                    st.rerun()
+
+
+def show_diagnostics_panel(tracer):
+    """Admin-only sidebar panel: rolling span timings and Sheets calls of the last rerun"""
+    with st.sidebar.expander("🩺 Diagnostics"):
+        warmup = start_warmup()
+        if warmup["enabled"]:
+            if warmup["error"]:
+                st.caption(f"Warm-up failed: {warmup['error']}")
+            elif warmup["finished"]:
+                st.caption(f"Warm-up done in {warmup['finished'] - warmup['started']:.1f} s")
+            else:
+                st.caption("Warm-up running...")
+        disk = get_disk_snapshot()
+        if disk is not None and disk.last_error:
+            st.caption(f"Saved snapshot: {disk.last_error}")
+        tracer.enabled = st.toggle("Trace reruns", value=tracer.enabled,
+                                   help="Time each rerun's Sheets calls, transforms and sections (all sessions)")
+        if not tracer.enabled:
+            return
+        last = tracer.last_rerun
+        if last is None:
+            st.caption("No traced reruns yet.")
+            return
+        st.caption(f"Last rerun ({last['page']}): {last['spans_ms'].get('rerun.total', 0):.0f} ms • "
+                   f"{last['api_calls']} Sheets calls • {last['api_bytes'] / 1024:.1f} KB")
+        st.dataframe(pd.DataFrame(tracer.summary()), use_container_width=True, hide_index=True)
+        cache = get_aggregate_cache()
+        st.caption(f"Aggregate cache: {cache.hits} hits / {cache.misses} misses")
+        if st.button("Reset timings", use_container_width=True):
+            tracer.reset()
+            st.rerun()
 
 
 def admin_login():
@@ -544,22 +3920,68 @@ def admin_login():
 # MAIN APP
 # =========================
 
+@st.cache_resource
+def start_warmup():
+    """Once per process, if enabled: connect to the lead store in the background.
+
+    Streamlit has no server-start hook, so this runs when the first session
+    loads; everything it touches is cached process-wide. Returns a dict with
+    the warm-up's progress, shown in the diagnostics panel.
+    """
+    enabled = WARMUP_ON_START
+    try:
+        enabled = bool(st.secrets["startup"].get("warmup", enabled))
+    except Exception:
+        pass
+    status = {"enabled": enabled, "started": time.time(), "finished": None, "error": None}
+    if not enabled:
+        return status
+
+    store = get_lead_store()
+
+    def run():
+        try:
+            store.warm_up()  # authorizes the Sheets client and resolves the worksheet
+        except Exception as e:
+            status["error"] = f"{type(e).__name__}: {e}"
+        status["finished"] = time.time()
+
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+    return status
+
+
 def main():
     st.set_page_config(page_title="Towngym Corporate Leads", page_icon="🏋️", layout="wide")
 
     st.sidebar.title("Navigation")
-    page = st.sidebar.radio("Go to", ["Lead Form", "Admin Dashboard"])
+    page = st.sidebar.radio("Go to", ["Lead Form", "Admin Dashboard", "Bulk Import"])
 
-    # Admin login section
-    admin_login()
-
-    if page == "Lead Form":
-        show_lead_form()
-    elif page == "Admin Dashboard":
-        if st.session_state.get("is_admin", False):
-            show_admin_dashboard()
-        else:
-            st.error("Admins only. Please login from the sidebar.")
+    tracer = get_tracer()
+    start_trace(tracer)
+    try:
+        with span("rerun.total"):
+            start_warmup()
+            refresh_duplicate_index_in_background()
+
+            # Resume writing leads left in the outbox by a previous run
+            get_lead_writer()
+
+            # Admin login section
+            admin_login()
+
+            if page == "Lead Form":
+                show_lead_form()
+            elif not st.session_state.get("is_admin", False):
+                st.error("Admins only. Please login from the sidebar.")
+            elif page == "Admin Dashboard":
+                show_admin_dashboard()
+            elif page == "Bulk Import":
+                show_bulk_import()
+    finally:
+        finish_trace(tracer, page)
+
+    if st.session_state.get("is_admin", False):
+        show_diagnostics_panel(tracer)
 
     # Footer
     st.markdown("---")
@@ -0,0 +1,7 @@
+"""main.py is a Streamlit script, not a package: make it (and the benchmarks' fake gspread) importable."""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
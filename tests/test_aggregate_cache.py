@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+import main
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_entries():
+    cache = main.AggregateCache(max_entries=2)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get("a")
+    cache.get_or_compute("c", lambda: 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_entries_are_evicted_to_stay_within_max_bytes():
+    cache = main.AggregateCache(max_bytes=2500)
+    for key in "abc":
+        cache.get_or_compute(key, lambda: np.zeros(100))  # 800 bytes each
+
+    cache.get_or_compute("d", lambda: np.zeros(100))
+
+    assert [key for key in "abcd" if cache.get(key) is not None] == ["b", "c", "d"]
+    assert cache._bytes == 2400
+
+
+def test_values_over_max_bytes_are_returned_but_not_kept():
+    cache = main.AggregateCache(max_bytes=1000)
+    cache.get_or_compute("small", lambda: np.zeros(10))
+    big = cache.get_or_compute("big", lambda: np.zeros(1000))
+
+    assert len(big) == 1000
+    assert cache.get("big") is None
+    assert cache.get("small") is not None
+    assert cache._bytes == 80
+
+
+def test_string_contents_count_towards_the_size():
+    short = pd.Series(["x"] * 1000, dtype=object)
+    long = pd.Series(["x" * 1000] * 1000, dtype=object)
+
+    assert main._estimate_size(long) > main._estimate_size(short) + 900_000
+
+
+def test_dataset_frames_stay_outside_the_byte_budget():
+    cache = main.AggregateCache(max_bytes=1000, max_frames=2)
+    frame = pd.DataFrame({"Company Name": ["x" * 100] * 1000})
+    cache.get_or_compute("small", lambda: np.zeros(10))
+
+    assert cache.get_or_compute("v1", lambda: frame, budgeted=False) is frame
+    assert cache.get_or_compute("v1", lambda: None, budgeted=False) is frame  # cached though over max_bytes
+    assert cache._bytes == 80
+    assert cache.get("small") is not None  # and nothing was evicted for it
+
+    cache.get_or_compute("v2", lambda: frame.copy(), budgeted=False)
+    cache.get_or_compute("v3", lambda: frame.copy(), budgeted=False)
+    assert cache.get("v1") is None  # frames have max_frames slots of their own
+    assert cache.get("v3") is not None
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import main
+
+
+def local(*args):
+    """The naive local time of a UTC time"""
+    return datetime(*args, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+def test_dates_are_read_iso_first_then_day_first():
+    parsed = main.parse_import_timestamps(pd.Series([
+        "2026-10-05", "2026-10-05 09:30:00", "05/10/2026", "05-10-2026 14:30", "5.10.2026", "5 Oct 2026",
+    ]))
+
+    assert parsed.tolist() == [
+        datetime(2026, 10, 5), datetime(2026, 10, 5, 9, 30), datetime(2026, 10, 5),
+        datetime(2026, 10, 5, 14, 30), datetime(2026, 10, 5), datetime(2026, 10, 5),
+    ]
+
+
+def test_dates_that_are_not_understood_are_missing():
+    parsed = main.parse_import_timestamps(pd.Series(["31/02/2026", "10/31/2026", "soon", "", None]))
+
+    assert parsed.isna().all()  # never silently read month first
+
+
+def test_offsets_are_converted_to_local_time_alongside_naive_times():
+    parsed = main.parse_import_timestamps(pd.Series([
+        "2026-10-05T10:00:00+02:00", "2026-10-05 09:00:00", "2026-10-05T08:00:00Z", "05/10/2026",
+    ]))
+
+    assert parsed.tolist() == [local(2026, 10, 5, 8), datetime(2026, 10, 5, 9), local(2026, 10, 5, 8),
+                               datetime(2026, 10, 5)]
+
+
+def test_valid_rows_are_kept_and_invalid_ones_reported():
+    df = pd.DataFrame({
+        "Company Name": ["Nile Foods", "", "Delta Bank", "Cairo Tech"],
+        "HR/Contact Name": ["Mona", "Omar", "", "Sara"],
+        "Interest Level": ["high", "", "Low", "Maybe"],
+        "Timestamp": ["2026-10-05T10:00:00Z", "05/10/2026", "", "12/31/2026"],
+    })
+
+    rows, report = main.validate_import(df)
+
+    assert rows["Company Name"].tolist() == ["Nile Foods"]
+    assert rows["Interest Level"].tolist() == ["High"]
+    assert rows["Timestamp"].tolist() == [local(2026, 10, 5, 10).strftime(main.TIMESTAMP_FORMAT)]
+    assert report["Row"].tolist() == [3, 4, 5]
+    assert report["Errors"].tolist() == [
+        "Company Name is required",
+        "HR/Contact Name is required",
+        "Interest Level must be Low, Medium or High; "
+        "Timestamp must be a date like 2026-10-05 or 05/10/2026 (day first)",
+    ]
@@ -0,0 +1,107 @@
+import threading
+
+import pandas as pd
+
+import main
+
+
+def leads(*companies, linkedin=None):
+    linkedin = linkedin or [""] * len(companies)
+    return pd.DataFrame({
+        "Timestamp": ["2026-10-05 10:00:00"] * len(companies),
+        "Company Name": list(companies),
+        "HR/Contact Name": ["Contact"] * len(companies),
+        "LinkedIn Link": linkedin,
+        "Lead ID": [f"lead-{i}" for i in range(len(companies))],
+    })
+
+
+def index_of(df):
+    index = main.DuplicateIndex()
+    index.refresh(df)
+    return index
+
+
+def matched(index, company, linkedin="", **options):
+    return [row[0] for _, row in index.matches(company, linkedin, **options)]
+
+
+def test_spellings_of_the_same_company_match():
+    index = index_of(leads("Nile Foods Co.", "Falcon Solutions", "Delta Bank"))
+
+    assert matched(index, "nile foods") == ["Nile Foods Co."]  # legal-form words and punctuation don't count
+    assert matched(index, "Falcon Solution") == ["Falcon Solutions"]
+    assert matched(index, "Cairo Bakery") == []
+
+
+def test_similarity_must_reach_the_threshold():
+    index = index_of(leads("Falcon Solutions"))
+    grams = main._trigrams("falcon solution"), main._trigrams("falcon solutions")
+    dice = 2 * len(grams[0] & grams[1]) / (len(grams[0]) + len(grams[1]))
+
+    assert matched(index, "Falcon Solution", threshold=dice) == ["Falcon Solutions"]
+    assert matched(index, "Falcon Solution", threshold=dice + 0.01) == []
+
+
+def test_names_with_different_numbers_never_match():
+    index = index_of(leads("Towngym Branch 1"))
+
+    assert matched(index, "Towngym Branch 2") == []
+    assert matched(index, "Towngym Branch 1") == ["Towngym Branch 1"]
+
+
+def test_same_linkedin_profile_matches_whatever_the_name():
+    index = index_of(leads("Nile Foods", linkedin=["https://www.linkedin.com/in/mona-aly/"]))
+
+    assert index.matches("Completely Different", "http://eg.linkedin.com/in/Mona-Aly?trk=x") == \
+        [(1.0, ("Nile Foods", "Contact", "2026-10-05 10:00:00", "https://www.linkedin.com/in/mona-aly/", "lead-0"))]
+    assert matched(index, "Completely Different", "https://linkedin.com/in/someone-else") == []
+
+
+def test_arabic_spellings_match():
+    index = index_of(leads("شركة النيل للأغذية"))
+
+    assert matched(index, "النيل للاغذيه") == ["شركة النيل للأغذية"]  # ة/ه, أ/ا and "company" folded away
+
+
+def test_refresh_adds_appended_rows_and_rebuilds_after_a_deletion():
+    index = index_of(leads("Nile Foods", "Delta Bank"))
+
+    index.refresh(leads("Nile Foods", "Delta Bank", "Cairo Bakery"))
+    assert index.size == 3
+    assert matched(index, "Cairo Bakery") == ["Cairo Bakery"]
+
+    index.refresh(leads("Delta Bank", "Cairo Bakery"))  # first row deleted: no longer an extension
+    assert index.size == 2
+    assert matched(index, "Nile Foods") == []
+
+
+def test_submissions_match_until_they_are_indexed():
+    index = index_of(leads("Nile Foods"))
+    row = ["2026-10-06 09:00:00", "Sphinx Travel", "", "", "", "Omar", "", "", "Low", ""]
+    index.note_submission(row, "lead-new")
+
+    assert matched(index, "Sphinx Travel") == ["Sphinx Travel"]
+
+    df = leads("Nile Foods", "Sphinx Travel")
+    df.loc[1, "Lead ID"] = "lead-new"
+    index.refresh(df)
+    assert matched(index, "Sphinx Travel") == ["Sphinx Travel"]  # once, from the index
+
+
+def test_background_refresh_runs_at_most_once_per_max_age():
+    index = main.DuplicateIndex()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return leads("Nile Foods")
+
+    index.refresh_in_background(load, max_age=60)
+    for thread in threading.enumerate():
+        if thread.name == "duplicate-index-refresh":
+            thread.join(timeout=10)
+    index.refresh_in_background(load, max_age=60)
+
+    assert len(loads) == 1
+    assert matched(index, "Nile Foods") == ["Nile Foods"]
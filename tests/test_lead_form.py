@@ -0,0 +1,60 @@
+import os
+import threading
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import fake_gspread
+import main
+from synthetic import make_lead_rows
+
+HARNESS = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "app_harness.py")
+
+
+def cold_app(tmp_path, monkeypatch, rows):
+    """The app on a fresh process: empty caches, no warm-up, a sheet already holding `rows`"""
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    monkeypatch.setattr(main, "OUTBOX_DB_FILE", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(main, "SNAPSHOT_FILE", "")
+    client = fake_gspread.FakeClient()
+    client.spreadsheet(main.SPREADSHEET_ID).seed(main.WORKSHEET_NAME, [main.LEAD_HEADERS] + rows)
+    monkeypatch.setattr(fake_gspread, "CURRENT_CLIENT", client, raising=False)
+    return AppTest.from_file(HARNESS, default_timeout=60)
+
+
+def wait_for_duplicate_index():
+    for thread in threading.enumerate():
+        if thread.name == "duplicate-index-refresh":
+            thread.join(timeout=30)
+
+
+def submit(at, company):
+    at.text_input[0].set_value(company)
+    at.text_input[4].set_value("Test Contact")
+    return at.button[0].click().run()
+
+
+def test_existing_company_is_flagged_on_a_cold_process(tmp_path, monkeypatch):
+    rows = make_lead_rows(20, seed=3)
+    at = cold_app(tmp_path, monkeypatch, rows)
+    at.run()  # the first session's Lead Form; nobody opens the dashboard
+    wait_for_duplicate_index()
+
+    submit(at, rows[5][1])
+
+    assert not at.exception
+    assert [w.value for w in at.warning] and "may already be registered" in at.warning[0].value
+    assert not at.success
+
+
+def test_new_company_is_submitted(tmp_path, monkeypatch):
+    at = cold_app(tmp_path, monkeypatch, make_lead_rows(20, seed=3))
+    at.run()
+    wait_for_duplicate_index()
+
+    submit(at, "Zzyzx Unmatched Holdings")
+
+    assert not at.exception
+    assert not at.warning
+    assert "successfully submitted" in at.success[0].value
@@ -0,0 +1,107 @@
+import time
+from collections import Counter
+
+import fake_gspread
+import main
+from synthetic import make_lead_rows
+
+
+def writer_for(ws, tmp_path, **options):
+    store = main.SheetsLeadStore(ws_factory=lambda: ws, lazy_columns=())
+    outbox = main.LeadOutbox(str(tmp_path / "outbox.db"))
+    options.setdefault("sleep", lambda seconds: None)
+    return main.LeadWriter(store, outbox, batch_size=1, flush_interval=0.01, **options)
+
+
+def sheet():
+    client = fake_gspread.FakeClient()
+    return client.spreadsheet("test").seed("Leads", [main.LEAD_HEADERS])
+
+
+def lead_ids_in(ws):
+    return Counter(row[-1] for row in ws.rows[1:])
+
+
+def test_rows_reach_the_sheet_once(tmp_path):
+    ws = sheet()
+    writer = writer_for(ws, tmp_path)
+    lead_ids = [writer.enqueue(row[:-1]) for row in make_lead_rows(3)]
+
+    assert writer.flush(timeout=10)
+    assert lead_ids_in(ws) == Counter(lead_ids)
+
+
+def test_retry_after_a_write_that_landed_does_not_duplicate_rows(tmp_path):
+    ws = sheet()
+    append_rows = ws.append_rows
+    failures = []
+
+    def append_then_fail(values, *args, **kwargs):
+        append_rows(values, *args, **kwargs)
+        if not failures:  # the rows are in the sheet, but the response never arrives
+            failures.append(values)
+            raise fake_gspread.api_error(503, "backend error")
+
+    ws.append_rows = append_then_fail
+    writer = writer_for(ws, tmp_path)
+    lead_ids = [writer.enqueue(row[:-1]) for row in make_lead_rows(3)]
+
+    assert writer.flush(timeout=10)
+    assert failures
+    assert lead_ids_in(ws) == Counter(lead_ids)
+
+
+def test_rows_that_keep_failing_are_marked_failed(tmp_path):
+    ws = sheet()
+
+    def reject(values, *args, **kwargs):
+        raise fake_gspread.api_error(400, "invalid value")
+
+    ws.append_rows = reject
+    writer = writer_for(ws, tmp_path, max_attempts=2)
+    lead_id = writer.enqueue(make_lead_rows(1)[0][:-1])
+
+    assert writer.flush(timeout=10)
+    assert writer.outbox.status([lead_id])["failed"] == 1
+    assert "invalid value" in writer.last_error
+
+
+def take_lease_from(writer):
+    """Another process takes the drain lease after this writer's lease expired"""
+    writer.outbox._conn().execute("UPDATE lease SET expires_at = 0")
+    assert writer.outbox.acquire_lease("other-process")
+
+
+def test_writer_stops_when_its_lease_expires_during_backoff(tmp_path):
+    ws = sheet()
+    appends = []
+
+    def unavailable(values, *args, **kwargs):
+        appends.append(values)
+        raise fake_gspread.api_error(503, "backend error")
+
+    ws.append_rows = unavailable
+    writer = writer_for(ws, tmp_path, sleep=lambda seconds: take_lease_from(writer))
+    lead_id = writer.enqueue(make_lead_rows(1)[0][:-1])
+
+    deadline = time.time() + 5
+    while not appends and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.3)  # the writer keeps waking up, but the lease is no longer its own
+
+    assert len(appends) == 1  # no retry once the backoff outlasted the lease
+    assert writer.outbox.status([lead_id])["pending"] == 1  # left for the lease holder to write
+
+
+def test_writer_stops_when_its_lease_expires_waiting_for_write_quota(tmp_path):
+    class SlowQuota:
+        def acquire(self, sleep):
+            take_lease_from(writer)
+
+    ws = sheet()
+    writer = writer_for(ws, tmp_path, rate_limiter=SlowQuota())
+    lead_id = writer.enqueue(make_lead_rows(1)[0][:-1])
+    time.sleep(0.3)
+
+    assert lead_ids_in(ws) == Counter()
+    assert writer.outbox.status([lead_id])["pending"] == 1
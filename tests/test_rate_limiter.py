@@ -0,0 +1,100 @@
+import main
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tokens_run_out_and_refill_evenly():
+    clock = Clock()
+    limiter = main.RateLimiter(10, 3600, clock=clock)
+    for _ in range(10):
+        assert limiter.try_acquire("a") == (True, 0.0)
+
+    allowed, retry_after = limiter.try_acquire("a")
+    assert not allowed
+    assert retry_after == 360  # one token every 6 minutes
+
+    clock.now += 360
+    assert limiter.try_acquire("a")[0]
+    assert not limiter.try_acquire("a")[0]
+
+
+def test_keys_have_their_own_buckets():
+    limiter = main.RateLimiter(1, 60, clock=Clock())
+
+    assert limiter.try_acquire("a")[0]
+    assert limiter.try_acquire("b")[0]
+    assert not limiter.try_acquire("a")[0]
+
+
+def test_least_recently_used_keys_are_evicted_beyond_max_keys():
+    limiter = main.RateLimiter(1, 60, max_keys=2, clock=Clock())
+    limiter.try_acquire("a")
+    limiter.try_acquire("b")
+    limiter.try_acquire("c")
+
+    assert list(limiter._buckets) == ["b", "c"]
+    assert limiter.try_acquire("a")[0]  # forgotten, so it starts with a full bucket again
+
+
+def test_idle_keys_are_evicted_once_their_bucket_would_be_full():
+    clock = Clock()
+    limiter = main.RateLimiter(2, 60, clock=clock)
+    limiter.try_acquire("idle")
+    clock.now += 60
+    limiter.try_acquire("busy")
+
+    assert list(limiter._buckets) == ["busy"]
+
+
+class Context:
+    def __init__(self, forwarded, ip_address=None):
+        self.headers = {"X-Forwarded-For": forwarded}
+        self.ip_address = ip_address
+
+
+def test_client_key_uses_the_connection_address_without_a_proxy(monkeypatch):
+    assert main.TRUSTED_PROXY_HOPS == 0
+    monkeypatch.setattr(main.st, "context", Context("198.51.100.1", ip_address="203.0.113.7"))
+    key = main.client_key()
+    assert key.startswith("ip:")
+
+    # Without a proxy the header is whatever the client sent: it can't rotate the key
+    monkeypatch.setattr(main.st, "context", Context("198.51.100.2", ip_address="203.0.113.7"))
+    assert main.client_key() == key
+
+
+def test_client_key_uses_the_address_added_by_the_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(main, "TRUSTED_PROXY_HOPS", 1)
+    monkeypatch.setattr(main.st, "context", Context("203.0.113.7"))
+    key = main.client_key()
+    assert key.startswith("ip:")
+
+    # Entries left of the proxy's are sent by the client and don't change the key
+    monkeypatch.setattr(main.st, "context", Context("198.51.100.1, 203.0.113.7"))
+    assert main.client_key() == key
+
+
+def test_client_key_counts_hops_from_the_right(monkeypatch):
+    monkeypatch.setattr(main.st, "context", Context("203.0.113.7"))
+    monkeypatch.setattr(main, "TRUSTED_PROXY_HOPS", 1)
+    direct = main.client_key()
+
+    monkeypatch.setattr(main, "TRUSTED_PROXY_HOPS", 2)
+    monkeypatch.setattr(main.st, "context", Context("198.51.100.1, 203.0.113.7, 10.0.0.2"))
+    assert main.client_key() == direct
+
+
+def test_client_key_falls_back_to_the_session_without_a_trusted_entry(monkeypatch):
+    monkeypatch.setattr(main, "TRUSTED_PROXY_HOPS", 2)
+    monkeypatch.setattr(main.st, "context", Context("203.0.113.7"))  # fewer entries than proxies
+    assert main.client_key().startswith("session:")
+
+    monkeypatch.setattr(main, "TRUSTED_PROXY_HOPS", 0)  # header not trusted, local connection
+    monkeypatch.setattr(main.st, "context", Context("198.51.100.1, 203.0.113.7"))
+    assert main.client_key().startswith("session:")
@@ -0,0 +1,86 @@
+import pandas as pd
+
+import main
+
+
+def leads(*timestamps, industry="IT"):
+    rows = [[f"{ts} 10:00:00", f"Company {ts}", industry, "", "New Maadi", "Contact", "", "", "High", "", f"id-{ts}"]
+            for ts in timestamps]
+    return pd.DataFrame(rows, columns=main.LEAD_HEADERS)
+
+
+def day(text):
+    return pd.Timestamp(text)
+
+
+def test_range_counts_cover_inclusive_days():
+    rollups = main.LeadRollups()
+    rollups.refresh(leads("2026-01-10", "2026-01-10", "2026-01-12", "2026-01-20"))
+
+    assert rollups.start == day("2026-01-10")
+    assert rollups.end == day("2026-01-20")
+    assert rollups.range_counts("Industry", day("2026-01-10"), day("2026-01-10"))["IT"] == 2
+    assert rollups.range_counts("Industry", day("2026-01-11"), day("2026-01-20"))["IT"] == 2
+    assert rollups.range_counts("Industry", day("2025-12-01"), day("2026-12-31"))["IT"] == 4
+
+
+def test_appended_rows_are_added_incrementally():
+    rollups = main.LeadRollups()
+    df = leads("2026-01-10", "2026-01-11")
+    rollups.refresh(df)
+    more = pd.concat([df, leads("2026-01-15", industry="Banking")], ignore_index=True)
+    rollups.refresh(more)
+
+    assert rollups.rows_seen == 3
+    counts = rollups.range_counts("Industry", day("2026-01-01"), day("2026-01-31"))
+    assert counts["IT"] == 2 and counts["Banking"] == 1
+
+
+def test_growing_both_ways_stops_at_the_newest_lead():
+    rollups = main.LeadRollups()
+    df = leads("2026-01-10", "2026-01-20")
+    rollups.refresh(df)
+    # One refresh adding rows both before the first and after the last day (e.g. a bulk import)
+    rollups.refresh(pd.concat([df, leads("2026-01-05", "2026-01-25")], ignore_index=True))
+
+    assert rollups.start == day("2026-01-05")
+    assert rollups.end == day("2026-01-25")
+    assert rollups.range_counts("Industry", day("2026-01-05"), day("2026-01-25"))["IT"] == 4
+    assert rollups.range_counts("Industry", day("2026-01-21"), day("2026-01-25"))["IT"] == 1
+
+
+def test_changed_rows_trigger_a_rebuild():
+    rollups = main.LeadRollups()
+    rollups.refresh(leads("2026-01-10", "2026-01-11"))
+    rollups.refresh(leads("2026-02-01"))  # not an extension of the counted rows
+
+    assert rollups.start == day("2026-02-01")
+    assert rollups.range_counts("Industry", day("2026-01-01"), day("2026-12-31"))["IT"] == 1
+
+
+def test_weekly_series_buckets_from_monday():
+    rollups = main.LeadRollups()
+    rollups.refresh(leads("2026-01-05", "2026-01-11", "2026-01-12"))  # Mon, Sun, next Mon
+
+    series = rollups.series("Industry", "2026-01-05", "2026-01-18", freq="W-MON")
+    assert series["IT"].tolist() == [2, 1]
+
+
+def test_counts_from_a_query_capable_store_match_counting_rows(tmp_path):
+    df = pd.concat([leads("2026-01-10", "2026-01-12"), leads("2026-01-13", industry="Banking")], ignore_index=True)
+    store = main.SqliteLeadStore(str(tmp_path / "leads.db"))
+    store.append_rows(df.values.tolist())
+
+    from_rows = main.LeadRollups()
+    from_rows.refresh(df)
+    from_counts = main.LeadRollups()
+    from_counts.load_counts({dim: store.daily_counts(dim) for dim in from_counts.dimensions})
+
+    assert (from_counts.start, from_counts.end) == (from_rows.start, from_rows.end)
+    for dim in from_rows.dimensions:
+        expected = from_rows.range_counts(dim, from_rows.start, from_rows.end).sort_index()
+        assert from_counts.range_counts(dim, from_counts.start, from_counts.end).sort_index().equals(expected)
+
+    # Counting rows afterwards starts over instead of adding to the loaded counts
+    from_counts.refresh(df)
+    assert from_counts.range_counts("Industry", from_counts.start, from_counts.end).sum() == 3
@@ -0,0 +1,135 @@
+import fake_gspread
+import main
+from synthetic import make_lead_rows
+
+
+def sheet(rows=5):
+    client = fake_gspread.FakeClient()
+    ws = client.spreadsheet("test").seed("Leads", [main.LEAD_HEADERS] + make_lead_rows(rows, seed=1))
+    return client, ws
+
+
+def test_first_sync_reads_the_whole_sheet():
+    client, ws = sheet()
+    df = main.LeadSheetSync().sync(ws)
+
+    assert list(df.columns) == main.LEAD_HEADERS
+    assert df["Company Name"].tolist() == [row[1] for row in ws.rows[1:]]
+    assert client.stats["calls.get_all_values"] == 1
+
+
+def test_appended_rows_are_fetched_without_a_full_reload():
+    client, ws = sheet()
+    sync = main.LeadSheetSync()
+    sync.sync(ws)
+    ws.append_rows(make_lead_rows(2, seed=2))
+    df = sync.sync(ws)
+
+    assert len(df) == 7
+    assert df["Company Name"].tolist()[-2:] == [row[1] for row in ws.rows[-2:]]
+    assert client.stats["calls.get_all_values"] == 1
+    assert client.stats["calls.get_values"] == 1  # just the new rows
+
+
+def test_unchanged_sheet_keeps_the_same_frame():
+    client, ws = sheet()
+    sync = main.LeadSheetSync()
+    first = sync.sync(ws)
+
+    assert sync.sync(ws) is first
+    assert client.stats["calls.get_all_values"] == 1
+
+
+def test_edited_row_triggers_a_full_reload():
+    client, ws = sheet()
+    sync = main.LeadSheetSync()
+    sync.sync(ws)
+    ws.rows[2][0] = "2020-01-01 00:00:00"
+    ws.rows[2][1] = "Renamed Company"
+    df = sync.sync(ws)
+
+    assert df["Company Name"].iloc[1] == "Renamed Company"
+    assert client.stats["calls.get_all_values"] == 2
+
+
+def test_deleted_row_triggers_a_full_reload():
+    client, ws = sheet()
+    sync = main.LeadSheetSync()
+    before = sync.sync(ws)
+    deleted = ws.rows.pop(3)
+    df = sync.sync(ws)
+
+    assert len(df) == len(before) - 1
+    assert deleted[1] not in df["Company Name"].tolist()
+    assert client.stats["calls.get_all_values"] == 2
+
+
+# The default configuration: Notes is left out of the sync and read on demand (LAZY_COLUMNS)
+
+def lazy_store(ws):
+    return main.SheetsLeadStore(ws_factory=lambda: ws)
+
+
+def notes_of(store, df):
+    return store.load_lazy_columns(df[main.ROW_REF_COLUMN].tolist())["Notes"].tolist()
+
+
+def reorder_columns(ws, header):
+    positions = [ws.rows[0].index(name) for name in header]
+    ws.rows[:] = [[row[position] for position in positions] for row in ws.rows]
+
+
+def test_lazy_sync_reads_everything_but_the_lazy_columns():
+    client, ws = sheet()
+    store = lazy_store(ws)
+    df = store.load_df()
+
+    assert "Notes" not in df.columns
+    assert df["Company Name"].tolist() == [row[1] for row in ws.rows[1:]]
+    assert notes_of(store, df) == [row[9] for row in ws.rows[1:]]
+    assert client.stats["calls.get_all_values"] == 0
+
+
+def test_lazy_sync_fetches_appended_rows_with_their_row_refs():
+    client, ws = sheet()
+    store = lazy_store(ws)
+    store.load_df()
+    reads = client.stats["calls.batch_get"]
+    ws.append_rows(make_lead_rows(2, seed=2))
+    df = store.load_df()
+
+    assert df["Company Name"].tolist()[-2:] == [row[1] for row in ws.rows[-2:]]
+    assert df[main.ROW_REF_COLUMN].tolist()[-2:] == ["Leads!7", "Leads!8"]
+    assert client.stats["calls.batch_get"] == reads + 1  # just the new rows
+    assert notes_of(store, df.tail(2)) == [row[9] for row in ws.rows[-2:]]
+
+
+def test_lazy_sync_reloads_after_a_deleted_row_and_reads_the_right_notes():
+    client, ws = sheet()
+    store = lazy_store(ws)
+    before = store.load_df()
+    notes_of(store, before)  # cached per row number, which the deletion shifts
+    ws.rows.pop(2)
+    df = store.load_df()
+
+    assert len(df) == len(before) - 1
+    assert df["Company Name"].tolist() == [row[1] for row in ws.rows[1:]]
+    assert notes_of(store, df) == [row[9] for row in ws.rows[1:]]
+
+
+def test_lazy_sync_follows_reordered_columns():
+    client, ws = sheet()
+    store = lazy_store(ws)
+    store.load_df()
+    header = list(main.LEAD_HEADERS)
+    header.insert(2, header.pop(header.index("Notes")))  # Notes moved next to the company
+    header[3], header[4] = header[4], header[3]
+    reorder_columns(ws, header)
+    ws.append_rows([[dict(zip(main.LEAD_HEADERS, row))[name] for name in header]
+                    for row in make_lead_rows(1, seed=2)])
+    df = store.load_df()
+
+    expected = [dict(zip(header, row)) for row in ws.rows[1:]]
+    assert df["Industry"].tolist() == [row["Industry"] for row in expected]
+    assert df["Size"].tolist() == [row["Size"] for row in expected]
+    assert notes_of(store, df) == [row["Notes"] for row in expected]